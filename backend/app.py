@@ -1,51 +1,128 @@
-import os
 import json
-import subprocess
+import sys
 from pathlib import Path
-from flask import Flask, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
+from jobs import JobManager, QueueFull
+
 app = Flask(__name__)
 CORS(app)
 
 project_root = Path.cwd().parent
-output_dir = project_root / Path("data/json_parm")
-output_file = output_dir / "config.json"
-
 script_dir = project_root / Path("src")
-scraper_script = script_dir / Path("run_scraper.py")
+
+# Import the scraper once; every job then runs in an already warm worker
+sys.path.insert(0, str(script_dir))
+import run_scraper  # noqa: E402
+from metrics import RunMetrics  # noqa: E402
+
+# Stage timings and counters summed over every finished job, for /metrics
+totals = RunMetrics()
+
+
+def run_job(config: dict) -> dict:
+    # Jobs collect metrics unless the config turns them off
+    config = {"metrics": True, **(config or run_scraper.load_config())}
+    result = run_scraper.run(config, disable_tqdm=True)
+    if "metrics" in result:
+        totals.merge(result["metrics"])
+    return result
+
+
+jobs = JobManager(
+    runner=run_job,
+    workers=2,
+    max_queued=20,
+)
 
 
 @app.route("/scrape", methods=["POST"])
 def scrape():
     print("\n[FLASK] POST /scrape called")
 
-    os.makedirs(output_dir, exist_ok=True)
+    # No body runs config.json (see run_job); anything else must be an object
+    config = request.get_json(silent=True) if request.data else {}
+    if not isinstance(config, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(request.json, f, indent=2)
+    try:
+        job = jobs.submit(config)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503
 
-    print("\n[FLASK] Config saved")
+    print(f"\n[FLASK] Job {job.id} queued")
 
-    # Start scraper
-    process = subprocess.Popen(
-        ["python", str(scraper_script)],
-        cwd=script_dir,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        env={**os.environ, "USE_TQDM": "0"},  # disable tqdm
+    if config:
+        # The last submitted config is kept as config.json, for CLI runs
+        config_path = run_scraper.config_path
+        config_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2)
+        print("\n[FLASK] Config saved")
+
+    return (
+        jsonify(
+            {
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": f"/jobs/{job.id}",
+                "log_url": f"/jobs/{job.id}/log",
+            }
+        ),
+        202,
     )
 
-    print("\n[FLASK] Scraper started")
 
-    # Stream scraper output to terminal
-    for line in process.stdout:
-        print(f"[SCRAPER] {line}", end="")
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify([job.summary() for job in jobs.list()])
+
 
-    return "Saved & scraper started", 200
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job.summary())
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    if not job.done:
+        return jsonify({"status": job.status}), 409
+    return jsonify({"status": job.status, "result": job.result})
+
+
+@app.route("/jobs/<job_id>/shortlist", methods=["GET"])
+def job_shortlist(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    if not job.done:
+        return jsonify({"status": job.status}), 409
+    if job.shortlist is None:
+        return jsonify({"error": "job ran without a funnel"}), 404
+    return Response(job.shortlist, mimetype="application/json")
+
+
+@app.route("/jobs/<job_id>/log", methods=["GET"])
+def job_log(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return Response(jobs.follow_log(job), mimetype="text/plain")
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(
+        totals.to_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=True, threaded=True)
@@ -0,0 +1,249 @@
+import queue
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Callable
+
+
+class QueueFull(Exception):
+    pass
+
+
+# The job a piece of code is running for. The fetch engine copies the
+# context into its executor and background threads, so it follows the run.
+current_job: ContextVar["Job | None"] = ContextVar("current_job", default=None)
+
+
+class JobOutput:
+    """
+    Stands in for sys.stdout and sends what a run prints, from whichever
+    thread, to the log of its job; output outside any job writes through.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def attach(self, job) -> Token:
+        return current_job.set(job)
+
+    def detach(self, token: Token):
+        job = current_job.get()
+        current_job.reset(token)
+        with self.lock:
+            rest = self.pending.pop(job.id, "")
+            if rest:
+                job.add_line(rest)
+
+    def write(self, text: str) -> int:
+        job = current_job.get()
+        if job is None:
+            return self.stream.write(text)
+
+        # One lock for every job keeps each job's lines in write order
+        with self.lock:
+            *lines, rest = (self.pending.get(job.id, "") + text).split("\n")
+            self.pending[job.id] = rest
+            for line in lines:
+                job.add_line(line)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class Job:
+    def __init__(self, config: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.config = config
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.log = []
+        self.progress = {
+            "models_total": len(config.get("cars", [])),
+            "models_started": 0,
+            "pages": None,
+            "listings": None,
+        }
+        self.result = {}
+        # the shortlist as JSON records, when the run had a funnel
+        self.shortlist = None
+        self.changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def add_line(self, line: str):
+        with self.changed:
+            self.log.append(line)
+            self.track_progress(line)
+            self.changed.notify_all()
+
+    def track_progress(self, line: str):
+        # run_scraper reports progress through its [INFO] lines
+        if line.startswith("[Processing "):
+            self.progress["models_started"] += 1
+        elif line.startswith("[INFO] Collected "):
+            self.progress["pages"] = int(line.split()[2])
+        elif line.startswith("[INFO] Parsed "):
+            self.progress["listings"] = int(line.split()[2])
+
+    def set_status(self, status: str):
+        with self.changed:
+            self.status = status
+            self.changed.notify_all()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "progress": self.progress,
+            "result": self.result,
+            "log_lines": len(self.log),
+        }
+
+
+def json_result(result: dict) -> dict:
+    """The JSON-friendly part of a run result; the DataFrames are dropped."""
+    summary = {}
+    for key, value in result.items():
+        if isinstance(value, (str, int, float)):
+            summary[key] = value
+        elif isinstance(value, Path):
+            summary[key] = str(value)
+        elif isinstance(value, list):
+            summary[key] = [str(item) for item in value]
+        elif isinstance(value, dict):
+            summary[key] = value
+    return summary
+
+
+class JobManager:
+    """
+    Runs scrape jobs on a fixed number of worker threads fed by a bounded
+    queue. Each worker calls `runner(config)` in this process, so the
+    scraper's imports stay warm between jobs; request threads only enqueue
+    and read. A finished job keeps only its summary, log and serialized
+    result, and the table holds the newest `keep_finished` finished jobs.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[dict], dict],
+        workers: int = 2,
+        max_queued: int = 20,
+        keep_finished: int = 100,
+    ):
+        self.runner = runner
+        self.keep_finished = keep_finished
+        self.output = JobOutput(sys.stdout)
+        sys.stdout = self.output
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.pending = queue.Queue(maxsize=max_queued)
+
+        for i in range(workers):
+            threading.Thread(
+                target=self.work, name=f"scrape-worker-{i}", daemon=True
+            ).start()
+
+    def submit(self, config: dict) -> Job:
+        job = Job(config)
+
+        with self.lock:
+            self.jobs[job.id] = job
+
+        try:
+            self.pending.put_nowait(job)
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job.id]
+            raise QueueFull(f"{self.pending.maxsize} jobs already queued")
+
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        with self.lock:
+            return sorted(self.jobs.values(), key=lambda j: j.created_at)
+
+    def work(self):
+        while True:
+            job = self.pending.get()
+            try:
+                self.run(job)
+            finally:
+                self.pending.task_done()
+
+    def run(self, job: Job):
+        job.started_at = time.time()
+        job.set_status("running")
+        token = self.output.attach(job)
+
+        try:
+            result = self.runner(job.config)
+        except Exception as e:
+            job.error = str(e)
+            job.add_line(f"[ERROR] {e}")
+            for line in traceback.format_exc().splitlines():
+                job.add_line(line)
+            status = "failed"
+        else:
+            job.result = json_result(result)
+            if "shortlist" in result:
+                job.shortlist = result["shortlist"].to_json(
+                    orient="records", date_format="iso"
+                )
+            status = "succeeded"
+        finally:
+            self.output.detach(token)
+
+        job.finished_at = time.time()
+        job.set_status(status)
+        self.evict()
+
+    def evict(self):
+        """Drop the oldest finished jobs beyond `keep_finished`."""
+        with self.lock:
+            finished = sorted(
+                (job for job in self.jobs.values() if job.done),
+                key=lambda j: j.finished_at,
+            )
+            for job in finished[: max(0, len(finished) - self.keep_finished)]:
+                del self.jobs[job.id]
+
+    def follow_log(self, job: Job):
+        """Yield log lines as they are written, until the job finishes."""
+        sent = 0
+        while True:
+            with job.changed:
+                while sent == len(job.log) and not job.done:
+                    job.changed.wait(timeout=15)
+                lines = job.log[sent:]
+                finished = job.done
+
+            for line in lines:
+                yield line + "\n"
+            sent += len(lines)
+
+            if finished and sent == len(job.log):
+                return
@@ -0,0 +1,445 @@
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List
+from urllib.parse import urlparse
+
+import requests
+import urllib3
+from tqdm import tqdm
+
+from url_builder import build_search_url
+from fetcher import fetch_html, is_zero_results
+from paginator import save_html_snapshot
+from parser.extractor import ExtractedPage, extract_page
+from parser.json_ld_parser import parse_json_ld
+from http_cache import HttpCache
+from rate_control import AdaptiveRateController
+
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncFetchEngine:
+    """
+    Runs fetcher.fetch_html on a thread pool under a global concurrency cap,
+    a per-host cap and a per-host token bucket (which replaces polite_sleep).
+    Every worker thread keeps its own requests.Session for connection reuse.
+    An optional rate `controller` is shared by the workers for retries and
+    for the slowdowns the server asks for on top of the bucket, and an
+    optional response `cache` serves pages fetched recently.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        per_host: int = 2,
+        rate: float = 1.0,
+        burst: float = 2.0,
+        timeout: int = 15,
+        controller: AdaptiveRateController | None = None,
+        cache: HttpCache | None = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.controller = controller
+        self.cache = cache
+
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.local = threading.local()
+        self.global_limit = None
+        self.host_limits = {}
+        self.host_buckets = {}
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def _fetch_and_check(self, url: str):
+        """
+        Runs in a worker thread: fetch the page and classify it. An "ok"
+        page comes back as its ExtractedPage, scanned once for everyone.
+        """
+        html = fetch_html(
+            url,
+            self._session(),
+            timeout=self.timeout,
+            cache=self.cache,
+            controller=self.controller,
+            spaced=False,
+        )
+
+        if html is None:
+            return None, "failed"
+        if is_zero_results(html):
+            return None, "zero"
+        page = extract_page(html)
+        if not parse_json_ld(page):
+            return None, "last"
+        return page, "ok"
+
+    def _fetch_only(self, url: str):
+        """Runs in a worker thread: fetch any page, no search-page checks."""
+        html = fetch_html(
+            url,
+            self._session(),
+            timeout=self.timeout,
+            cache=self.cache,
+            controller=self.controller,
+            spaced=False,
+        )
+        return html, "failed" if html is None else "ok"
+
+    def _host_state(self, url: str):
+        host = urlparse(url).netloc
+
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host)
+            self.host_buckets[host] = TokenBucket(self.rate, self.burst)
+
+        return self.host_limits[host], self.host_buckets[host]
+
+    async def fetch(self, url: str, search_page: bool = True):
+        """
+        Fetch under the engine's limits. Returns (page, status); search pages
+        come back as an ExtractedPage classified as "ok", "zero", "last" or
+        "failed", other pages as HTML with "ok" or "failed".
+        """
+        if self.global_limit is None:
+            self.global_limit = asyncio.Semaphore(self.max_concurrency)
+
+        host_limit, bucket = self._host_state(url)
+
+        async with self.global_limit, host_limit:
+            await bucket.acquire()
+            loop = asyncio.get_running_loop()
+            # Executor threads do not inherit the run's context (metrics)
+            context = contextvars.copy_context()
+            work = self._fetch_and_check if search_page else self._fetch_only
+            return await loop.run_in_executor(self.executor, context.run, work, url)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+async def iterate_search_pages_async(
+    engine: AsyncFetchEngine,
+    base_args: dict = {},
+    input_url: str = "",
+    max_pages: int = 10,
+    save_snapshots: bool = False,
+    snapshot_dir: str = "data/html_snapshots",
+    pbar=None,
+    on_page=None,
+    status: dict | None = None,
+) -> List[ExtractedPage]:
+    """
+    Async counterpart of paginator.iterate_search_pages.
+    Pages are requested in windows of `engine.per_host` so a model's pages
+    overlap on the wire; the stopping rules are the same as the sequential
+    loop and pages past the stop point are discarded.
+    With `on_page`, each page is handed over instead of being collected.
+    `status` gets the same "stop_reason" as in the sequential loop.
+    """
+    if status is None:
+        status = {}
+    pages_html = []
+    window = max(1, engine.per_host)
+
+    for start in range(1, max_pages + 1, window):
+        batch = range(start, min(start + window, max_pages + 1))
+        urls = [
+            (
+                input_url + f"&page={page}"
+                if input_url
+                else build_search_url(page=page, **base_args)
+            )
+            for page in batch
+        ]
+
+        results = await asyncio.gather(*(engine.fetch(url) for url in urls))
+
+        for page, url, (scanned, page_status) in zip(batch, urls, results):
+            if pbar is not None:
+                pbar.update(1)
+
+            if page_status == "failed":
+                tqdm.write(f"[STOP] Fetch failed on page {page}.")
+                status["stop_reason"] = "failed"
+                return pages_html
+
+            if page_status == "zero":
+                tqdm.write("[STOP] Zero results page detected.")
+                status["stop_reason"] = "zero"
+                return pages_html
+
+            if page_status == "last":
+                tqdm.write(f"[INFO] Detected last page: {page - 1}")
+                tqdm.write("[STOP] Reached last page.")
+                status["stop_reason"] = "last"
+                return pages_html
+
+            if save_snapshots:
+                save_html_snapshot(
+                    base_args=base_args,
+                    html=scanned.html,
+                    page=page,
+                    output_dir=snapshot_dir,
+                    url=url,
+                )
+
+            if on_page is not None:
+                on_page(scanned)
+            else:
+                pages_html.append(scanned)
+
+    status["stop_reason"] = "max_pages"
+    return pages_html
+
+
+async def fetch_search_pages_async(
+    engine: AsyncFetchEngine,
+    jobs: List[dict],
+    max_pages: int = 10,
+    save_snapshots: bool = False,
+    snapshot_dir: str = "data/html_snapshots",
+    disable_tqdm=False,
+    on_page=None,
+) -> List[ExtractedPage]:
+    pbar = tqdm(
+        desc="Pages fetched",
+        unit="page",
+        bar_format="{desc}: {n} [{elapsed}, {rate_fmt}]",
+        disable=disable_tqdm,
+    )
+
+    results = await asyncio.gather(
+        *(
+            iterate_search_pages_async(
+                engine,
+                base_args=job.get("base_args", {}),
+                input_url=job.get("input_url", ""),
+                max_pages=max_pages,
+                save_snapshots=save_snapshots,
+                snapshot_dir=snapshot_dir,
+                pbar=pbar,
+                on_page=on_page,
+                status=job.get("status"),
+            )
+            for job in jobs
+        )
+    )
+
+    pbar.close()
+
+    # Keep model order stable regardless of which model finished first
+    return [html for pages in results for html in pages]
+
+
+def fetch_search_pages(
+    jobs: List[dict],
+    max_pages: int = 10,
+    save_snapshots: bool = False,
+    snapshot_dir: str = "data/html_snapshots",
+    disable_tqdm=False,
+    **engine_args,
+) -> List[ExtractedPage]:
+    """
+    Fetch every job (a dict with "base_args" or "input_url") concurrently.
+    Returns the same flat list of pages the sequential loop produces.
+    A job's optional "status" dict gets the stop_reason of its crawl.
+    """
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    engine = AsyncFetchEngine(**engine_args)
+
+    try:
+        return asyncio.run(
+            fetch_search_pages_async(
+                engine,
+                jobs,
+                max_pages=max_pages,
+                save_snapshots=save_snapshots,
+                snapshot_dir=snapshot_dir,
+                disable_tqdm=disable_tqdm,
+            )
+        )
+    finally:
+        engine.close()
+
+
+def stream_pages(
+    engine: AsyncFetchEngine, crawl: Callable, queue_size: int = 16
+) -> Iterator[str]:
+    """
+    Run the coroutine `crawl(on_page)` on a background event loop and yield
+    every page it hands to `on_page`, in arrival order. Pages pass through
+    a bounded queue, so a slow consumer throttles fetching instead of
+    letting pages pile up in memory. Closes the engine when done.
+    """
+    pages = queue.Queue(maxsize=queue_size)
+    done = object()
+    errors = []
+
+    def run():
+        try:
+            asyncio.run(crawl(pages.put))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            pages.put(done)
+
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(run,), daemon=True)
+    thread.start()
+
+    try:
+        while (html := pages.get()) is not done:
+            yield html
+    finally:
+        # Drain so the crawl thread never blocks on a put after an early exit
+        while thread.is_alive():
+            try:
+                pages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        engine.close()
+
+    if errors:
+        raise errors[0]
+
+
+def stream_search_pages(
+    jobs: List[dict],
+    max_pages: int = 10,
+    save_snapshots: bool = False,
+    snapshot_dir: str = "data/html_snapshots",
+    disable_tqdm=False,
+    queue_size: int = 16,
+    **engine_args,
+) -> Iterator[ExtractedPage]:
+    """
+    Like fetch_search_pages, but yields pages in arrival order while the
+    crawl is still running (see stream_pages).
+    """
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    engine = AsyncFetchEngine(**engine_args)
+
+    yield from stream_pages(
+        engine,
+        lambda on_page: fetch_search_pages_async(
+            engine,
+            jobs,
+            max_pages=max_pages,
+            save_snapshots=save_snapshots,
+            snapshot_dir=snapshot_dir,
+            disable_tqdm=disable_tqdm,
+            on_page=on_page,
+        ),
+        queue_size=queue_size,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from paginator import iterate_search_pages
+    from stub_server import start_stub_server
+
+    arg_parser = argparse.ArgumentParser(
+        description="Compare sequential and async fetching against the stub server"
+    )
+    arg_parser.add_argument("--latency", type=float, default=0.2)
+    arg_parser.add_argument("--last-page", type=int, default=5)
+    arg_parser.add_argument("--max-concurrency", type=int, default=8)
+    arg_parser.add_argument("--per-host", type=int, default=4)
+    arg_parser.add_argument("--rate", type=float, default=20.0)
+    args = arg_parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency, last_page=args.last_page)
+
+    base_args = {
+        "year_from": 2019,
+        "price_from": 50000,
+        "price_to": 75000,
+        "year_to": 2022,
+        "mileage_to": 150000,
+        "base_url": base_url,
+    }
+    cars = [
+        {"brand": "Volkswagen", "model": "Taigo"},
+        {"brand": "Seat", "model": "Ateca"},
+        {"brand": "Ford", "model": "Kuga"},
+        {"brand": "Skoda", "model": "Kamiq"},
+        {"brand": "Renault", "model": "Kadjar"},
+        {"brand": "Suzuki", "model": "SX4-S-Cross"},
+        {"brand": "Opel", "model": "Grandland-X"},
+    ]
+    jobs = [{"base_args": {**base_args, **car}} for car in cars]
+
+    # Sequential baseline without polite_sleep, i.e. network time only
+    import paginator
+
+    paginator.polite_sleep = lambda *a, **k: None
+
+    start = time.perf_counter()
+    session = requests.Session()
+    sequential = []
+    for job in jobs:
+        sequential.extend(
+            iterate_search_pages(
+                session=session, base_args=job["base_args"], disable_tqdm=True
+            )
+        )
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipelined = fetch_search_pages(
+        jobs,
+        disable_tqdm=True,
+        max_concurrency=args.max_concurrency,
+        per_host=args.per_host,
+        rate=args.rate,
+        burst=args.per_host,
+    )
+    async_time = time.perf_counter() - start
+
+    server.shutdown()
+
+    assert [page.html for page in pipelined] == [
+        page.html for page in sequential
+    ], "async engine returned different pages"
+    print(f"\n[RESULT] {len(sequential)} pages, {server.requests_served} requests")
+    print(
+        f"sequential: {sequential_time:.2f}s ({len(sequential) / sequential_time:.1f} pages/s)"
+    )
+    print(f"async:      {async_time:.2f}s ({len(pipelined) / async_time:.1f} pages/s)")
@@ -0,0 +1,192 @@
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+from fetcher import fetch_html
+from get_eur import RateProvider
+from normalizer import normalize_dataframe
+from parser.extractor import extract_page
+from parser.graphql_parser import parse_graphql
+from parser.json_ld_parser import parse_json_ld
+from parser.merger import merge_jsonld_and_graphql
+from stub_server import start_stub_server
+from synthetic_pages import make_search_page
+
+results_path = Path.cwd().parent / Path("documentation/benchmark_results.json")
+
+# A stage counts as regressed when its throughput drops by more than this
+REGRESSION_THRESHOLD = 0.2
+
+MODELS = [("Volkswagen", "Taigo"), ("Seat", "Ateca"), ("Ford", "Kuga")]
+
+
+def make_pages(n_pages: int, offers: int) -> list[str]:
+    """Distinct synthetic search pages, so no stage is served from a cache."""
+    return [
+        make_search_page(
+            *MODELS[i % len(MODELS)],
+            page=i // len(MODELS) + 1,
+            last_page=n_pages,
+            offers_per_page=offers,
+        )
+        for i in range(n_pages)
+    ]
+
+
+def offline_rates(cache_path: Path) -> RateProvider:
+    """A rate provider seeded from an in-memory ECB file, so nothing is downloaded."""
+    xml = (
+        '<CompactData xmlns:exr="http://www.ecb.europa.eu/vocabulary/stats/exr/1">'
+        + "".join(
+            f'<exr:Obs TIME_PERIOD="2026-01-{day:02d}" OBS_VALUE="{4.2 + day / 100}"/>'
+            for day in range(1, 29)
+        )
+        + "</CompactData>"
+    )
+    provider = RateProvider(cache_path)
+    provider.refresh(io.BytesIO(xml.encode("utf-8")))
+    return provider
+
+
+def measure(func, items: int, unit: str, repeat: int = 3) -> dict:
+    """Best-of-`repeat` wall time, plus the peak Python allocation of one pass."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "items": items,
+        "unit": unit,
+        "seconds": round(best, 4),
+        "per_second": round(items / best, 1),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+def run_suite(pages: int = 60, offers: int = 32, rows: int = 100_000, repeat=3):
+    html = make_pages(pages, offers)
+    results = {}
+
+    # ---- fetch: sequential GETs against the local stand-in server ----
+    server, base_url = start_stub_server(last_page=pages, offers_per_page=offers)
+    session = requests.Session()
+    urls = [
+        f"{base_url}/osobowe/{brand.lower()}/{model.lower()}/od-2019?page={page}"
+        for page in range(1, pages // len(MODELS) + 1)
+        for brand, model in MODELS
+    ]
+    results["fetch"] = measure(
+        lambda: [fetch_html(url, session) for url in urls], len(urls), "pages", repeat
+    )
+    results["fetch"]["mb_per_second"] = round(
+        sum(map(len, html[: len(urls)])) / 1024 / 1024 / results["fetch"]["seconds"],
+        1,
+    )
+    server.shutdown()
+
+    # ---- parse: every stage starts from raw HTML with a cold extractor ----
+    results["extract"] = measure(
+        lambda: [extract_page(page).next_data for page in html], pages, "pages", repeat
+    )
+    results["parse_json_ld"] = measure(
+        lambda: [parse_json_ld(page) for page in html], pages, "pages", repeat
+    )
+    results["parse_graphql"] = measure(
+        lambda: [parse_graphql(page) for page in html], pages, "pages", repeat
+    )
+
+    parsed = [(parse_json_ld(page), parse_graphql(page)) for page in html]
+    n_listings = sum(len(graphql) for _, graphql in parsed)
+    results["merge"] = measure(
+        lambda: [merge_jsonld_and_graphql(ld, gql) for ld, gql in parsed],
+        n_listings,
+        "rows",
+        repeat,
+    )
+
+    # ---- normalize: the listings repeated up to `rows` rows ----
+    listings = [row for ld, gql in parsed for row in merge_jsonld_and_graphql(ld, gql)]
+    df = pd.DataFrame(listings * (rows // len(listings) + 1)).head(rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rates = offline_rates(Path(tmp) / "rates.sqlite")
+        results["normalize"] = measure(
+            lambda: normalize_dataframe(df, rates=rates), rows, "rows", repeat
+        )
+        rates.close()
+
+    return results
+
+
+def compare(results: dict, baseline: dict) -> list[str]:
+    regressions = []
+    for stage, result in results.items():
+        before = baseline.get(stage)
+        if before and result["per_second"] < before["per_second"] * (
+            1 - REGRESSION_THRESHOLD
+        ):
+            regressions.append(
+                f"{stage}: {result['per_second']} {result['unit']}/s,"
+                f" was {before['per_second']}"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(
+        description="Offline benchmarks of the fetch, parse, merge and normalize stages"
+    )
+    arg_parser.add_argument("--pages", type=int, default=60)
+    arg_parser.add_argument("--offers", type=int, default=32)
+    arg_parser.add_argument("--rows", type=int, default=100_000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument(
+        "--save", action="store_true", help=f"record the results in {results_path}"
+    )
+    arg_parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="fail if a stage is more than 20%% slower than the recorded results",
+    )
+    args = arg_parser.parse_args()
+
+    results = run_suite(args.pages, args.offers, args.rows, args.repeat)
+
+    print(f"\n[RESULT] {args.pages} pages x {args.offers} offers, {args.rows} rows")
+    for stage, result in results.items():
+        print(
+            f"{stage:<14} {result['per_second']:>11,.1f} {result['unit']}/s"
+            f"  {result['seconds']:8.4f}s  peak {result['peak_mb']:7.2f} MB"
+        )
+
+    exit_code = 0
+    if args.compare and results_path.exists():
+        with open(results_path, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"])
+        for line in regressions:
+            print(f"[WARN] Regression in {line}")
+        exit_code = 1 if regressions else 0
+
+    if args.save:
+        results_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(results_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"\n[INFO] Saved: {results_path}")
+
+    sys.exit(exit_code)
@@ -0,0 +1,351 @@
+import asyncio
+import math
+from typing import Iterable, Iterator, List
+
+import urllib3
+from tqdm import tqdm
+
+from async_fetcher import AsyncFetchEngine, stream_pages
+from paginator import save_html_snapshot
+from parser.extractor import ExtractedPage
+from parser.graphql_parser import parse_search_meta
+from url_builder import build_search_url
+
+# Ranges a search can be split on, in the order they are tried
+SPLIT_RANGES = [
+    ("price_from", "price_to"),
+    ("year_from", "year_to"),
+    ("mileage_from", "mileage_to"),
+]
+
+DEFAULT_PAGE_SIZE = 32
+
+# A probe that still fails after this many tries is crawled without a plan
+PROBE_ATTEMPTS = 3
+
+
+def split_search(base_args: dict, parts: int = 2) -> List[dict] | None:
+    """
+    Cut the first range that still spans more than one value into up to
+    `parts` disjoint searches of equal width (the filters are inclusive,
+    so neighbours meet at hi and hi + 1). Returns None once no range can
+    be narrowed any further.
+    """
+    for low_key, high_key in SPLIT_RANGES:
+        low = base_args.get(low_key) or 0
+        high = base_args.get(high_key)
+
+        if high is None or high <= low:
+            continue
+
+        parts = min(parts, high - low + 1)
+        bounds = [low + (high - low + 1) * i // parts for i in range(parts + 1)]
+        return [
+            {**base_args, low_key: start, high_key: end - 1}
+            for start, end in zip(bounds, bounds[1:])
+        ]
+
+    return None
+
+
+async def plan_search(
+    engine: AsyncFetchEngine, base_args: dict, page_limit: int = 10
+) -> List[dict]:
+    """
+    Probe page 1 of a search and split it until every part fits in
+    `page_limit` pages. Sibling parts are probed concurrently.
+    Returns the leaf shards, each with its result count, page count and
+    the page 1 HTML already fetched (so it is never requested twice).
+    A search whose probe keeps failing becomes a "blind" shard: its first
+    `page_limit` pages are fetched with no page count to go by.
+    """
+    url = build_search_url(page=1, **base_args)
+    for attempt in range(1, PROBE_ATTEMPTS + 1):
+        html, status = await engine.fetch(url)
+        if status != "failed":
+            break
+        if attempt < PROBE_ATTEMPTS:
+            await asyncio.sleep(attempt)
+    else:
+        tqdm.write(
+            f"[WARN] Could not probe {shard_label(base_args)} after"
+            f" {PROBE_ATTEMPTS} tries; crawling its first {page_limit} pages"
+            " unplanned, results may be incomplete"
+        )
+        return [{"base_args": base_args, "pages": page_limit, "blind": True}]
+
+    if status != "ok":  # no results in this range
+        return []
+
+    meta = parse_search_meta(html)
+    page_size = meta["page_size"] or DEFAULT_PAGE_SIZE
+    pages = math.ceil(meta["total_count"] / page_size)
+
+    shard = {
+        "base_args": base_args,
+        "total_count": meta["total_count"],
+        "pages": min(pages, page_limit),
+        "first_page": html,
+    }
+
+    if pages <= page_limit:
+        return [shard]
+
+    # Aim straight for shards of about page_limit pages each
+    parts = split_search(base_args, parts=math.ceil(pages / page_limit))
+    if parts is None:
+        tqdm.write(
+            f"[WARN] {shard_label(base_args)} has {pages} pages and cannot be"
+            f" split further; crawling the first {page_limit}"
+        )
+        return [{**shard, "truncated": True}]
+
+    children = await asyncio.gather(
+        *(plan_search(engine, part, page_limit) for part in parts)
+    )
+    return [leaf for shards in children for leaf in shards]
+
+
+def shard_label(base_args: dict) -> str:
+    ranges = [
+        f"{low_key.rsplit('_', 1)[0]} {base_args.get(low_key) or 0}"
+        f"-{base_args.get(high_key, '')}"
+        for low_key, high_key in SPLIT_RANGES
+    ]
+    return f"{base_args['brand']} {base_args['model']} ({', '.join(ranges)})"
+
+
+def work_list(shards: List[dict]) -> List[dict]:
+    """
+    The pages still to fetch, in any order: pages 2..n of every probed
+    shard, 1..n of a blind one.
+    """
+    return [
+        {
+            "url": build_search_url(page=page, **shard["base_args"]),
+            "page": page,
+            "shard": index,
+        }
+        for index, shard in enumerate(shards)
+        for page in range(1 if shard.get("blind") else 2, shard["pages"] + 1)
+    ]
+
+
+async def plan_jobs(
+    engine: AsyncFetchEngine, jobs: List[dict], page_limit: int = 10
+) -> List[dict]:
+    planned = await asyncio.gather(
+        *(plan_search(engine, job["base_args"], page_limit) for job in jobs)
+    )
+    for index, shards in enumerate(planned):
+        for shard in shards:
+            shard["job"] = index
+    return [shard for shards in planned for shard in shards]
+
+
+async def crawl_plan_async(
+    engine: AsyncFetchEngine,
+    jobs: List[dict],
+    page_limit: int = 10,
+    on_page=None,
+    stats: dict | None = None,
+    save_snapshots: bool = False,
+    snapshot_dir: str = "data/html_snapshots",
+):
+    """
+    Plan every job, hand over the probed first pages, then fetch the whole
+    work list concurrently under the engine's limits. A job's optional
+    "status" dict gets a stop_reason as in paginator.iter_search_pages:
+    "last" when every shard was crawled, "zero" when the search is empty,
+    "failed" or "max_pages" (a shard truncated at page_limit, or a blind
+    one that never reached its last page) otherwise.
+    """
+    stats = {} if stats is None else stats
+
+    shards = await plan_jobs(engine, jobs, page_limit)
+    work = work_list(shards)
+
+    stats["shards"] = len(shards)
+    stats["reused"] = reused = sum(1 for shard in shards if "first_page" in shard)
+    stats["truncated"] = sum(1 for shard in shards if shard.get("truncated"))
+    stats["blind"] = sum(1 for shard in shards if shard.get("blind"))
+    stats["failed"] = 0
+    stats["work"] = len(work)
+    tqdm.write(
+        f"[INFO] Planned {len(shards)} shards: {reused} probed pages"
+        f" reused, {len(work)} pages to fetch"
+    )
+
+    def accept(page_scan: ExtractedPage, shard: dict, page: int, url: str):
+        if save_snapshots:
+            save_html_snapshot(
+                page_scan.html,
+                page=page,
+                output_dir=snapshot_dir,
+                base_args=shard["base_args"],
+                url=url,
+            )
+        on_page(page_scan)
+
+    for shard in shards:
+        if "first_page" in shard:
+            url = build_search_url(page=1, **shard["base_args"])
+            accept(shard.pop("first_page"), shard, 1, url)
+
+    incomplete = {}
+    for shard in shards:
+        if shard.get("truncated"):
+            incomplete.setdefault(shard["job"], "max_pages")
+
+    async def fetch(item: dict):
+        shard = shards[item["shard"]]
+        html, status = await engine.fetch(item["url"])
+        if status == "ok":
+            accept(html, shard, item["page"], item["url"])
+        elif status == "failed":
+            stats["failed"] += 1
+            incomplete[shard["job"]] = "failed"
+        else:
+            shard["reached_end"] = True
+
+    await asyncio.gather(*(fetch(item) for item in work))
+
+    for shard in shards:
+        if shard.get("blind") and not shard.get("reached_end"):
+            incomplete.setdefault(shard["job"], "max_pages")
+
+    crawled = {shard["job"] for shard in shards}
+    for index, job in enumerate(jobs):
+        if "status" in job:
+            default = "last" if index in crawled else "zero"
+            job["status"]["stop_reason"] = incomplete.get(index, default)
+
+
+def stream_sharded_pages(
+    jobs: List[dict],
+    page_limit: int = 10,
+    queue_size: int = 16,
+    stats: dict | None = None,
+    save_snapshots: bool = False,
+    snapshot_dir: str = "data/html_snapshots",
+    **engine_args,
+) -> Iterator[ExtractedPage]:
+    """
+    Crawl every job (a dict with "base_args") completely: searches too big
+    for `page_limit` pages are split into disjoint price/year/mileage
+    shards first. Yields pages in arrival order; pass the parsed listings
+    through dedupe_listings, as shard boundaries can overlap when prices
+    change mid-crawl.
+    """
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    engine = AsyncFetchEngine(**engine_args)
+
+    yield from stream_pages(
+        engine,
+        lambda on_page: crawl_plan_async(
+            engine,
+            jobs,
+            page_limit=page_limit,
+            on_page=on_page,
+            stats=stats,
+            save_snapshots=save_snapshots,
+            snapshot_dir=snapshot_dir,
+        ),
+        queue_size=queue_size,
+    )
+
+
+def dedupe_listings(page_listings: Iterable[list[dict]]) -> Iterator[list[dict]]:
+    """Drop listings whose id was already yielded from an earlier page."""
+    seen = set()
+    for listings in page_listings:
+        fresh = []
+        for listing in listings:
+            if listing["id"] not in seen:
+                seen.add(listing["id"])
+                fresh.append(listing)
+        yield fresh
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import requests
+
+    import paginator
+    from parser.search_page import parse_search_page
+    from stub_server import start_stub_server
+
+    arg_parser = argparse.ArgumentParser(
+        description="Capped sequential paging vs the shard planner on the stub"
+    )
+    arg_parser.add_argument("--inventory", type=int, default=1500)
+    arg_parser.add_argument("--page-limit", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    server, base_url = start_stub_server(latency=0.05, inventory=args.inventory)
+    paginator.polite_sleep = lambda *a, **k: None
+
+    base_args = {
+        "year_from": 2019,
+        "price_from": 50000,
+        "price_to": 75000,
+        "year_to": 2022,
+        "mileage_to": 150000,
+        "base_url": base_url,
+    }
+    cars = [
+        {"brand": "Volkswagen", "model": "Taigo"},
+        {"brand": "Seat", "model": "Ateca"},
+        {"brand": "Ford", "model": "Kuga"},
+    ]
+    jobs = [{"base_args": {**base_args, **car}} for car in cars]
+    expected = args.inventory * len(cars)
+
+    start = time.perf_counter()
+    session = requests.Session()
+    capped = set()
+    for job in jobs:
+        for html in paginator.iter_search_pages(
+            session,
+            base_args=job["base_args"],
+            max_pages=args.page_limit,
+            disable_tqdm=True,
+        ):
+            capped.update(listing["id"] for listing in parse_search_page(html))
+    capped_time = time.perf_counter() - start
+    capped_requests = server.requests_served
+
+    start = time.perf_counter()
+    stats = {}
+    planned = set()
+    pages = stream_sharded_pages(
+        jobs,
+        page_limit=args.page_limit,
+        stats=stats,
+        max_concurrency=8,
+        per_host=4,
+        rate=50,
+        burst=4,
+    )
+    for listings in dedupe_listings(map(parse_search_page, pages)):
+        planned.update(listing["id"] for listing in listings)
+    planned_time = time.perf_counter() - start
+    planned_requests = server.requests_served - capped_requests
+
+    server.shutdown()
+
+    # The fewest requests that could cover everything: full pages only
+    floor = len(cars) * math.ceil(args.inventory / DEFAULT_PAGE_SIZE)
+
+    print(f"\n[RESULT] {expected} listings across {len(cars)} models")
+    print(
+        f"capped paging: {len(capped):5d} listings ({len(capped) / expected:.0%}),"
+        f" {capped_requests} requests, {capped_time:.2f}s"
+    )
+    print(
+        f"shard planner: {len(planned):5d} listings ({len(planned) / expected:.0%}),"
+        f" {planned_requests} requests (floor {floor}), {planned_time:.2f}s"
+    )
+    print(f"plan: {stats}")
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+import urllib3
+
+from async_fetcher import AsyncFetchEngine, stream_pages
+from parser.detail_parser import DETAIL_COLUMNS, parse_detail_page
+from url_builder import BASE_URL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS details (
+    id TEXT PRIMARY KEY,
+    fetched_at REAL,
+    data TEXT
+);
+"""
+
+# Nullable dtypes, so rows without details keep a stable Parquet schema
+DETAIL_DTYPES = {
+    **{column: "string" for column in DETAIL_COLUMNS},
+    "has_vin": "boolean",
+    "no_accident": "boolean",
+    "service_record": "boolean",
+    "original_owner": "boolean",
+    "equipment_count": "Int64",
+}
+
+# SQLite caps the number of bound parameters per statement
+ID_CHUNK = 900
+
+
+class DetailCache:
+    """
+    Parsed detail columns per listing id, so each listing page is fetched
+    and parsed once; later runs only fetch ids they have not enriched yet.
+    """
+
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def get(self, ids: list[str]) -> dict[str, tuple[float, dict]]:
+        """(fetched_at, details) of every cached id in `ids`."""
+        found = {}
+        for start in range(0, len(ids), ID_CHUNK):
+            chunk = ids[start : start + ID_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            for listing_id, fetched_at, data in self.conn.execute(
+                "SELECT id, fetched_at, data FROM details"
+                f" WHERE id IN ({placeholders})",
+                chunk,
+            ):
+                found[listing_id] = (fetched_at, json.loads(data))
+        return found
+
+    def store(self, rows: list[tuple[str, dict]], fetched_at: float | None = None):
+        fetched_at = fetched_at or time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO details VALUES (?, ?, ?)",
+                [
+                    (listing_id, fetched_at, json.dumps(details))
+                    for listing_id, details in rows
+                ],
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def listing_ids(df: pd.DataFrame) -> pd.Series:
+    """Ids as the strings used on the site, whether raw (str) or normalized."""
+    return pd.to_numeric(df["id"], errors="coerce").astype("Int64").astype("string")
+
+
+def detail_url(url: str, base_url: Optional[str] = None) -> str:
+    # Point listing links at a stand-in server when the search uses one
+    if base_url and url.startswith(BASE_URL):
+        return base_url + url[len(BASE_URL) :]
+    return url
+
+
+def stream_detail_pages(
+    todo: list[tuple[str, str]], queue_size: int = 16, **engine_args
+) -> Iterator[tuple[str, Optional[str]]]:
+    """
+    Fetch (id, url) pairs on the async engine, at most `max_concurrency`
+    at a time, and yield (id, html) as pages arrive; html is None when the
+    fetch failed.
+    """
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    engine = AsyncFetchEngine(**engine_args)
+
+    async def crawl(on_page):
+        async def fetch(listing_id: str, url: str):
+            html, _ = await engine.fetch(url, search_page=False)
+            on_page((listing_id, html))
+
+        await asyncio.gather(*(fetch(listing_id, url) for listing_id, url in todo))
+
+    yield from stream_pages(engine, crawl, queue_size=queue_size)
+
+
+def enrich_listings(
+    df: pd.DataFrame,
+    cache: DetailCache,
+    query: Optional[str] = None,
+    limit: Optional[int] = None,
+    max_age_days: Optional[float] = None,
+    fetch: bool = True,
+    base_url: Optional[str] = None,
+    stats: Optional[dict] = None,
+    **engine_args,
+) -> pd.DataFrame:
+    """
+    Add DETAIL_COLUMNS to `df`. Only listings matching `query` (a
+    DataFrame.query expression, e.g. "price_pln < 60000"; all when None),
+    the first `limit` of them, are candidates for fetching, and of those
+    only ids missing from the cache (or cached more than `max_age_days`
+    ago) are fetched. Every row whose id is cached gets its columns, the
+    rest stay empty. With `fetch` False nothing is downloaded.
+    """
+    stats = {} if stats is None else stats
+    ids = listing_ids(df)
+    cached = cache.get(ids.dropna().unique().tolist())
+
+    selected = df.query(query) if query else df
+    if limit is not None:
+        selected = selected.head(limit)
+
+    oldest = time.time() - max_age_days * 86400 if max_age_days else None
+    todo = {}
+    for listing_id, url in zip(listing_ids(selected), selected["url"]):
+        if pd.isna(listing_id) or listing_id in todo:
+            continue
+        if listing_id in cached and (oldest is None or cached[listing_id][0] >= oldest):
+            continue
+        todo[listing_id] = detail_url(url, base_url)
+
+    stats.update(
+        selected=len(selected), cached=len(selected) - len(todo), fetched=0, failed=0
+    )
+
+    if fetch and todo:
+        print(f"[INFO] Fetching {len(todo)} listing pages", flush=True)
+        batch = []
+        for listing_id, html in stream_detail_pages(list(todo.items()), **engine_args):
+            details = None
+            if html is not None:
+                try:
+                    details = parse_detail_page(html)
+                except (RuntimeError, ValueError, KeyError, TypeError) as e:
+                    print(f"[ERROR] Failed to parse listing {listing_id}: {e}")
+
+            if details is None:
+                stats["failed"] += 1
+                continue
+
+            stats["fetched"] += 1
+            cached[listing_id] = (time.time(), details)
+            batch.append((listing_id, details))
+            if len(batch) >= 50:
+                cache.store(batch)
+                batch = []
+        cache.store(batch)
+
+    details = pd.DataFrame.from_dict(
+        {listing_id: data for listing_id, (_, data) in cached.items()},
+        orient="index",
+        columns=DETAIL_COLUMNS,
+    )
+    details = details.reindex(ids.astype(object)).astype(DETAIL_DTYPES)
+    details.index = df.index
+    enriched = pd.concat([df, details], axis=1)
+    # concat drops attrs unless every frame has the same
+    enriched.attrs = dict(df.attrs)
+    return enriched
+
+
+if __name__ == "__main__":
+    import argparse
+    import inspect
+    import tempfile
+
+    import requests
+
+    from fetcher import fetch_html, polite_sleep
+    from rate_control import AdaptiveRateController
+    from stub_server import start_stub_server
+    from synthetic_pages import make_search_page
+    from parser.search_page import parse_search_page
+
+    arg_parser = argparse.ArgumentParser(
+        description="Sequential detail fetching vs the enrichment pool on the stub"
+    )
+    arg_parser.add_argument("--listings", type=int, default=500)
+    arg_parser.add_argument("--workers", type=int, default=8)
+    arg_parser.add_argument("--latency", type=float, default=0.1)
+    # Scaled down from the live 1-2 s spacing to keep this short; the pool
+    # gets the same average spacing through its token bucket
+    arg_parser.add_argument("--interval", type=float, default=0.05)
+    args = arg_parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    pages = -(-args.listings // 32)
+    listings = [
+        listing
+        for page in range(1, pages + 1)
+        for listing in parse_search_page(make_search_page(page=page, last_page=pages))
+    ][: args.listings]
+    df = pd.DataFrame(listings)
+
+    # The loop a notebook would run: one listing after another
+    session = requests.Session()
+    start = time.perf_counter()
+    for url in df["url"]:
+        parse_detail_page(fetch_html(detail_url(url, base_url), session))
+        polite_sleep(args.interval / 2, args.interval * 1.5)
+    sequential_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DetailCache(Path(tmp) / "details.sqlite")
+        runs = []
+        for _ in range(2):
+            stats = {}
+            start = time.perf_counter()
+            enriched = enrich_listings(
+                df,
+                cache,
+                base_url=base_url,
+                stats=stats,
+                max_concurrency=args.workers,
+                per_host=args.workers,
+                rate=1 / args.interval,
+                # The live controller: its 1 s floor only spaces sequential fetches
+                controller=AdaptiveRateController(),
+            )
+            runs.append((time.perf_counter() - start, stats))
+        cache.close()
+
+    server.shutdown()
+
+    n = len(df)
+    print(f"\n[RESULT] {n} listings, {args.latency * 1000:.0f} ms server latency")
+    print(f"sequential loop:      {sequential_time:6.2f}s")
+    for label, (elapsed, stats) in zip(
+        ["pool, cold cache:", "pool, warm cache:"], runs
+    ):
+        print(
+            f"{label:<21} {elapsed:6.2f}s ({sequential_time / elapsed:5.1f}x)"
+            f"  fetched {stats['fetched']}, cached {stats['cached']},"
+            f" failed {stats['failed']}"
+        )
+    print(f"VIN present: {enriched['has_vin'].mean():.0%} of listings")
+    live_rate = inspect.signature(AsyncFetchEngine).parameters["rate"].default
+    print(
+        f"With the live defaults ({live_rate:g} request/s per host) a cold cache"
+        f" takes about {n / live_rate:.0f}s for {n} listings"
+    )
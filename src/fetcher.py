@@ -1,9 +1,12 @@
 import time
 import requests
 import random
-from bs4 import BeautifulSoup
 from typing import Optional
 from url_builder import build_search_url
+from parser.extractor import ExtractedPage, extract_page
+from http_cache import HttpCache
+from rate_control import AdaptiveRateController
+from metrics import count, instrument, observe
 import re
 
 # from parser.json_ld_parser import parse_search_page
@@ -20,19 +23,83 @@ HEADERS = {
 }
 
 
+@instrument("fetch_html", items=lambda html: html is not None)
 def fetch_html(
     url: str,
     session: requests.Session,
     timeout: int = 15,
+    cache: Optional[HttpCache] = None,
+    controller: Optional[AdaptiveRateController] = None,
+    spaced: bool = True,
 ) -> Optional[str]:
-    try:
-        response = session.get(url, headers=HEADERS, timeout=timeout, verify=False)
-        response.raise_for_status()
-        return response.text
-
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to fetch {url}: {e}")
-        return None
+    """
+    GET a page, via the response `cache` when one is given.
+    With a `controller`, requests are paced by it and transient failures
+    (429/5xx, timeouts, dropped connections) are retried; without one a
+    single attempt is made. Callers that space requests themselves pass
+    `spaced=False` (see AdaptiveRateController.wait).
+    """
+    entry = cache.lookup(url) if cache else None
+
+    if entry and entry["fresh"]:
+        cache.count("hits")
+        count("cache_hits")
+        cache.touch(url)
+        return entry["body"]
+
+    headers = HEADERS
+    if entry:
+        headers = {**HEADERS, **cache.conditional_headers(entry)}
+
+    attempt = 0
+    while True:
+        attempt += 1
+        status = None
+
+        if controller:
+            controller.wait(spaced=spaced)
+        started = time.monotonic()
+
+        try:
+            response = session.get(url, headers=headers, timeout=timeout, verify=False)
+            status = response.status_code
+            latency = time.monotonic() - started
+            observe("http_request", latency)
+            count("bytes_downloaded", len(response.content))
+
+            if controller:
+                controller.record(status, latency, response.headers.get("Retry-After"))
+
+            if entry and status == 304:
+                cache.count("revalidated")
+                count("cache_revalidated")
+                cache.touch(url, revalidated=True)
+                return entry["body"]
+
+            response.raise_for_status()
+
+            if cache:
+                cache.count("misses")
+                cache.store(url, response.text, response.headers)
+
+            return response.text
+
+        except requests.exceptions.RequestException as e:
+            if status is None:
+                latency = time.monotonic() - started
+                observe("http_request", latency)
+                if controller:
+                    controller.record(None, latency)
+
+            if controller and controller.should_retry(status, attempt):
+                count("retries")
+                print(f"[WARN] Retrying {url} (attempt {attempt + 1}): {e}")
+                controller.backoff(attempt)
+                continue
+
+            count("fetch_failures")
+            print(f"[ERROR] Failed to fetch {url}: {e}")
+            return None
 
 
 def is_zero_results(html: str) -> bool:
@@ -48,13 +115,10 @@ def is_zero_results(html: str) -> bool:
 
 
 # def detect_last_page(html: str) -> int:
-def detect_last_page(html: str):
-    soup = BeautifulSoup(html, "html.parser")
-
-    og_url_tag = soup.find("meta", property="og:url")
+def detect_last_page(html: str | ExtractedPage):
+    og_url = extract_page(html).og_url
 
-    if og_url_tag and "content" in og_url_tag.attrs:
-        og_url = og_url_tag["content"]
+    if og_url:
         match = re.search(r"page=(\d+)", og_url)
         if match:
             return int(match.group(1))
@@ -1,36 +1,206 @@
-import requests
+import sqlite3
 import xml.etree.ElementTree as ET
+from datetime import date
 from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import requests
+
+ECB_URL = "https://www.ecb.europa.eu/stats/policy_and_exchange_rates/euro_reference_exchange_rates/html/pln.xml"
+OBS_TAG = "{http://www.ecb.europa.eu/vocabulary/stats/exr/1}Obs"
+
+# iter_content turns connection errors mid-download into RequestException
+CHUNK_SIZE = 64 * 1024
+
+default_cache_path = Path.cwd().parent / Path("data/fx/ecb_pln_eur.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rates (date TEXT PRIMARY KEY, rate REAL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def observations(events) -> Iterator[tuple[str, float]]:
+    for _, elem in events:
+        if elem.tag == OBS_TAG:
+            value = elem.get("OBS_VALUE")
+            if value not in (None, "", "NaN"):
+                yield elem.get("TIME_PERIOD"), float(value)
+        elem.clear()
+
+
+def iter_observations(source) -> Iterator[tuple[str, float]]:
+    """
+    Stream (date, rate) pairs out of the ECB XML without building the tree.
+    `source` is a path, a binary file, or an iterable of byte chunks such as
+    Response.iter_content().
+    """
+    if isinstance(source, (str, Path)) or hasattr(source, "read"):
+        yield from observations(ET.iterparse(source, events=("end",)))
+        return
+
+    parser = ET.XMLPullParser(events=("end",))
+    for chunk in source:
+        parser.feed(chunk)
+        yield from observations(parser.read_events())
+    parser.close()
+    yield from observations(parser.read_events())
+
+
+def parse_latest(source) -> tuple[str, float]:
+    latest = None
+    for latest in iter_observations(source):
+        pass
+
+    if latest is None:
+        raise ValueError("No exchange rate data found")
+    return latest
+
+
+def open_ecb_stream(timeout: int = 10):
+    response = requests.get(ECB_URL, stream=True, timeout=timeout)
+    response.raise_for_status()  # Raise error if download fails
+    return response
 
 
 def fetch_rate():
     """Fetch latest PLN to EUR exchange rate from ECB XML data."""
-    # Download the XML file
-    url = "https://www.ecb.europa.eu/stats/policy_and_exchange_rates/euro_reference_exchange_rates/html/pln.xml"
-    response = requests.get(url)
-    response.raise_for_status()  # Raise error if download fails
+    with open_ecb_stream() as response:
+        return parse_latest(response.iter_content(CHUNK_SIZE))
 
-    # Parse XML
-    root = ET.fromstring(response.content)
 
-    # Define namespace (important for XML parsing)
-    ns = {"exr": "http://www.ecb.europa.eu/vocabulary/stats/exr/1"}
+class RateProvider:
+    """
+    PLN/EUR reference rates backed by a local SQLite cache keyed by date.
+    The ECB history is downloaded at most once per `max_age_days`; when the
+    download fails the cached rates are used as they are, so normalization
+    never blocks on the network. With nothing cached, `fallback_rate` is
+    used; without one, there is no rate to give and latest() raises.
+    """
 
-    # Find all Obs elements and get the last one (latest rate)
-    obs_elements = root.findall(".//exr:Obs", ns)
+    def __init__(
+        self,
+        cache_path: str | Path = default_cache_path,
+        max_age_days: int = 1,
+        fallback_rate: Optional[float] = None,
+    ):
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(cache_path)
+        self.conn.executescript(SCHEMA)
+        self.max_age_days = max_age_days
+        self.fallback_rate = fallback_rate
+        self.checked = False
 
-    # Clean up downloaded file
-    Path("pln_exchange_rates.xml").unlink(missing_ok=True)
+    def refreshed_on(self) -> Optional[date]:
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'refreshed_on'"
+        ).fetchone()
+        return date.fromisoformat(row[0]) if row else None
 
-    if obs_elements:
-        latest_obs = obs_elements[-1]  # Last element = latest date
-        date = latest_obs.get("TIME_PERIOD")
-        rate = float(latest_obs.get("OBS_VALUE"))
-        return date, rate
-    else:
-        raise ValueError("No exchange rate data found")
+    def refresh(self, source=None):
+        """Load observations newer than the cache from `source` or the ECB."""
+        (newest,) = self.conn.execute("SELECT MAX(date) FROM rates").fetchone()
+        response = None
+
+        if source is None:
+            response = open_ecb_stream()
+            source = response.iter_content(CHUNK_SIZE)
+
+        try:
+            rows = [
+                (obs_date, rate)
+                for obs_date, rate in iter_observations(source)
+                if newest is None or obs_date > newest
+            ]
+        finally:
+            if response is not None:
+                response.close()
+
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO rates VALUES (?, ?)", rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('refreshed_on', ?)",
+                (date.today().isoformat(),),
+            )
+        return len(rows)
+
+    def ensure_fresh(self):
+        # one download attempt per provider, even when it fails
+        if self.checked:
+            return
+        self.checked = True
+
+        refreshed = self.refreshed_on()
+        if refreshed and (date.today() - refreshed).days < self.max_age_days:
+            return
+
+        # A dropped connection, a truncated or malformed file, or a value
+        # that is not a number: none of them may stop normalization
+        try:
+            added = self.refresh()
+            print(f"[INFO] ECB rates refreshed: {added} new observations")
+        except (requests.exceptions.RequestException, ET.ParseError, ValueError) as e:
+            print(f"[WARN] ECB rates unavailable, using cached rates: {e}")
+
+    def latest(self) -> tuple[Optional[str], float]:
+        self.ensure_fresh()
+        row = self.conn.execute(
+            "SELECT date, rate FROM rates ORDER BY date DESC LIMIT 1"
+        ).fetchone()
+
+        if row:
+            return row
+        if self.fallback_rate is not None:
+            print(f"[WARN] No cached ECB rate, using fallback {self.fallback_rate}")
+            return None, self.fallback_rate
+        raise RuntimeError(
+            "No PLN to EUR rate: the ECB download failed, nothing is cached"
+            ' and no fallback rate is set ("fallback_eur_rate" in config.json)'
+        )
+
+    def history(self) -> pd.DataFrame:
+        self.ensure_fresh()
+        rates = pd.read_sql_query(
+            "SELECT date, rate FROM rates ORDER BY date", self.conn
+        )
+        rates["date"] = pd.to_datetime(rates["date"])
+        return rates
+
+    def rates_for(self, dates: pd.Series) -> pd.Series:
+        """
+        Rate in force on each date (the last ECB fixing on or before it),
+        looked up for the whole column with one merge_asof.
+        """
+        history = self.history()
+        if history.empty:
+            return pd.Series(self.latest()[1], index=dates.index, dtype="float64")
+
+        days = pd.to_datetime(dates, utc=True).dt.tz_localize(None).dt.normalize()
+        lookup = pd.DataFrame(
+            {"date": days.astype("datetime64[ns]").to_numpy(), "row": range(len(days))}
+        )
+        matched = pd.merge_asof(
+            lookup.dropna(subset=["date"]).sort_values("date"),
+            history.astype({"date": "datetime64[ns]"}),
+            on="date",
+            direction="backward",
+        )
+
+        rates = np.full(len(days), np.nan)
+        # dates older than the whole history take its first fixing
+        rates[matched["row"].to_numpy()] = (
+            matched["rate"].fillna(history["rate"].iloc[0]).to_numpy()
+        )
+        return pd.Series(rates, index=dates.index)
+
+    def close(self):
+        self.conn.close()
 
 
 if __name__ == "__main__":
-    date, rate = fetch_rate()
-    print(f"Latest PLN to EUR exchange rate on {date} is {rate}")
+    provider = RateProvider()
+    rate_date, rate = provider.latest()
+    print(f"Latest PLN to EUR exchange rate on {rate_date} is {rate}")
+    provider.close()
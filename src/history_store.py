@@ -0,0 +1,293 @@
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+default_history_path = Path.cwd().parent / Path("data/state/listing_history.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    id TEXT PRIMARY KEY,
+    brand TEXT,
+    model TEXT,
+    title TEXT,
+    url TEXT,
+    date_added TEXT,
+    price REAL,
+    mileage INTEGER,
+    priceevaluation TEXT,
+    first_seen TEXT,
+    last_seen TEXT,
+    disappeared_at TEXT
+);
+CREATE INDEX IF NOT EXISTS listings_model ON listings (brand, model);
+CREATE INDEX IF NOT EXISTS listings_disappeared ON listings (disappeared_at);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    id TEXT,
+    scrape_date TEXT,
+    price REAL,
+    mileage INTEGER,
+    priceevaluation TEXT,
+    prev_price REAL,
+    PRIMARY KEY (id, scrape_date)
+);
+CREATE INDEX IF NOT EXISTS snapshots_date ON snapshots (scrape_date);
+
+CREATE TEMP TABLE IF NOT EXISTS incoming (
+    id TEXT PRIMARY KEY,
+    brand TEXT,
+    model TEXT,
+    title TEXT,
+    url TEXT,
+    date_added TEXT,
+    price REAL,
+    mileage INTEGER,
+    priceevaluation TEXT
+);
+
+CREATE TEMP TABLE IF NOT EXISTS complete_models (brand TEXT, model TEXT);
+"""
+
+INCOMING_COLUMNS = [
+    "id",
+    "brand",
+    "model",
+    "title",
+    "url",
+    "date_added",
+    "price",
+    "mileage",
+    "priceevaluation",
+]
+
+# A snapshot row for every listing that is new or whose tracked fields moved
+INSERT_SNAPSHOTS = """
+INSERT INTO snapshots (id, scrape_date, price, mileage, priceevaluation, prev_price)
+SELECT i.id, :scrape_date, i.price, i.mileage, i.priceevaluation, l.price
+FROM incoming i LEFT JOIN listings l ON l.id = i.id
+WHERE l.id IS NULL
+   OR l.price IS NOT i.price
+   OR l.mileage IS NOT i.mileage
+   OR l.priceevaluation IS NOT i.priceevaluation
+ON CONFLICT (id, scrape_date) DO UPDATE SET
+    price = excluded.price,
+    mileage = excluded.mileage,
+    priceevaluation = excluded.priceevaluation
+"""
+
+UPSERT_LISTINGS = """
+INSERT INTO listings (
+    id, brand, model, title, url, date_added,
+    price, mileage, priceevaluation, first_seen, last_seen
+)
+SELECT id, brand, model, title, url, date_added,
+       price, mileage, priceevaluation, :scrape_date, :scrape_date
+FROM incoming WHERE true
+ON CONFLICT (id) DO UPDATE SET
+    title = excluded.title,
+    url = excluded.url,
+    price = excluded.price,
+    mileage = excluded.mileage,
+    priceevaluation = excluded.priceevaluation,
+    last_seen = excluded.last_seen,
+    disappeared_at = NULL
+"""
+
+MARK_DISAPPEARED = """
+UPDATE listings SET disappeared_at = :scrape_date
+WHERE (brand, model) IN (SELECT brand, model FROM complete_models)
+  AND last_seen < :scrape_date
+  AND disappeared_at IS NULL
+"""
+
+
+def day_key(day: date) -> str:
+    return day.strftime("%Y%m%d")
+
+
+class ListingHistoryStore:
+    """
+    Cross-day history of every listing, keyed by id. The listings table holds
+    each listing's current state; snapshots is append-only and gets a row
+    only when a listing first appears or its price, mileage or price
+    evaluation changes. Ingesting a run touches only that run's ids, and the
+    queries read date-indexed rows, so neither slows down as days pile up.
+    It is the one store of record: incremental crawls read it to tell new
+    or repriced listings from known ones (count_fresh).
+    """
+
+    def __init__(self, path: str | Path = default_history_path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Jobs running side by side in the backend share the file
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.executescript(SCHEMA)
+
+    def ingest(
+        self,
+        df: pd.DataFrame,
+        scrape_date: str,
+        complete_models: Iterable[tuple[str, str]] = (),
+    ):
+        """
+        Record one run's raw listings under `scrape_date` (YYYYMMDD).
+        Listings of `complete_models`, (brand, model) pairs whose crawl
+        reached the last page, that this run did not see are marked as
+        disappeared; listings of every other model are left alone.
+        Returns (snapshots written, listings marked disappeared).
+        """
+        incoming = df.reindex(columns=INCOMING_COLUMNS).drop_duplicates("id")
+        incoming["id"] = incoming["id"].astype(str)
+        added = incoming["date_added"]
+        incoming["date_added"] = added.astype(str).where(added.notna(), None)
+        rows = incoming.astype(object).where(incoming.notna(), None)
+        params = {"scrape_date": scrape_date}
+
+        with self.conn:
+            self.conn.execute("DELETE FROM incoming")
+            self.conn.executemany(
+                f"INSERT INTO incoming VALUES ({','.join('?' * len(INCOMING_COLUMNS))})",
+                rows.itertuples(index=False, name=None),
+            )
+            written = self.conn.execute(INSERT_SNAPSHOTS, params).rowcount
+            self.conn.execute(UPSERT_LISTINGS, params)
+            self.conn.execute("DELETE FROM complete_models")
+            self.conn.executemany(
+                "INSERT INTO complete_models VALUES (?, ?)", set(complete_models)
+            )
+            gone = self.conn.execute(MARK_DISAPPEARED, params).rowcount
+            self.conn.execute("DELETE FROM incoming")
+            self.conn.execute("DELETE FROM complete_models")
+
+        return written, gone
+
+    def count_fresh(self, listings: list[dict]) -> int:
+        """
+        How many of one page's listings are new or changed price since the
+        last ingest; an incremental crawl stops paging at a page with none.
+        """
+        if not listings:
+            return 0
+
+        ids = [str(listing["id"]) for listing in listings]
+        placeholders = ",".join("?" * len(ids))
+        known = dict(
+            self.conn.execute(
+                f"SELECT id, price FROM listings WHERE id IN ({placeholders})", ids
+            )
+        )
+        return sum(
+            listing_id not in known or known[listing_id] != listing["price"]
+            for listing_id, listing in zip(ids, listings)
+        )
+
+    def price_drops(self, days: int = 7, today: date | None = None) -> pd.DataFrame:
+        """Listings whose price fell in the last `days` days, biggest cut first."""
+        since = day_key((today or date.today()) - timedelta(days=days))
+        return pd.read_sql_query(
+            """
+            SELECT s.id, l.brand, l.model, l.title, s.scrape_date,
+                   s.prev_price, s.price, s.price - s.prev_price AS change,
+                   l.url
+            FROM snapshots s JOIN listings l ON l.id = s.id
+            WHERE s.scrape_date >= ? AND s.price < s.prev_price
+            ORDER BY change
+            """,
+            self.conn,
+            params=(since,),
+        )
+
+    def disappeared(self, days: int = 7, today: date | None = None) -> pd.DataFrame:
+        """Listings that dropped out of the results in the last `days` days."""
+        since = day_key((today or date.today()) - timedelta(days=days))
+        return pd.read_sql_query(
+            """
+            SELECT id, brand, model, title, price, first_seen, last_seen,
+                   disappeared_at, url
+            FROM listings
+            WHERE disappeared_at >= ?
+            ORDER BY disappeared_at DESC
+            """,
+            self.conn,
+            params=(since,),
+        )
+
+    def history(self, listing_id: str) -> pd.DataFrame:
+        """Every recorded state of one listing, with its days listed at the time."""
+        snapshots = pd.read_sql_query(
+            """
+            SELECT s.scrape_date, s.price, s.mileage, s.priceevaluation,
+                   l.date_added
+            FROM snapshots s JOIN listings l ON l.id = s.id
+            WHERE s.id = ?
+            ORDER BY s.scrape_date
+            """,
+            self.conn,
+            params=(str(listing_id),),
+        )
+        scraped = pd.to_datetime(snapshots["scrape_date"], format="%Y%m%d", utc=True)
+        added = pd.to_datetime(snapshots.pop("date_added"), utc=True, errors="coerce")
+        snapshots["days_listed"] = (scraped - added).dt.days
+        return snapshots
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from storage import read_listings
+
+    arg_parser = argparse.ArgumentParser(description="Listing history queries")
+    arg_parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help="ingest every scrape_date in data/parquet/raw, oldest first",
+    )
+    arg_parser.add_argument(
+        "--assume-complete",
+        action="store_true",
+        help="treat every backfilled model as fully crawled, marking the"
+        " listings a day did not see as disappeared",
+    )
+    arg_parser.add_argument("--days", type=int, default=7)
+    arg_parser.add_argument("--listing", help="print one listing's history")
+    args = arg_parser.parse_args()
+
+    store = ListingHistoryStore()
+
+    if args.backfill:
+        raw_dir = Path.cwd().parent / Path("data/parquet/raw")
+        scrape_dates = sorted(
+            p.name.split("=", 1)[1] for p in raw_dir.glob("scrape_date=*")
+        )
+        for scrape_date in scrape_dates:
+            df = read_listings(raw_dir, filters=[("scrape_date", "==", scrape_date)])
+            # Partitions do not record whether each model's crawl finished
+            complete = []
+            if args.assume_complete:
+                complete = (
+                    df[["brand", "model"]]
+                    .drop_duplicates()
+                    .itertuples(index=False, name=None)
+                )
+            written, gone = store.ingest(df, scrape_date, complete)
+            print(f"[INFO] {scrape_date}: {written} snapshots, {gone} disappeared")
+
+    if args.listing:
+        print(store.history(args.listing).to_string(index=False))
+    else:
+        drops = store.price_drops(args.days)
+        print(f"\n[RESULT] {len(drops)} price drops in the last {args.days} days")
+        print(drops.head(20).to_string(index=False))
+
+        gone = store.disappeared(args.days)
+        print(
+            f"\n[RESULT] {len(gone)} listings disappeared in the last {args.days} days"
+        )
+        print(gone.head(20).to_string(index=False))
+
+    store.close()
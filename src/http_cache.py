@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL,
+    last_access REAL,
+    size INTEGER
+);
+"""
+
+
+class HttpCache:
+    """
+    On-disk response cache for fetcher.fetch_html.
+    Bodies are stored gzip-compressed next to a SQLite index holding the
+    validators (ETag / Last-Modified). Entries younger than `ttl` are served
+    without touching the network; older ones are revalidated with a
+    conditional GET. The least recently used entries are evicted once the
+    compressed bodies exceed `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        ttl: float = 6 * 3600,
+        max_bytes: int = 200 * 1024 * 1024,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            self.cache_dir / "index.sqlite", check_same_thread=False
+        )
+        self.conn.executescript(SCHEMA)
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def body_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.html.gz"
+
+    def lookup(self, url: str) -> Optional[dict]:
+        """Return the cached entry for `url` (with its body), or None."""
+        key = self.key(url)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, fetched_at FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        try:
+            body = gzip.decompress(self.body_path(key).read_bytes()).decode("utf-8")
+        except (OSError, EOFError):
+            return None
+
+        etag, last_modified, fetched_at = row
+        return {
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() - fetched_at < self.ttl,
+        }
+
+    def conditional_headers(self, entry: dict) -> dict:
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def touch(self, url: str, revalidated: bool = False):
+        now = time.time()
+        with self.lock, self.conn:
+            if revalidated:
+                self.conn.execute(
+                    "UPDATE entries SET fetched_at = ?, last_access = ? WHERE key = ?",
+                    (now, now, self.key(url)),
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE key = ?",
+                    (now, self.key(url)),
+                )
+
+    def store(self, url: str, body: str, headers):
+        key = self.key(url)
+        data = gzip.compress(body.encode("utf-8"), compresslevel=6)
+        self.body_path(key).write_bytes(data)
+
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    url,
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    now,
+                    now,
+                    len(data),
+                ),
+            )
+        self.evict()
+
+    def evict(self):
+        with self.lock, self.conn:
+            (total,) = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return
+
+            for key, size in self.conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access"
+            ).fetchall():
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.body_path(key).unlink(missing_ok=True)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def count(self, outcome: str):
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def report(self) -> str:
+        return (
+            f"HTTP cache: {self.hits} hits, {self.revalidated} revalidated (304), "
+            f"{self.misses} misses"
+        )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,268 @@
+import bisect
+import functools
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper bounds (seconds) of the latency histogram buckets; the last is +Inf
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RunMetrics:
+    """
+    Timers and counters for one run. Every stage keeps its call count,
+    total time, items produced, a latency histogram and the process peak
+    RSS seen when it last finished; counters hold totals such as bytes
+    downloaded and retries. Thread-safe: the async engine's workers record
+    into the same collector.
+    """
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id
+        self.started_at = datetime.utcnow().isoformat()
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+
+    def _stage(self, stage: str) -> dict:
+        if stage not in self.stages:
+            self.stages[stage] = {
+                "calls": 0,
+                "seconds": 0.0,
+                "items": 0,
+                "histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+                "peak_rss_bytes": None,
+            }
+        return self.stages[stage]
+
+    def observe(self, stage: str, seconds: float, items: int = 0, rss: bool = True):
+        peak = peak_rss_bytes() if rss else None
+        with self.lock:
+            stats = self._stage(stage)
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["items"] += items
+            stats["histogram"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            if peak is not None:
+                stats["peak_rss_bytes"] = max(stats["peak_rss_bytes"] or 0, peak)
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self) -> dict:
+        """The run as a JSON-friendly dict."""
+        with self.lock:
+            stages = {
+                name: {
+                    "calls": stats["calls"],
+                    "seconds": round(stats["seconds"], 4),
+                    "mean_ms": round(stats["seconds"] / stats["calls"] * 1000, 3),
+                    "items": stats["items"],
+                    "items_per_s": round(
+                        stats["items"] / max(stats["seconds"], 1e-9), 1
+                    ),
+                    "histogram": list(stats["histogram"]),
+                    "peak_rss_bytes": stats["peak_rss_bytes"],
+                }
+                for name, stats in self.stages.items()
+            }
+            counters = dict(self.counters)
+
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "elapsed_s": round(time.perf_counter() - self.started, 3),
+            "buckets": list(LATENCY_BUCKETS),
+            "stages": stages,
+            "counters": counters,
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+    def merge(self, report: dict):
+        """Add a finished run's report(), e.g. into a process-wide total."""
+        with self.lock:
+            for name, stats in report["stages"].items():
+                total = self._stage(name)
+                total["calls"] += stats["calls"]
+                total["seconds"] += stats["seconds"]
+                total["items"] += stats["items"]
+                for i, n in enumerate(stats["histogram"]):
+                    total["histogram"][i] += n
+                if stats["peak_rss_bytes"] is not None:
+                    total["peak_rss_bytes"] = max(
+                        total["peak_rss_bytes"] or 0, stats["peak_rss_bytes"]
+                    )
+            for name, n in report["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            self.counters["runs"] = self.counters.get("runs", 0) + 1
+
+    def to_prometheus(self, prefix: str = "otomoto") -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per call of a pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        with self.lock:
+            for name, stats in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, n in zip(
+                    [*map(str, LATENCY_BUCKETS), "+Inf"], stats["histogram"]
+                ):
+                    cumulative += n
+                    lines.append(
+                        f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}}'
+                        f" {cumulative}"
+                    )
+                lines.append(
+                    f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stats["seconds"]}'
+                )
+                lines.append(
+                    f'{prefix}_stage_seconds_count{{stage="{name}"}} {stats["calls"]}'
+                )
+
+            lines.append(f"# TYPE {prefix}_stage_items_total counter")
+            for name, stats in sorted(self.stages.items()):
+                lines.append(
+                    f'{prefix}_stage_items_total{{stage="{name}"}} {stats["items"]}'
+                )
+
+            for name, n in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {n}")
+
+        peak = peak_rss_bytes()
+        if peak is not None:
+            lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+            lines.append(f"{prefix}_peak_rss_bytes {peak}")
+
+        return "\n".join(lines) + "\n"
+
+
+# The collector of the run in progress, None when metrics are off. A context
+# variable, so concurrent runs in one process (backend jobs) stay apart;
+# threads started for a run must copy the context to record into it.
+current_metrics: ContextVar[Optional[RunMetrics]] = ContextVar(
+    "current_metrics", default=None
+)
+
+
+def observe(stage: str, seconds: float, items: int = 0):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.observe(stage, seconds, items, rss=False)
+
+
+def count(name: str, n: int = 1):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.count(name, n)
+
+
+def instrument(stage: str, items: Optional[Callable] = None):
+    """
+    Time every call of the decorated function as `stage`; `items(result)`
+    gives the rows it produced. With no collector active the only cost is
+    one context variable lookup.
+    """
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = current_metrics.get()
+            if metrics is None:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                metrics.count(f"{stage}_errors")
+                raise
+            metrics.observe(
+                stage,
+                time.perf_counter() - start,
+                int(items(result)) if items else 0,
+            )
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+if __name__ == "__main__":
+    import argparse
+
+    # The parsers record into the imported module, not this __main__ copy
+    from metrics import RunMetrics, current_metrics
+    from parser.extractor import ExtractedPage, extract_page
+    from parser.graphql_parser import parse_graphql
+    from parser.json_ld_parser import parse_json_ld
+    from parser.merger import merge_jsonld_and_graphql
+    from synthetic_pages import make_search_page
+
+    arg_parser = argparse.ArgumentParser(
+        description="Parsing time without instrumentation, with metrics off and on"
+    )
+    arg_parser.add_argument("--pages", type=int, default=200)
+    arg_parser.add_argument("--repeat", type=int, default=7)
+    args = arg_parser.parse_args()
+
+    pages = [
+        make_search_page("Volkswagen", "Taigo", page=i + 1, last_page=args.pages)
+        for i in range(args.pages)
+    ]
+
+    def parse_plain(html: str):
+        # The same pipeline with every decorator peeled off
+        page = ExtractedPage(html)
+        return merge_jsonld_and_graphql.__wrapped__(
+            parse_json_ld.__wrapped__(page), parse_graphql.__wrapped__(page)
+        )
+
+    def parse_instrumented(html: str):
+        page = extract_page(html)
+        return merge_jsonld_and_graphql(parse_json_ld(page), parse_graphql(page))
+
+    metrics = RunMetrics("bench")
+    modes = {
+        "no decorators": (parse_plain, None),
+        "metrics off": (parse_instrumented, None),
+        "metrics on": (parse_instrumented, metrics),
+    }
+    best = dict.fromkeys(modes, float("inf"))
+
+    # Interleaved, so drift on the machine hits every mode alike
+    for _ in range(args.repeat):
+        for name, (parse, collector) in modes.items():
+            current_metrics.set(collector)
+            start = time.perf_counter()
+            for html in pages:
+                parse(html)
+            best[name] = min(best[name], time.perf_counter() - start)
+    current_metrics.set(None)
+
+    baseline = best["no decorators"]
+    print(f"\n[RESULT] {args.pages} pages, best of {args.repeat}")
+    for name, seconds in best.items():
+        print(f"{name:<14} {seconds:.4f}s ({(seconds - baseline) / baseline:+.1%})")
+    for name, stats in metrics.report()["stages"].items():
+        print(f"  {name:<14} {stats['calls']:6d} calls  {stats['mean_ms']:8.3f} ms")
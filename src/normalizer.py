@@ -1,8 +1,11 @@
 import re
 from typing import Dict, Any
+import numpy as np
 import pandas as pd
-from get_eur import fetch_rate
+from get_eur import RateProvider
+from metrics import instrument
 from datetime import datetime
+from pathlib import Path
 
 # =========================
 # CONFIG
@@ -27,11 +30,99 @@ zone_code = {
     "podkarpackie": "S",
 }
 
+PRICE_PER_HP_LABELS = ["very_low", "low", "avg", "high", "very_high"]
+
+# Output columns, in order
+PROCESSED_COLUMNS = [
+    "id",
+    "date_added",
+    "current_date",
+    "days_listed",
+    "title",
+    "brand",
+    "model",
+    "version",
+    "year",
+    "mileage",
+    "price_pln",
+    "price_eur",
+    "pln_eur_rate",
+    "engine_capacity",
+    "engine_power",
+    "engine_family",
+    "engine_size_l",
+    "drivetrain",
+    "trim",
+    "feature_flags",
+    "gearbox",
+    "fuel_type",
+    "country_code",
+    "country_origin",
+    "city",
+    "big_city",
+    "region",
+    "zone_code",
+    "region_price_density",
+    "seller_name",
+    "seller_site",
+    "short_description",
+    "bump_up",
+    "export_olx",
+    "priceevaluation",
+    "cepikVerified",
+    "price_per_km",
+    "price_per_hp",
+    "scrape_year",
+    "car_age",
+    "price_per_year",
+    "value_index",
+    "price_per_hp_bucket",
+    "hp_per_liter",
+    "km_per_year",
+    "price_bucket",
+    "mileage_bucket",
+    "polish_origin",
+    "is_dealer",
+    "risk_score",
+    "url",
+]
+
+# Low-cardinality text stored as categoricals by shrink_dtypes
+CATEGORY_COLUMNS = [
+    "brand",
+    "model",
+    "fuel_type",
+    "gearbox",
+    "country_code",
+    "country_origin",
+    "city",
+    "region",
+    "zone_code",
+    "engine_family",
+    "drivetrain",
+    "trim",
+    "priceevaluation",
+]
+
+# The same for every row of a run; shrink_dtypes keeps them in df.attrs
+RUN_COLUMNS = ["current_date", "scrape_year"]
+
 # =========================
 # HELPERS
 # =========================
 
 
+NUMERIC_PART = re.compile(r"^\d+(?:\.\d+)?$")
+
+VERSION_COLUMNS = [
+    "engine_size_l",
+    "engine_family",
+    "drivetrain",
+    "trim",
+    "feature_flags",
+]
+
+
 def safe_int(val):
     try:
         return int(val)
@@ -55,17 +146,15 @@ def parse_version_slug(version: str) -> Dict[str, Any]:
     # Try to find engine size as a float (e.g., 1.3, 1.5, 2.0)
     engine_size = None
     for i, p in enumerate(parts):
-        if re.match(r"^\d+(?:\.\d+)?$", p):
+        if NUMERIC_PART.match(p):
             try:
                 size = float(p)
                 if size <= 2.0:  # Only accept reasonable engine sizes
                     # But check if next part is also a number (e.g., 1.3 → 1 and 3)
-                    if i + 1 < len(parts) and re.match(
-                        r"^\d+(?:\.\d+)?$", parts[i + 1]
-                    ):
+                    if i + 1 < len(parts) and NUMERIC_PART.match(parts[i + 1]):
                         # Check if it's a decimal-like pair (e.g., 1.3)
                         next_p = parts[i + 1]
-                        if re.match(r"^\d+(?:\.\d+)?$", next_p):
+                        if NUMERIC_PART.match(next_p):
                             # Try to combine: 1.3 → 1.3
                             combined = f"{p}.{next_p}"
                             try:
@@ -120,17 +209,16 @@ def parse_version_slug(version: str) -> Dict[str, Any]:
         if (
             p not in engine_families
             and p not in drivetrain_map
-            and not re.match(r"^\d+(?:\.\d+)?$", p)
+            and not NUMERIC_PART.match(p)
         ):
             trim = p.title()
             break
 
     # Features: everything else
     features = []
+    assigned = [str(engine_size), engine_family, drivetrain]
     for p in parts:
-        if p not in [str(engine_size), engine_family, drivetrain] and not re.match(
-            r"^\d+(?:\.\d+)?$", p
-        ):
+        if p not in assigned and not NUMERIC_PART.match(p):
             features.append(p)
 
     return {
@@ -142,15 +230,36 @@ def parse_version_slug(version: str) -> Dict[str, Any]:
     }
 
 
+def parse_version_column(versions: pd.Series) -> pd.DataFrame:
+    """
+    parse_version_slug over a whole column, computed once per distinct slug
+    (a few hundred at most) and broadcast back to the rows by position.
+    """
+    codes, uniques = pd.factorize(versions)
+    # missing values get code -1, which take() maps to the trailing None row
+    parsed = pd.DataFrame(
+        [parse_version_slug(v) for v in uniques] + [parse_version_slug(None)],
+        columns=VERSION_COLUMNS,
+    )
+
+    result = parsed.take(codes)
+    result.index = versions.index
+    return result
+
+
 # =========================
 # MAIN NORMALIZER
 # =========================
 
 
-def normalize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-
-    df = df.copy()
+def normalize_rows(
+    df: pd.DataFrame,
+    rates: RateProvider | None = None,
+    historical_rates: bool = False,
+) -> pd.DataFrame:
+    """Every processed column that depends on its own row only."""
     # ---- renaming ----
+    # rename returns a new frame, so the caller's is never modified
     df = df.rename(columns={"price": "price_pln"})
 
     # ---- typing ----
@@ -195,40 +304,36 @@ def normalize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     df["zone_code"] = df["region"].map(zone_code).fillna("UNK")
 
     # ---- currency conversion ----
-    date, eur_rate = fetch_rate()
-    print(f"Latest PLN to EUR exchange rate on {date} is {eur_rate}")
+    # cached ECB rates; the network is only hit once a day, if at all
+    provider = rates or RateProvider()
 
-    df["pln_eur_rate"] = eur_rate
-    df["price_eur"] = (df["price_pln"] / eur_rate).round(0)
+    if historical_rates:
+        # each listing at the rate in force on its date_added
+        df["pln_eur_rate"] = provider.rates_for(df["date_added"])
+        print("Converted prices at each listing's date_added ECB rate")
+    else:
+        date, eur_rate = provider.latest()
+        if date is not None:
+            print(f"Latest PLN to EUR exchange rate on {date} is {eur_rate}")
+        df["pln_eur_rate"] = eur_rate
+
+    if rates is None:
+        provider.close()
+
+    df["price_eur"] = (df["price_pln"] / df["pln_eur_rate"]).round(0)
 
     # ---- version parsing ----
-    parsed_versions = df["version"].apply(parse_version_slug).apply(pd.Series)
-    df = pd.concat([df, parsed_versions], axis=1)
+    parsed_versions = parse_version_column(df["version"])
+    df[VERSION_COLUMNS] = parsed_versions
 
     # ---- convenience columns ----
     df["price_per_km"] = (df["price_pln"] / df["mileage"]).round(2)
     df["price_per_hp"] = (df["price_pln"] / df["engine_power"]).round(0)
-    df["scrape_year"] = datetime.now().year
-    df["car_age"] = df["scrape_year"] - df["year"]
-    df["price_per_year"] = (df["price_pln"] / df["car_age"]).round(0)
-
-    df["value_index"] = (
-        (df["price_per_km"] * 0.4)
-        + (df["price_per_hp"] * 0.3)
-        + (df["price_per_year"] * 0.3)
-    ).round(0)
-
-    # Market deviation proxy
-    df["price_per_hp_bucket"] = pd.qcut(
-        df["price_per_hp"], 5, labels=["very_low", "low", "avg", "high", "very_high"]
-    )
+    df = add_age_columns(df, datetime.now().year)
 
     # Power density - detects modern turbo vs older naturally aspirated
     df["hp_per_liter"] = (df["engine_power"] / (df["engine_capacity"] / 1000)).round(1)
 
-    # Shows how intensively the car was used annually
-    df["km_per_year"] = (df["mileage"] / df["car_age"]).round(0)
-
     df["price_bucket"] = pd.cut(
         df["price_pln"],
         bins=[0, 55000, 65000, 75000, 90000],
@@ -274,68 +379,526 @@ def normalize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
 
     df["big_city"] = df["city"].str.lower().isin(big_cities)
 
+    return df
+
+
+def add_age_columns(df: pd.DataFrame, scrape_year: int) -> pd.DataFrame:
+    """Columns that move with the calendar year of the scrape."""
+    df["scrape_year"] = scrape_year
+    df["car_age"] = df["scrape_year"] - df["year"]
+    df["price_per_year"] = (df["price_pln"] / df["car_age"]).round(0)
+
+    df["value_index"] = (
+        (df["price_per_km"] * 0.4)
+        + (df["price_per_hp"] * 0.3)
+        + (df["price_per_year"] * 0.3)
+    ).round(0)
+
+    # Shows how intensively the car was used annually
+    df["km_per_year"] = (df["mileage"] / df["car_age"]).round(0)
+    return df
+
+
+def add_dataset_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Columns computed over the whole dataset (see DatasetStats)."""
+    # Market deviation proxy
+    df["price_per_hp_bucket"] = pd.qcut(
+        df["price_per_hp"], 5, labels=PRICE_PER_HP_LABELS
+    )
     df["region_price_density"] = df.groupby("region")["price_pln"].transform("median")
+    return df
+
+
+def shrink_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The same processed frame in less memory: CATEGORY_COLUMNS as
+    categoricals, numbers in the smallest type that holds them (ratios as
+    float32) and RUN_COLUMNS moved from every row into df.attrs.
+    """
+    run_values = {}
+    if len(df):
+        for col in RUN_COLUMNS:
+            if col in df.columns:
+                value = df[col].iloc[0]
+                # attrs travel in the Parquet metadata as JSON
+                run_values[col] = (
+                    value.isoformat() if isinstance(value, pd.Timestamp) else int(value)
+                )
+    df = df.drop(columns=[c for c in RUN_COLUMNS if c in df.columns])
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    for col in df.select_dtypes("float").columns:
+        # ids past 2**24 would lose digits as float32
+        if col != "id":
+            df[col] = pd.to_numeric(df[col], downcast="float")
+    for col in df.select_dtypes("integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+
+    df.attrs.update(run_values)
+    return df
+
+
+@instrument("normalize", items=len)
+def normalize_dataframe(
+    df: pd.DataFrame,
+    rates: RateProvider | None = None,
+    historical_rates: bool = False,
+    lean: bool = False,
+) -> pd.DataFrame:
+    """The processed listings; `lean` returns them through shrink_dtypes."""
+    df = normalize_rows(df, rates, historical_rates)
+    df = add_dataset_columns(df)
+    df = df[PROCESSED_COLUMNS]
+    return shrink_dtypes(df) if lean else df
 
-    # # ---- ordering ----
-    preferred_order = [
-        "id",
-        "date_added",
-        "current_date",
-        "days_listed",
-        "title",
-        "brand",
-        "model",
-        "version",
-        "year",
-        "mileage",
-        "price_pln",
-        "price_eur",
-        "pln_eur_rate",
-        "engine_capacity",
-        "engine_power",
-        "engine_family",
-        "engine_size_l",
-        "drivetrain",
-        "trim",
-        "feature_flags",
-        "gearbox",
-        "fuel_type",
-        "country_code",
-        "country_origin",
-        "city",
-        "big_city",
-        "region",
-        "zone_code",
-        "region_price_density",
-        "seller_name",
-        "seller_site",
-        "short_description",
-        "bump_up",
-        "export_olx",
-        "priceevaluation",
-        "cepikVerified",
-        "price_per_km",
-        "price_per_hp",
-        "scrape_year",
-        "car_age",
-        "price_per_year",
-        "value_index",
-        "price_per_hp_bucket",
-        "hp_per_liter",
-        "km_per_year",
-        "price_bucket",
-        "mileage_bucket",
-        "polish_origin",
-        "is_dealer",
-        "risk_score",
-        "url",
+
+# =========================
+# INCREMENTAL NORMALIZER
+# =========================
+
+
+def _order_statistics(counts: pd.Series, positions: np.ndarray) -> np.ndarray:
+    """Values at `positions` of the sorted sample that `counts` describes."""
+    cumulative = counts.to_numpy().cumsum()
+    return counts.index.to_numpy(dtype=float)[
+        np.searchsorted(cumulative, positions, side="right")
     ]
 
-    return df[preferred_order]
+
+def quantiles_from_counts(counts: pd.Series, quantiles: np.ndarray) -> np.ndarray:
+    """
+    numpy's "linear" quantiles of the sample summarised by `counts` (sorted
+    value -> number of rows), with numpy's exact arithmetic so the edges
+    match pd.qcut on the rows themselves.
+    """
+    n = int(counts.sum())
+    virtual = (n - 1) * quantiles
+    previous = np.floor(virtual)
+    following = previous + 1
+    # numpy clamps to the last and the first row the same way
+    previous[virtual >= n - 1] = following[virtual >= n - 1] = -1
+    previous[virtual < 0] = following[virtual < 0] = 0
+    gamma = virtual - previous
+
+    a = _order_statistics(counts, np.where(previous < 0, n - 1, previous))
+    b = _order_statistics(counts, np.where(following < 0, n - 1, following))
+    diff = b - a
+    lerp = a + diff * gamma
+    return np.where(gamma >= 0.5, b - diff * (1 - gamma), lerp)
+
+
+def qcut_quantiles(q: int) -> np.ndarray:
+    # the quantiles pd.qcut asks Series.quantile for
+    quantiles = np.linspace(0, 1, q + 1)
+    np.putmask(quantiles, q * quantiles != np.arange(q + 1), np.nextafter(quantiles, 1))
+    return quantiles
+
+
+def median_from_counts(counts: pd.Series) -> float:
+    n = int(counts.sum())
+    middle = _order_statistics(counts, np.array([(n - 1) // 2, n // 2]))
+    return middle[0] if n % 2 else (middle[0] + middle[1]) / 2
+
+
+class DatasetStats:
+    """
+    The aggregates behind the dataset-wide columns, kept as value counts so
+    rows can be added and removed without rescanning the dataset:
+    price_per_hp for the price_per_hp_bucket quintiles and price_pln per
+    region for region_price_density. `edges` and `medians` hold what the
+    last refresh() computed, i.e. what the current columns were built from,
+    and `rows` how many rows the counts were taken over.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.price_per_hp = pd.Series(dtype="int64")
+        self.region_prices = pd.Series(
+            dtype="int64",
+            index=pd.MultiIndex.from_arrays([[], []], names=["region", "price_pln"]),
+        )
+        self.edges = None
+        self.medians = pd.Series(dtype=float)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "DatasetStats":
+        stats = cls()
+        stats.add(df)
+        stats.refresh()
+        return stats
+
+    @staticmethod
+    def _counts(df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+        price_per_hp = df["price_per_hp"].value_counts()
+        # groupby skips missing regions and prices, so do the counts
+        region_prices = df.groupby(["region", "price_pln"], observed=True).size()
+        return price_per_hp, region_prices
+
+    def _update(self, df: pd.DataFrame, sign: int):
+        self.rows += sign * len(df)
+        price_per_hp, region_prices = self._counts(df)
+        self.price_per_hp = self.price_per_hp.add(sign * price_per_hp, fill_value=0)
+        self.price_per_hp = self.price_per_hp[self.price_per_hp > 0].sort_index()
+        self.region_prices = self.region_prices.add(sign * region_prices, fill_value=0)
+        self.region_prices = self.region_prices[self.region_prices > 0].sort_index()
+
+    def add(self, df: pd.DataFrame):
+        self._update(df, 1)
+
+    def remove(self, df: pd.DataFrame):
+        self._update(df, -1)
+
+    def refresh(self) -> tuple[bool, pd.Index]:
+        """
+        Recompute the edges and medians; returns whether the edges moved
+        and the regions whose median changed.
+        """
+        edges = quantiles_from_counts(self.price_per_hp, qcut_quantiles(5))
+        edges_moved = self.edges is None or not np.array_equal(
+            edges, self.edges, equal_nan=True
+        )
+
+        medians = self.region_prices.groupby(level="region").apply(
+            lambda counts: median_from_counts(counts.droplevel("region"))
+        )
+        medians = medians.astype(float)
+        old = self.medians.reindex(medians.index)
+        moved = medians.index[~((medians == old) | (medians.isna() & old.isna()))]
+        moved = moved.union(self.medians.index.difference(medians.index))
+
+        self.edges, self.medians = edges, medians
+        return edges_moved, moved
+
+    def save(self, path: str | Path):
+        """Store the counts; edges and medians are recomputed on load."""
+        price_per_hp = self.price_per_hp.rename_axis("value").reset_index(name="count")
+        region_prices = self.region_prices.rename_axis(["region", "value"])
+        frame = pd.concat(
+            [price_per_hp, region_prices.reset_index(name="count")], ignore_index=True
+        )
+        frame = frame.astype({"region": "string", "count": "int64"})
+        frame.attrs["rows"] = self.rows
+        frame.to_parquet(path, index=False)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "DatasetStats":
+        frame = pd.read_parquet(path)
+        # price_per_hp counts are the rows without a region
+        overall = frame["region"].isna().to_numpy()
+        stats = cls()
+        stats.rows = frame.attrs["rows"]
+        stats.price_per_hp = pd.Series(
+            frame["count"].to_numpy()[overall],
+            index=pd.Index(frame["value"].to_numpy()[overall], name="price_per_hp"),
+        )
+        regional = frame[~overall]
+        stats.region_prices = pd.Series(
+            regional["count"].to_numpy(),
+            index=pd.MultiIndex.from_arrays(
+                [regional["region"].to_numpy(object), regional["value"].to_numpy()],
+                names=["region", "price_pln"],
+            ),
+        )
+        stats.refresh()
+        return stats
+
+    def bucket(self, price_per_hp: pd.Series) -> pd.Series:
+        # the cut pd.qcut makes once it has its edges
+        return pd.cut(
+            price_per_hp, self.edges, labels=PRICE_PER_HP_LABELS, include_lowest=True
+        )
+
+
+def listing_keys(df: pd.DataFrame) -> pd.Series:
+    try:
+        # a plain cast, much faster than to_numeric on string ids
+        return df["id"].astype("int64")
+    except (TypeError, ValueError):
+        return pd.to_numeric(df["id"], errors="coerce")
+
+
+def changed_listing_ids(raw: pd.DataFrame, previous_raw: pd.DataFrame) -> pd.Series:
+    """
+    Keys of the listings in `raw` that are new, or whose raw row differs in
+    any column from their row in `previous_raw` (the raw partition the
+    previous processed output was normalized from).
+    """
+    keys = listing_keys(raw)
+    previous_keys = listing_keys(previous_raw)
+    # a repeated id cannot be matched to one row, so it counts as changed
+    single = (~previous_keys.duplicated(keep=False) & previous_keys.notna()).to_numpy()
+    position = pd.Index(previous_keys[single]).get_indexer(keys)
+    matched = position >= 0
+    now = raw.take(np.flatnonzero(matched)).reset_index(drop=True)
+    then = previous_raw.take(np.flatnonzero(single)[position[matched]])
+    then = then.reset_index(drop=True)
+
+    # the partition key is not part of a listing
+    columns = (set(raw.columns) | set(previous_raw.columns)) - {"scrape_date"}
+    same = matched.copy()
+    for column in columns:
+        if column not in raw or column not in previous_raw:
+            same[:] = False
+            break
+        a, b = now[column], then[column]
+        # partition columns and dictionary-encoded text come back as categories
+        if a.dtype != b.dtype:
+            a, b = a.astype(object), b.astype(object)
+        equal = a.eq(b).to_numpy(dtype=bool, na_value=False)
+        same[matched] &= equal | (a.isna().to_numpy() & b.isna().to_numpy())
+
+    return keys[~same].drop_duplicates()
+
+
+def normalize_incremental(
+    raw: pd.DataFrame,
+    previous: pd.DataFrame,
+    changed_ids,
+    stats: DatasetStats | None = None,
+    rates: RateProvider | None = None,
+    historical_rates: bool = False,
+) -> tuple[pd.DataFrame, DatasetStats]:
+    """
+    normalize_dataframe(raw) built from `previous`, the processed output of
+    an earlier run: rows whose id is in `previous` and not in `changed_ids`
+    (see changed_listing_ids) are carried over, and only the rest go
+    through normalize_rows. The bucket edges and regional medians come from
+    `stats` (the aggregates of `previous`, saved with it; built from it
+    when None or when they do not cover every row of it), updated by the
+    rows that left and arrived; carried rows are only re-bucketed if the edges moved and
+    re-mapped for regions whose median moved. Returns the frame (carried
+    rows in the order of `previous`, then the new ones) and the stats.
+    """
+    if stats is None or stats.rows != len(previous):
+        stats = DatasetStats.from_frame(previous)
+    provider = rates or RateProvider()
+
+    raw_ids = listing_keys(raw)
+    previous_ids = listing_keys(previous)
+    # Repeated ids cannot be matched row to row, so they are renormalized
+    repeated = raw_ids[raw_ids.duplicated(keep=False)]
+    repeated = pd.concat([repeated, previous_ids[previous_ids.duplicated(keep=False)]])
+    carry = (
+        previous_ids.isin(raw_ids)
+        & ~previous_ids.isin(changed_ids)
+        & ~previous_ids.isin(repeated)
+        & previous_ids.notna()
+    ).to_numpy()
+
+    # a lean previous frame lacks RUN_COLUMNS, refreshed below, and its
+    # downcast numbers would make float32 arithmetic of the refreshes
+    carried = previous.loc[carry].reindex(columns=PROCESSED_COLUMNS)
+    carried = carried.astype(
+        {
+            **dict.fromkeys(carried.select_dtypes("float").columns, "float64"),
+            **dict.fromkeys(carried.select_dtypes("integer").columns, "int64"),
+        }
+    )
+    stats.remove(previous.loc[~carry])
+
+    fresh_rows = ~raw_ids.isin(carried["id"]).to_numpy()
+    if fresh_rows.any():
+        fresh = normalize_rows(raw[fresh_rows], provider, historical_rates)
+    else:
+        fresh = carried.iloc[:0].copy()
+    stats.add(fresh)
+    edges_moved, regions_moved = stats.refresh()
+
+    # ---- per-run columns of the carried rows ----
+    carried = carried.astype(
+        {
+            c: fresh[c].dtype
+            for c in carried.columns
+            if c in fresh and c not in RUN_COLUMNS and len(fresh)
+        }
+    )
+    # one timestamp for the whole frame, as normalize_rows sets it
+    carried["current_date"] = (
+        fresh["current_date"].iloc[0]
+        if len(fresh)
+        else pd.Timestamp.now(tz="Europe/Warsaw")
+    )
+    carried["days_listed"] = (carried["current_date"] - carried["date_added"]).dt.days
+    if not historical_rates:
+        _, eur_rate = provider.latest()
+        carried["pln_eur_rate"] = eur_rate
+        carried["price_eur"] = (carried["price_pln"] / eur_rate).round(0)
+    if rates is None:
+        provider.close()
+
+    scrape_year = datetime.now().year
+    if len(carried) and (carried["scrape_year"] != scrape_year).any():
+        carried = add_age_columns(carried, scrape_year)
+
+    # ---- dataset-wide columns ----
+    fresh["price_per_hp_bucket"] = stats.bucket(fresh["price_per_hp"])
+    fresh["region_price_density"] = fresh["region"].map(stats.medians)
+    if edges_moved:
+        carried["price_per_hp_bucket"] = stats.bucket(carried["price_per_hp"])
+    else:
+        carried["price_per_hp_bucket"] = carried["price_per_hp_bucket"].astype(
+            fresh["price_per_hp_bucket"].dtype
+        )
+    moved = carried["region"].isin(regions_moved)
+    if moved.any():
+        carried.loc[moved, "region_price_density"] = carried.loc[moved, "region"].map(
+            stats.medians
+        )
+
+    df = pd.concat([carried, fresh[PROCESSED_COLUMNS]], ignore_index=True)
+    return df, stats
+
+
+def benchmark_version_parsing(rows: int = 1_000_000):
+    import random
+    import time
+
+    from synthetic_pages import VERSIONS
+
+    rng = random.Random(0)
+    slugs = VERSIONS + [
+        f"ver-{a}-{b}-{family}-{trim}"
+        for a, b in [(1, 0), (1, 2), (1, 4), (1, 5), (2, 0)]
+        for family in ["tsi", "tce", "ecoboost", "mhev", "t"]
+        for trim in ["life", "style", "titanium", "premium", "business"]
+    ]
+    versions = pd.Series([rng.choice(slugs + [None]) for _ in range(rows)])
+    print(f"[INFO] {rows} rows, {versions.nunique()} distinct slugs")
+
+    start = time.perf_counter()
+    per_row = versions.apply(parse_version_slug).apply(pd.Series)
+    per_row_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    memoized = parse_version_column(versions)
+    memoized_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(per_row, memoized)
+    print(f"apply(pd.Series)  {per_row_time:8.2f}s")
+    print(f"memoized column   {memoized_time:8.2f}s")
+
+
+def synthetic_listings(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """`rows` raw listings off synthetic pages, each with its own id, price and date."""
+    from bench_suite import make_pages
+    from parser.search_page import parse_search_page
+
+    listings = [row for html in make_pages(60, 32) for row in parse_search_page(html)]
+    df = pd.DataFrame(listings * (rows // len(listings) + 1)).head(rows)
+    df["id"] = (np.arange(rows) + 10**9).astype(str)
+    df["price"] = df["price"] + rng.integers(-50, 50, rows) * 100
+    # every live listing has its own timestamp
+    df["date_added"] = (
+        pd.Timestamp("2026-01-01", tz="UTC")
+        + pd.to_timedelta(rng.integers(0, 300 * 86400, rows), unit="s")
+    ).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return df
+
+
+def benchmark_incremental(sizes=(50_000, 200_000, 500_000), delta: float = 0.02):
+    import tempfile
+    import time
+
+    from bench_suite import offline_rates
+
+    rng = np.random.default_rng(0)
+    # read off the clock by each call, so they differ between the two
+    clock = ["current_date", "days_listed"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rates = offline_rates(Path(tmp) / "rates.sqlite")
+        for rows in sizes:
+            yesterday = synthetic_listings(rows, rng)
+
+            # today: a few prices cut, a few ads edited, a few listings gone
+            # and as many new ones
+            today = yesterday.copy()
+            cut, edited = rng.choice(rows, (2, int(rows * delta / 4)), replace=False)
+            today.loc[cut, "price"] = today.loc[cut, "price"] * 0.95
+            today.loc[edited, "title"] = today.loc[edited, "title"] + " (edited)"
+            today.loc[edited, "short_description"] = "Updated ad"
+            new = yesterday.sample(int(rows * delta / 2), random_state=1)
+            new["id"] = (np.arange(len(new)) + 2 * 10**9).astype(str)
+            today = pd.concat([today.iloc[len(new) :], new], ignore_index=True)
+
+            previous = normalize_dataframe(yesterday, rates=rates)
+            saved = Path(tmp) / "stats.parquet"
+            DatasetStats.from_frame(previous).save(saved)
+
+            start = time.perf_counter()
+            full = normalize_dataframe(today, rates=rates)
+            full_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            changed = changed_listing_ids(today, yesterday)
+            incremental, _ = normalize_incremental(
+                today, previous, changed, stats=DatasetStats.load(saved), rates=rates
+            )
+            incremental_time = time.perf_counter() - start
+
+            pd.testing.assert_frame_equal(
+                full.drop(columns=clock).sort_values("id", ignore_index=True),
+                incremental.drop(columns=clock).sort_values("id", ignore_index=True),
+                check_dtype=False,
+            )
+            print(
+                f"{rows:8d} rows, {len(changed):6d} changed:"
+                f"  full {full_time:5.2f}s"
+                f"  incremental {incremental_time:5.2f}s"
+                f" ({full_time / incremental_time:3.1f}x)"
+            )
+        rates.close()
+
+
+def benchmark_memory(rows: int = 1_000_000):
+    import tempfile
+
+    from bench_suite import offline_rates
+
+    raw = synthetic_listings(rows, np.random.default_rng(0))
+    with tempfile.TemporaryDirectory() as tmp:
+        rates = offline_rates(Path(tmp) / "rates.sqlite")
+        full = normalize_dataframe(raw, rates=rates)
+        lean = normalize_dataframe(raw, rates=rates, lean=True)
+        rates.close()
+
+    before = full.memory_usage(index=False, deep=True)
+    after = lean.memory_usage(index=False, deep=True).reindex(
+        before.index, fill_value=0
+    )
+    mb = 1024 * 1024
+    print(f"\n[RESULT] {rows} rows, memory_usage(deep=True)")
+    print(f"default dtypes  {before.sum() / mb:8.1f} MB")
+    print(
+        f"lean dtypes     {after.sum() / mb:8.1f} MB ({after.sum() / before.sum():.0%})"
+    )
+    print(f"run values moved to attrs: {lean.attrs}")
+    saved = (before - after).sort_values(ascending=False).head(12)
+    for col, n in saved.items():
+        print(
+            f"  {col:<22} {str(full[col].dtype):<28}"
+            f" -> {str(lean[col].dtype) if col in lean else 'attrs':<12}"
+            f" {before[col] / mb:7.1f} -> {after[col] / mb:6.1f} MB"
+        )
 
 
 if __name__ == "__main__":
-    from pathlib import Path
+    import sys
+
+    if "--bench" in sys.argv:
+        benchmark_version_parsing()
+        sys.exit()
+
+    if "--bench-incremental" in sys.argv:
+        benchmark_incremental()
+        sys.exit()
+
+    if "--bench-memory" in sys.argv:
+        benchmark_memory()
+        sys.exit()
 
     # Example usage
     project_root = Path.cwd().parent
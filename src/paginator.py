@@ -1,28 +1,32 @@
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 import requests
 import urllib3
 from tqdm import tqdm
 from url_builder import build_search_url
 from fetcher import detect_last_page, fetch_html, is_zero_results, polite_sleep
+from parser.extractor import ExtractedPage, extract_page
 from parser.json_ld_parser import parse_json_ld
+from http_cache import HttpCache
+from rate_control import AdaptiveRateController
+from snapshot_archive import get_archive
+
+
+def save_html_snapshot(
+    html: str, page: int, output_dir: str, base_args: dict = {}, url: str = ""
+):
+    """Append a fetched page to the snapshot archive kept in `output_dir`."""
+    archive = get_archive(Path.cwd().parent / Path(output_dir))
+    archive.add(
+        html,
+        url=url,
+        brand=base_args.get("brand"),
+        model=base_args.get("model"),
+        page=page,
+    )
 
 
-def save_html_snapshot(html: str, page: int, output_dir: str, base_args: dict = {}):
-    parent_dir = Path.cwd().parent
-    full_path = parent_dir / Path(output_dir)
-    full_path.mkdir(parents=True, exist_ok=True)
-    if base_args:
-        path = (
-            Path(full_path)
-            / f"{base_args['brand'].lower()}_{base_args['model'].lower()}_page_{page}.html"
-        )
-    else:
-        path = Path(full_path) / f"page_{page}.html"
-    path.write_text(html, encoding="utf-8")
-
-
-def iterate_search_pages(
+def iter_search_pages(
     session: requests.Session,
     base_args: dict = {},
     input_url: str = "",
@@ -30,11 +34,21 @@ def iterate_search_pages(
     save_snapshots: bool = False,
     snapshot_dir: str = "data/html_snapshots",
     disable_tqdm=False,
-) -> List[str]:
+    status: dict | None = None,
+    controller: AdaptiveRateController | None = None,
+    cache: HttpCache | None = None,
+) -> Iterator[ExtractedPage]:
     """
     Fetch search result pages until stopping condition is met.
-    Returns a list of HTML strings (one per page).
+    Yields each page as soon as it is accepted, already scanned, so the
+    parsers reuse the scan that classified it.
+    If `status` is given, its "stop_reason" is set to "failed", "zero",
+    "last" or "max_pages" once paging ends.
+    A `controller` paces and retries requests in place of polite_sleep, and
+    a `cache` serves pages fetched recently.
     """
+    if status is None:
+        status = {}
     pbar = tqdm(
         desc="Pages fetched",
         unit="page",
@@ -42,72 +56,102 @@ def iterate_search_pages(
         disable=disable_tqdm,
     )
 
-    pages_html = []
     detected_last_page = None
 
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-    for page in range(1, max_pages + 1):
-
-        pbar.update(1)
-
-        if input_url:
-            url = input_url + f"&page={page}"
-        else:
-            url = build_search_url(page=page, **base_args)
-
-        tqdm.write(f"[INFO] Fetching page {page}")
-
-        html = fetch_html(url, session)
-
-        if html is None:
-            tqdm.write("[STOP] Fetch failed.")
-            break
-
-        if is_zero_results(html):
-            tqdm.write("[STOP] Zero results page detected.")
-            break
-
-        # Detect last page
-        if detected_last_page is None:
-            json_list = parse_json_ld(html)
-
-            if json_list:
+    try:
+        for page in range(1, max_pages + 1):
 
-                if save_snapshots:
-                    save_html_snapshot(
-                        base_args=base_args,
-                        html=html,
-                        page=page,
-                        output_dir=snapshot_dir,
-                    )
-                pages_html.append(html)
+            pbar.update(1)
 
+            if input_url:
+                url = input_url + f"&page={page}"
             else:
-                detected_last_page = detect_last_page(html) - 1
-                tqdm.write(f"[INFO] Detected last page: {detected_last_page}")
+                url = build_search_url(page=page, **base_args)
+
+            tqdm.write(f"[INFO] Fetching page {page}")
+
+            html = fetch_html(url, session, cache=cache, controller=controller)
+
+            if html is None:
+                tqdm.write("[STOP] Fetch failed.")
+                status["stop_reason"] = "failed"
+                break
+
+            if is_zero_results(html):
+                tqdm.write("[STOP] Zero results page detected.")
+                status["stop_reason"] = "zero"
+                break
+
+            # Detect last page
+            if detected_last_page is None:
+                page_scan = extract_page(html)
+                json_list = parse_json_ld(page_scan)
+
+                if json_list:
+
+                    if save_snapshots:
+                        save_html_snapshot(
+                            base_args=base_args,
+                            html=html,
+                            page=page,
+                            output_dir=snapshot_dir,
+                            url=url,
+                        )
+                    yield page_scan
+
+                else:
+                    detected_last_page = detect_last_page(page_scan) - 1
+                    tqdm.write(f"[INFO] Detected last page: {detected_last_page}")
+
+            if detected_last_page is not None and page >= detected_last_page:
+                tqdm.write("[STOP] Reached last page.")
+                status["stop_reason"] = "last"
+                break
+
+            if controller is None:
+                polite_sleep()
+        else:
+            status["stop_reason"] = "max_pages"
 
-        if detected_last_page is not None and page >= detected_last_page:
-            tqdm.write("[STOP] Reached last page.")
-            break
+    finally:
+        pbar.close()
 
-        polite_sleep()
 
-    pbar.close()
-    return pages_html
+def iterate_search_pages(
+    session: requests.Session,
+    base_args: dict = {},
+    input_url: str = "",
+    max_pages: int = 10,
+    save_snapshots: bool = False,
+    snapshot_dir: str = "data/html_snapshots",
+    disable_tqdm=False,
+    controller: AdaptiveRateController | None = None,
+) -> List[ExtractedPage]:
+    """
+    Fetch search result pages until stopping condition is met.
+    Returns a list of scanned pages (one per page).
+    """
+    return list(
+        iter_search_pages(
+            session,
+            base_args=base_args,
+            input_url=input_url,
+            max_pages=max_pages,
+            save_snapshots=save_snapshots,
+            snapshot_dir=snapshot_dir,
+            disable_tqdm=disable_tqdm,
+            controller=controller,
+        )
+    )
 
 
 if __name__ == "__main__":
 
     import os
     import pandas as pd
-    from parser.graphql_parser import parse_graphql
-    from parser.merger import merge_jsonld_and_graphql
-
-    def parse_search_page(html: str) -> list[dict]:
-        jsonld = parse_json_ld(html)
-        graphql = parse_graphql(html)
-        return merge_jsonld_and_graphql(jsonld, graphql)
+    from parser.search_page import parse_search_page
 
     save_snapshots = input("Save HTML snapshots? (y/n): ").strip().lower() == "y"
 
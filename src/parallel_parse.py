@@ -0,0 +1,182 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Sized
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+from parser.search_page import parse_search_page
+from snapshot_archive import SnapshotArchive, is_archive
+
+
+def parse_page_safe(html: str, label: str = "page") -> list[dict]:
+    # one broken archived page must not take down a whole backlog
+    try:
+        return parse_search_page(html)
+    except (RuntimeError, ValueError, KeyError, TypeError) as e:
+        print(f"[ERROR] Failed to parse {label}: {e}")
+        return []
+
+
+def parse_snapshot_file(path: str) -> list[dict]:
+    html = Path(path).read_text(encoding="utf-8")
+    return parse_page_safe(html, label=path)
+
+
+def default_chunksize(n_items: int, workers: int) -> int:
+    # ~4 chunks per worker balances IPC overhead against stragglers
+    return max(1, n_items // (workers * 4))
+
+
+# Chunk size for page streams of unknown length, e.g. an archive replay
+STREAM_CHUNKSIZE = 8
+
+
+def iter_parsed_pages(
+    pages: Iterable[str],
+    workers: int | None = None,
+    chunksize: int | None = None,
+) -> Iterator[list[dict]]:
+    """
+    Parse pages on a process pool and yield each page's listings in page
+    order. `pages` may be a stream (e.g. SnapshotArchive.iter_html); it is
+    read a few chunks per worker ahead, so only that many pages are held
+    in memory at once.
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = (
+            default_chunksize(len(pages), workers)
+            if isinstance(pages, Sized)
+            else STREAM_CHUNKSIZE
+        )
+
+    pages = iter(pages)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while batch := list(islice(pages, workers * chunksize * 4)):
+            yield from pool.map(parse_page_safe, batch, chunksize=chunksize)
+
+
+def parse_pages_parallel(
+    pages: Iterable[str],
+    workers: int | None = None,
+    chunksize: int | None = None,
+) -> List[dict]:
+    """
+    Parse in-memory or streamed pages on a process pool.
+    Listings come back in page order, exactly as a serial loop would return them.
+    """
+    listings = []
+    for page_listings in iter_parsed_pages(pages, workers, chunksize):
+        listings.extend(page_listings)
+    return listings
+
+
+def parse_snapshot_dir(
+    snapshot_dir: str | Path,
+    pattern: str = "*.html",
+    workers: int | None = None,
+    chunksize: int | None = None,
+    scrape_date: str | None = None,
+) -> List[dict]:
+    """
+    Parse every snapshot in a directory on a process pool. A snapshot
+    archive is streamed in fetch order, each distinct page once (only the
+    pages fetched on `scrape_date` when given). Otherwise the files
+    matching `pattern` are parsed in sorted name order; workers read them
+    themselves, so only paths and listing dicts cross process boundaries.
+    """
+    if is_archive(snapshot_dir):
+        archive = SnapshotArchive(snapshot_dir)
+        try:
+            return parse_pages_parallel(
+                archive.iter_html(scrape_date=scrape_date, distinct=True),
+                workers=workers,
+                chunksize=chunksize,
+            )
+        finally:
+            archive.close()
+
+    paths = sorted(str(p) for p in Path(snapshot_dir).glob(pattern))
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or default_chunksize(len(paths), workers)
+
+    listings = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for page_listings in pool.map(parse_snapshot_file, paths, chunksize=chunksize):
+            listings.extend(page_listings)
+
+    return listings
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import pandas as pd
+
+    arg_parser = argparse.ArgumentParser(
+        description="Parse a backlog of HTML snapshots on a process pool"
+    )
+    arg_parser.add_argument("snapshot_dir", nargs="?", default="../data/html_snapshots")
+    arg_parser.add_argument("--pattern", default="*.html")
+    arg_parser.add_argument(
+        "--scrape-date", help="archive only: pages fetched on this day (YYYYMMDD)"
+    )
+    arg_parser.add_argument("--workers", type=int, default=None)
+    arg_parser.add_argument("--chunksize", type=int, default=None)
+    arg_parser.add_argument("--output", help="CSV path for the merged listings")
+    arg_parser.add_argument(
+        "--compare", action="store_true", help="also time a serial parse"
+    )
+    args = arg_parser.parse_args()
+
+    if is_archive(args.snapshot_dir):
+        archive = SnapshotArchive(args.snapshot_dir)
+        filters = {"scrape_date": args.scrape_date, "distinct": True}
+        n_pages = len(archive.snapshots(**filters))
+        print(f"[INFO] {n_pages} archived pages in {args.snapshot_dir}")
+
+        def serial_pages():
+            return archive.iter_html(**filters)
+
+    else:
+        paths = sorted(Path(args.snapshot_dir).glob(args.pattern))
+        n_pages = len(paths)
+        print(f"[INFO] {n_pages} snapshot files in {args.snapshot_dir}")
+
+        def serial_pages():
+            return (path.read_text(encoding="utf-8") for path in paths)
+
+    start = time.perf_counter()
+    listings = parse_snapshot_dir(
+        args.snapshot_dir,
+        pattern=args.pattern,
+        workers=args.workers,
+        chunksize=args.chunksize,
+        scrape_date=args.scrape_date,
+    )
+    parallel_time = time.perf_counter() - start
+    print(
+        f"[RESULT] {len(listings)} listings in {parallel_time:.2f}s "
+        f"({n_pages / parallel_time:.0f} pages/s, "
+        f"{args.workers or os.cpu_count()} workers)"
+    )
+
+    if args.compare:
+        start = time.perf_counter()
+        serial = []
+        for html in serial_pages():
+            serial.extend(parse_page_safe(html))
+        serial_time = time.perf_counter() - start
+
+        assert serial == listings, "parallel parse differs from serial parse"
+        print(
+            f"[RESULT] serial {serial_time:.2f}s, "
+            f"speedup x{serial_time / parallel_time:.1f}"
+        )
+
+    if args.output:
+        pd.DataFrame(listings).to_csv(args.output, index=False)
+        print(f"[INFO] Listings saved: {args.output}")
@@ -0,0 +1,79 @@
+import re
+from html import unescape
+
+try:
+    from parser.extractor import extract_page
+    from parser.graphql_parser import correct_polish_letters
+except ImportError:  # running this file directly from src/parser
+    from extractor import extract_page
+    from graphql_parser import correct_polish_letters
+
+try:
+    from metrics import instrument
+except ImportError:  # running this file directly from src/parser
+
+    def instrument(stage, items=None):
+        return lambda func: func
+
+
+TAG_RE = re.compile(r"<[^>]+>")
+
+# "Tak"/"Nie" fields of the advert's details list
+YES_NO_DETAILS = ["no_accident", "service_record", "original_owner"]
+TEXT_DETAILS = ["color", "body_type", "door_count", "nr_seats"]
+
+# Columns parse_detail_page adds to a listing, in output order
+DETAIL_COLUMNS = [
+    "vin",
+    "has_vin",
+    *YES_NO_DETAILS,
+    *TEXT_DETAILS,
+    "equipment",
+    "equipment_count",
+    "description",
+]
+
+
+def html_to_text(html: str) -> str:
+    text = TAG_RE.sub(" ", html.replace("</p>", "\n"))
+    lines = (" ".join(line.split()) for line in unescape(text).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def find_advert(next_data: dict) -> dict:
+    advert = next_data["props"]["pageProps"].get("advert")
+    if not advert:
+        raise ValueError("Advert data not found in props")
+    return advert
+
+
+@instrument("parse_detail")
+def parse_detail_page(html: str) -> dict:
+    """Detail columns of one listing page (see DETAIL_COLUMNS)."""
+    advert = find_advert(extract_page(html).next_data)
+    details = {d["key"]: d.get("value") for d in advert.get("details", [])}
+
+    equipment = [
+        value["label"]
+        for group in advert.get("equipment", [])
+        for value in group.get("values", [])
+    ]
+    vin = details.get("vin")
+
+    return {
+        "vin": vin,
+        "has_vin": bool(vin),
+        **{
+            key: details.get(key) == "Tak" if key in details else None
+            for key in YES_NO_DETAILS
+        },
+        **{
+            key: correct_polish_letters(details[key]) if details.get(key) else None
+            for key in TEXT_DETAILS
+        },
+        "equipment": correct_polish_letters("; ".join(equipment)),
+        "equipment_count": len(equipment),
+        "description": correct_polish_letters(
+            html_to_text(advert.get("description") or "")
+        ),
+    }
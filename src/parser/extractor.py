@@ -0,0 +1,178 @@
+import json
+import re
+from functools import cached_property
+from html import unescape
+from typing import Optional
+
+try:
+    from metrics import instrument
+except ImportError:  # running this file directly from src/parser
+
+    def instrument(stage, items=None):
+        return lambda func: func
+
+
+SCRIPT_RE = re.compile(r"<script\b([^>]*)>(.*?)</script\s*>", re.S | re.I)
+META_RE = re.compile(r"<meta\b([^>]*)>", re.I)
+ATTR_RE = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+
+def parse_attrs(attr_text: str) -> dict:
+    return {
+        m.group(1).lower(): unescape(
+            m.group(2) if m.group(2) is not None else m.group(3)
+        )
+        for m in ATTR_RE.finditer(attr_text)
+    }
+
+
+class ExtractedPage:
+    """
+    Everything the parsers need from a search page, found in one scan of the
+    raw HTML: the listing JSON-LD script, the Next.js "props" script and the
+    og:url meta. JSON payloads are decoded on first access and kept. The
+    page's `html` goes along for consumers that store it (snapshots).
+    """
+
+    def __init__(self, html: str):
+        self.html = html
+        self.json_ld_script = None
+        self.props_script = None
+        self.og_url = None
+
+        for match in SCRIPT_RE.finditer(html):
+            body = match.group(2)
+
+            if self.json_ld_script is None and "listing-json-ld" in match.group(1):
+                attrs = parse_attrs(match.group(1))
+                if (
+                    attrs.get("id") == "listing-json-ld"
+                    and attrs.get("type") == "application/ld+json"
+                ):
+                    self.json_ld_script = body
+                    continue
+
+            if self.props_script is None and '"props"' in body:
+                self.props_script = body
+
+            if self.json_ld_script is not None and self.props_script is not None:
+                break
+
+        for match in META_RE.finditer(html):
+            if "og:url" not in match.group(1):
+                continue
+            attrs = parse_attrs(match.group(1))
+            if attrs.get("property") == "og:url" and "content" in attrs:
+                self.og_url = attrs["content"]
+                break
+
+    @cached_property
+    def json_ld(self) -> Optional[dict]:
+        if not self.json_ld_script:
+            return None
+
+        try:
+            return json.loads(self.json_ld_script)
+        except json.JSONDecodeError:
+            return None
+
+    @cached_property
+    def next_data(self) -> dict:
+        if self.props_script is None:
+            raise RuntimeError("Props script not found")
+
+        return json.loads(self.props_script)
+
+
+@instrument("extract_page")
+def scan_page(html: str) -> ExtractedPage:
+    return ExtractedPage(html)
+
+
+def extract_page(page: str | ExtractedPage) -> ExtractedPage:
+    """
+    The ExtractedPage of raw HTML, or `page` itself when it already is one.
+    Callers that feed one page to several parsers scan it once and pass the
+    ExtractedPage on; nothing is kept once they let go of it.
+    """
+    if isinstance(page, ExtractedPage):
+        return page
+    return scan_page(page)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from pathlib import Path
+
+    from bs4 import BeautifulSoup
+
+    def legacy_extract(html: str):
+        # The pre-extractor path: one html.parser soup per consumer
+        soup = BeautifulSoup(html, "html.parser")
+        script = soup.find(
+            "script", {"type": "application/ld+json", "id": "listing-json-ld"}
+        )
+        json_ld = json.loads(script.string) if script and script.string else None
+
+        soup = BeautifulSoup(html, "html.parser")
+        script = soup.find(
+            "script", {"type": "application/ld+json", "id": "listing-json-ld"}
+        )
+
+        soup = BeautifulSoup(html, "html.parser")
+        props = next(
+            s.string
+            for s in soup.find_all("script")
+            if s.string and '"props"' in s.string
+        )
+
+        soup = BeautifulSoup(html, "html.parser")
+        og_url = soup.find("meta", property="og:url")["content"]
+
+        return json_ld, json.loads(props), og_url
+
+    def single_pass_extract(html: str):
+        page = ExtractedPage(html)
+        return page.json_ld, page.next_data, page.og_url
+
+    arg_parser = argparse.ArgumentParser(description="Benchmark page extraction")
+    arg_parser.add_argument(
+        "--snapshots",
+        default=str(Path(__file__).parents[2] / "data/html_snapshots"),
+    )
+    arg_parser.add_argument("--synthetic", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    pages = [
+        p.read_text(encoding="utf-8")
+        for p in sorted(Path(args.snapshots).glob("*.html"))
+    ]
+    source = args.snapshots
+
+    if not pages:
+        import sys
+
+        sys.path.insert(0, str(Path(__file__).parents[1]))
+        from synthetic_pages import make_search_page
+
+        pages = [
+            make_search_page(page=i, last_page=args.synthetic)
+            for i in range(1, args.synthetic + 1)
+        ]
+        source = "synthetic pages"
+
+    for html in pages:
+        assert legacy_extract(html) == single_pass_extract(html)
+
+    print(f"[INFO] {len(pages)} pages from {source}")
+
+    for name, func in [
+        ("bs4 x4", legacy_extract),
+        ("single pass", single_pass_extract),
+    ]:
+        start = time.perf_counter()
+        for html in pages:
+            func(html)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {elapsed / len(pages) * 1000:8.2f} ms/page")
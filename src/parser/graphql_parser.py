@@ -1,17 +1,34 @@
+from __future__ import annotations
+
 import json
 import re
-from bs4 import BeautifulSoup
 import os
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    from parser.extractor import ExtractedPage, extract_page
+except ImportError:  # running this file directly from src/parser
+    from extractor import ExtractedPage, extract_page
 
+try:
+    from metrics import instrument
+except ImportError:  # running this file directly from src/parser
 
-def find_props_script(html: str) -> dict:
-    soup = BeautifulSoup(html, "html.parser")
+    def instrument(stage, items=None):
+        return lambda func: func
 
-    for script in soup.find_all("script"):
-        if script.string and '"props"' in script.string:
-            return script.string
 
-    raise RuntimeError("Props script not found")
+def find_props_script(html: str | ExtractedPage) -> str:
+    script = extract_page(html).props_script
+
+    if script is None:
+        raise RuntimeError("Props script not found")
+
+    return script
 
 
 def extract_urql_state(next_data: dict) -> dict:
@@ -39,23 +56,39 @@ def safe_price(advert):
         return 0
 
 
+# Polish diacritics to their ASCII base letters, keeping the case
+POLISH_LETTERS = str.maketrans("ąćęłńóśźżĄĆĘŁŃÓŚŹŻ", "acelnoszzACELNOSZZ")
+
+
 def correct_polish_letters(st):
 
     if st is None:
         return ""
 
-    pol = {
-        "ą": "a",
-        "ć": "c",
-        "ę": "e",
-        "ł": "l",
-        "ń": "n",
-        "ó": "o",
-        "ś": "s",
-        "ź": "z",
-        "ż": "z",
-    }
-    return "".join([pol[c.lower()] if c.lower() in pol else c for c in st])
+    return st.translate(POLISH_LETTERS)
+
+
+@lru_cache(maxsize=4096)
+def correct_polish_label(st):
+    """correct_polish_letters for values repeated across listings, e.g. cities."""
+    return correct_polish_letters(st)
+
+
+def correct_polish_column(values: pd.Series) -> pd.Series:
+    """
+    correct_polish_letters over a whole column, translated once per
+    distinct value and broadcast back to the rows by position.
+    """
+    # pandas stays out of the module imports; run_scraper loads this at start-up
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(values)
+    # missing values get code -1, which take() maps to the trailing ""
+    translated = np.array(
+        [correct_polish_letters(v) for v in uniques] + [""], dtype=object
+    )
+    return pd.Series(translated.take(codes), index=values.index, dtype="str")
 
 
 def extract_listings_from_graphql(graphql_json: dict) -> list[dict]:
@@ -80,7 +113,7 @@ def extract_listings_from_graphql(graphql_json: dict) -> list[dict]:
                 "date_added": advert["createdAt"],
                 "short_description": correct_polish_letters(advert["shortDescription"]),
                 "url": advert["url"],
-                "seller_name": correct_polish_letters(advert["sellerLink"]["name"]),
+                "seller_name": correct_polish_label(advert["sellerLink"]["name"]),
                 "seller_site": advert["sellerLink"]["websiteUrl"],
                 "brand": params.get("make"),
                 "model": params.get("model"),
@@ -92,13 +125,13 @@ def extract_listings_from_graphql(graphql_json: dict) -> list[dict]:
                 "mileage": int(params.get("mileage", 0)),
                 "gearbox": params.get("gearbox"),
                 "country_code": params.get("country_origin"),
-                "country_origin": correct_polish_letters(
+                "country_origin": correct_polish_label(
                     parm_country.get("country_origin")
                 ),
                 "engine_capacity": int(params.get("engine_capacity", 0)),
                 "engine_power": int(params.get("engine_power", 0)),
-                "city": correct_polish_letters(advert["location"]["city"]["name"]),
-                "region": correct_polish_letters(advert["location"]["region"]["name"]),
+                "city": correct_polish_label(advert["location"]["city"]["name"]),
+                "region": correct_polish_label(advert["location"]["region"]["name"]),
                 "bump_up": params.get("bump_up"),
                 "export_olx": params.get("export_olx"),
                 "priceevaluation": advert["priceEvaluation"]["indicator"],
@@ -109,10 +142,11 @@ def extract_listings_from_graphql(graphql_json: dict) -> list[dict]:
     return listings
 
 
-def parse_graphql(html: str) -> list[dict]:
+@instrument("parse_graphql", items=len)
+def parse_graphql(html: str | ExtractedPage) -> list[dict]:
 
-    # find json from "Props" script
-    next_data = json.loads(find_props_script(html))
+    # find json from "Props" script (decoded once per page)
+    next_data = extract_page(html).next_data
     # extract urqlState json
     urql_state = extract_urql_state(next_data)
     # locate listings data id
@@ -125,7 +159,132 @@ def parse_graphql(html: str) -> list[dict]:
     return results
 
 
+def parse_search_meta(html: str | ExtractedPage) -> dict:
+    """Result count and page size of the search a page belongs to."""
+    urql_state = extract_urql_state(extract_page(html).next_data)
+    advert_search = decode_graphql_data(find_advert_search_state(urql_state))[
+        "advertSearch"
+    ]
+    page_info = advert_search.get("pageInfo") or {}
+
+    return {
+        "total_count": int(advert_search.get("totalCount") or 0),
+        "page_size": int(page_info.get("pageSize") or len(advert_search["edges"])),
+    }
+
+
+def benchmark_transliteration(offers: int = 2000, rows: int = 1_000_000, repeat=5):
+    import sys
+    import time
+
+    import pandas as pd
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    from synthetic_pages import REGIONS, make_search_page
+
+    def loop_correct(st):
+        # the per-character version this replaced
+        if st is None:
+            return ""
+        pol = {
+            "ą": "a",
+            "ć": "c",
+            "ę": "e",
+            "ł": "l",
+            "ń": "n",
+            "ó": "o",
+            "ś": "s",
+            "ź": "z",
+            "ż": "z",
+        }
+        return "".join([pol[c.lower()] if c.lower() in pol else c for c in st])
+
+    cached = correct_polish_label
+
+    def best(func, *args):
+        times = []
+        for _ in range(repeat):
+            cached.cache_clear()
+            start = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    # a pre-scanned page, so parse_graphql times the GraphQL decoding and
+    # the listing loop with its five transliterated fields
+    html = extract_page(make_search_page(offers_per_page=offers, last_page=1))
+    parse_graphql(html)
+    new_time = best(parse_graphql, html)
+
+    module = globals()
+    current = module["correct_polish_letters"], module["correct_polish_label"]
+    module["correct_polish_letters"] = module["correct_polish_label"] = loop_correct
+    old_time = best(parse_graphql, html)
+    module["correct_polish_letters"], module["correct_polish_label"] = current
+
+    # the five raw fields alone, without the JSON decoding around them
+    edges = decode_graphql_data(
+        find_advert_search_state(extract_urql_state(extract_page(html).next_data))
+    )["advertSearch"]["edges"]
+    fields = []
+    for edge in edges:
+        advert = edge["node"]
+        country = {p["key"]: p.get("displayValue") for p in advert["parameters"]}
+        labels = [
+            advert["sellerLink"]["name"],
+            country.get("country_origin"),
+            advert["location"]["city"]["name"],
+            advert["location"]["region"]["name"],
+        ]
+        fields.append((advert["shortDescription"], labels))
+
+    def transliterate(text, label):
+        for description, labels in fields:
+            text(description)
+            for value in labels:
+                label(value)
+
+    old_fields = best(transliterate, loop_correct, loop_correct)
+    new_fields = best(transliterate, correct_polish_letters, cached)
+
+    print(f"\n[RESULT] one page of {offers} listings, best of {repeat}")
+    print(f"{'':<20} {'5 fields':>9} {'parse_graphql':>14}")
+    for label, field_time, parse_time in [
+        ("per-character loop", old_fields, old_time),
+        ("translation table", new_fields, new_time),
+    ]:
+        print(
+            f"{label:<20} {field_time * 1000:6.2f} ms {parse_time * 1000:11.2f} ms"
+            f"  ({old_fields / field_time:.1f}x, {old_time / parse_time:.1f}x)"
+        )
+    print(f"cache: {cached.cache_info()}")
+
+    # the same values as a raw column of a large frame
+    cities = [city for names in REGIONS.values() for city in names]
+    column = pd.Series(cities * (rows // len(cities) + 1)).head(rows)
+
+    map_time = best(lambda: column.map(correct_polish_letters))
+    column_time = best(correct_polish_column, column)
+    pd.testing.assert_series_equal(
+        column.map(correct_polish_letters),
+        correct_polish_column(column),
+        check_dtype=False,
+    )
+    print(f"\n[RESULT] a column of {rows} city names")
+    print(f"Series.map             {map_time * 1000:8.2f} ms")
+    print(
+        f"correct_polish_column  {column_time * 1000:8.2f} ms"
+        f" ({map_time / column_time:.1f}x)"
+    )
+    print(f"e.g. {correct_polish_column(pd.Series(cities[:4])).tolist()}")
+
+
 if __name__ == "__main__":
+    import sys
+
+    if "--bench" in sys.argv:
+        benchmark_transliteration()
+        sys.exit()
 
     html_file_path = os.path.join(
         os.path.dirname(__file__),
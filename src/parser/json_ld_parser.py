@@ -1,23 +1,21 @@
-import json
 from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
 import os
 
+try:
+    from parser.extractor import ExtractedPage, extract_page
+except ImportError:  # running this file directly from src/parser
+    from extractor import ExtractedPage, extract_page
 
-def extract_json_ld(html: str) -> Optional[dict]:
-    soup = BeautifulSoup(html, "html.parser")
+try:
+    from metrics import instrument
+except ImportError:  # running this file directly from src/parser
 
-    script = soup.find(
-        "script", {"type": "application/ld+json", "id": "listing-json-ld"}
-    )
+    def instrument(stage, items=None):
+        return lambda func: func
 
-    if not script or not script.string:
-        return None
 
-    try:
-        return json.loads(script.string)
-    except json.JSONDecodeError:
-        return None
+def extract_json_ld(html: str | ExtractedPage) -> Optional[dict]:
+    return extract_page(html).json_ld
 
 
 def parse_offers(json_ld: dict) -> List[Dict]:
@@ -59,7 +57,8 @@ def parse_offers(json_ld: dict) -> List[Dict]:
     return results
 
 
-def parse_json_ld(html: str) -> List[Dict]:
+@instrument("parse_json_ld", items=len)
+def parse_json_ld(html: str | ExtractedPage) -> List[Dict]:
     json_ld = extract_json_ld(html)
 
     if not json_ld:
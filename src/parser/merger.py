@@ -1,23 +1,126 @@
+try:
+    from metrics import instrument
+except ImportError:  # running this file directly from src/parser
+
+    def instrument(stage, items=None):
+        return lambda func: func
+
+
+def merge_key(item: dict) -> tuple:
+    return item["price"], item["mileage"]
+
+
+def index_jsonld(jsonld: list[dict]) -> dict:
+    """Group JSON-LD offers by (price, mileage), keeping page order per key."""
+    index = {}
+    for ld in jsonld:
+        index.setdefault(merge_key(ld), []).append(ld)
+    return index
+
+
+def pick_match(candidates: list[dict], taken: set, gql_item: dict) -> dict:
+    """
+    Resolve offers sharing price and mileage: prefer an unused offer with the
+    same title, then the first unused one in page order. A lone candidate is
+    reused, as before, so a GraphQL item never loses its JSON-LD fields.
+    """
+    if len(candidates) == 1:
+        return candidates[0]
+
+    free = [i for i in range(len(candidates)) if i not in taken]
+    if not free:
+        return candidates[0]
+
+    chosen = next(
+        (i for i in free if candidates[i]["title"] == gql_item["title"]), free[0]
+    )
+    taken.add(chosen)
+    return candidates[chosen]
+
+
+@instrument("merge", items=len)
 def merge_jsonld_and_graphql(jsonld, graphql):
+    index = index_jsonld(jsonld)
+    taken = {}
     merged = []
 
     for gql_item in graphql:
-        match = next(
-            (
-                ld
-                for ld in jsonld
-                if ld["price"] == gql_item["price"]
-                and ld["mileage"] == gql_item["mileage"]
-            ),
-            {},
-        )
+        key = merge_key(gql_item)
+        candidates = index.get(key)
+
+        if candidates:
+            match = pick_match(candidates, taken.setdefault(key, set()), gql_item)
+        else:
+            match = {}
 
         merged.append({**match, **gql_item})
 
     return merged
 
 
+def merge_pages(pages) -> list[dict]:
+    """Merge many pages at once from (jsonld, graphql) pairs, in page order."""
+    merged = []
+    for jsonld, graphql in pages:
+        merged.extend(merge_jsonld_and_graphql(jsonld, graphql))
+    return merged
+
+
+def benchmark(offers: int = 500, pages: int = 20):
+    import random
+    import time
+
+    def merge_linear(jsonld, graphql):
+        # The previous implementation: a scan of the JSON-LD list per item
+        merged = []
+        for gql_item in graphql:
+            match = next(
+                (
+                    ld
+                    for ld in jsonld
+                    if ld["price"] == gql_item["price"]
+                    and ld["mileage"] == gql_item["mileage"]
+                ),
+                {},
+            )
+            merged.append({**match, **gql_item})
+        return merged
+
+    rng = random.Random(0)
+    batch = []
+    for _ in range(pages):
+        graphql = [
+            {
+                "id": str(i),
+                "title": f"Car {i}",
+                "price": float(rng.randint(100, 300) * 250),
+                "mileage": rng.randint(10, 150) * 1000,
+            }
+            for i in range(offers)
+        ]
+        jsonld = [
+            {"title": g["title"], "price": g["price"], "mileage": g["mileage"]}
+            for g in graphql
+        ]
+        batch.append((jsonld, graphql))
+
+    for name, func in [
+        ("linear scan", lambda: [merge_linear(ld, gql) for ld, gql in batch]),
+        ("hash index", lambda: merge_pages(batch)),
+    ]:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {elapsed / pages * 1000:8.2f} ms/page ({offers} offers)")
+
+
 if __name__ == "__main__":
+    import sys
+
+    if "--bench" in sys.argv:
+        for offers in (32, 200, 1000):
+            benchmark(offers=offers)
+        sys.exit()
 
     from json_ld_parser import parse_json_ld
     from graphql_parser import parse_graphql
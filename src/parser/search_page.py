@@ -0,0 +1,12 @@
+from parser.extractor import ExtractedPage, extract_page
+from parser.graphql_parser import parse_graphql
+from parser.json_ld_parser import parse_json_ld
+from parser.merger import merge_jsonld_and_graphql
+
+
+def parse_search_page(html: str | ExtractedPage) -> list[dict]:
+    # Scanned once for both parsers, and dropped with the page
+    page = extract_page(html)
+    jsonld = parse_json_ld(page)
+    graphql = parse_graphql(page)
+    return merge_jsonld_and_graphql(jsonld, graphql)
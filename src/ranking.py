@@ -0,0 +1,303 @@
+import operator
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+eval_csv_dir = Path.cwd().parent / Path("data/eval_csv")
+
+# The buyer's funnel notebook as a spec: the pool is every listing passing
+# "filters"; each component is percent-ranked within the pool and weighted
+# into value_score (lower is better) plus any matching penalties; "keep"
+# then narrows the ranked pool before the top entries are taken.
+DEFAULT_FUNNEL = {
+    "derive": {"km_per_year": "mileage / (car_age + 1)"},
+    "filters": [
+        ["zone_code", "in", ["S", "C"]],
+        ["km_per_year", "<=", 30000],
+    ],
+    "components": [
+        {"column": "price_per_km", "weight": 0.45},
+        {"column": "price_per_hp", "weight": 0.25},
+        {"column": "km_per_year", "weight": 0.20},
+        {"column": "year", "weight": 0.10, "ascending": False},
+    ],
+    "penalties": [{"where": ["cepikVerified", "!=", True], "value": 0.15}],
+    "keep": [["cepikVerified", "==", True]],
+    "top": 20,
+}
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda s, v: s.isin(v),
+    "not in": lambda s, v: ~s.isin(v),
+}
+
+
+def condition_mask(df: pd.DataFrame, condition: list) -> np.ndarray:
+    """Boolean array for one [column, op, value] condition; missing values fail."""
+    column, op, value = condition
+    if op not in OPERATORS:
+        raise ValueError(f"Unknown operator {op!r} in {condition}")
+    if column not in df.columns:
+        raise ValueError(f"Unknown column {column!r} in {condition}")
+    mask = OPERATORS[op](df[column], value)
+    return mask.to_numpy(dtype=bool, na_value=False)
+
+
+class RankedPool:
+    """
+    A funnel's pool with every component already percent-ranked, so
+    re-ranking under other weights is a matrix-vector product plus a
+    partial sort over the rows left by "keep".
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        rows: np.ndarray,
+        ranks: np.ndarray,
+        columns: list[str],
+        weights: np.ndarray,
+        penalty: np.ndarray,
+        keep: np.ndarray,
+    ):
+        self.df = df
+        self.rows = rows
+        self.ranks = ranks
+        self.columns = columns
+        self.weights = weights
+        self.penalty = penalty
+        self.keep = keep
+
+        # Only rows passing "keep" can be shortlisted; score just those
+        self.candidates = np.flatnonzero(keep)
+        self.candidate_ranks = np.ascontiguousarray(ranks[self.candidates])
+        self.candidate_penalty = penalty[self.candidates]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def weight_vector(self, weights: Optional[dict] = None) -> np.ndarray:
+        if not weights:
+            return self.weights
+        unknown = set(weights) - set(self.columns)
+        if unknown:
+            raise ValueError(f"No rank component for {sorted(unknown)}")
+        return np.array([weights.get(c, w) for c, w in zip(self.columns, self.weights)])
+
+    def scores(self, weights: Optional[dict] = None) -> np.ndarray:
+        """value_score of every pool row; rows with a missing rank score NaN."""
+        return self.ranks @ self.weight_vector(weights) + self.penalty
+
+    def top(self, k: int = 20, weights: Optional[dict] = None) -> pd.DataFrame:
+        """The k best rows after "keep", best first, with rank and score columns."""
+        scores = self.candidate_ranks @ self.weight_vector(weights)
+        scores += self.candidate_penalty
+        # Unscorable rows sort last, like NaN in sort_values, and are dropped
+        ordered = np.where(np.isnan(scores), np.inf, scores)
+        k = min(k, len(ordered) - np.count_nonzero(np.isnan(scores)))
+
+        if k <= 0:
+            best = np.array([], dtype=int)
+        elif k < len(ordered):
+            best = np.argpartition(ordered, k - 1)[:k]
+        else:
+            best = np.arange(len(ordered))
+        best = best[np.argsort(ordered[best], kind="stable")][:k]
+
+        pool_rows = self.candidates[best]
+        shortlist = self.df.iloc[self.rows[pool_rows]].copy()
+        for i, column in enumerate(self.columns):
+            shortlist[f"{column}_rank"] = self.ranks[pool_rows, i]
+        shortlist["penalty"] = self.penalty[pool_rows]
+        shortlist["value_score"] = scores[best]
+        return shortlist.reset_index(drop=True)
+
+
+class Funnel:
+    """A declarative filter-and-rank spec (see DEFAULT_FUNNEL) applied to listings."""
+
+    def __init__(self, spec: Optional[dict] = None):
+        self.spec = {**DEFAULT_FUNNEL, **(spec or {})}
+        if not self.spec["components"]:
+            raise ValueError("A funnel needs at least one rank component")
+
+    def prepare(self, df: pd.DataFrame) -> RankedPool:
+        """Derive columns, filter the pool and rank every component once."""
+        spec = self.spec
+        if spec["derive"]:
+            df = df.assign(
+                **{name: df.eval(expr) for name, expr in spec["derive"].items()}
+            )
+
+        conditions = spec["filters"] + [p["where"] for p in spec["penalties"]]
+        conditions += spec["keep"]
+        # Every condition in one pass over the frame, split afterwards
+        masks = np.empty((len(conditions), len(df)), dtype=bool)
+        for i, condition in enumerate(conditions):
+            masks[i] = condition_mask(df, condition)
+        n_filters, n_penalties = len(spec["filters"]), len(spec["penalties"])
+
+        # An empty group of conditions reduces to all True
+        rows = np.flatnonzero(np.logical_and.reduce(masks[:n_filters]))
+        masks = masks[:, rows]
+
+        penalty = np.zeros(len(rows))
+        for p, mask in zip(spec["penalties"], masks[n_filters:]):
+            penalty += np.where(mask, p["value"], 0.0)
+
+        keep = np.logical_and.reduce(masks[n_filters + n_penalties :])
+
+        pooled = df.iloc[rows]
+        components = spec["components"]
+        ranks = np.column_stack(
+            [
+                pooled[c["column"]]
+                .rank(pct=True, ascending=c.get("ascending", True))
+                .to_numpy(dtype=float, na_value=np.nan)
+                for c in components
+            ]
+        )
+
+        return RankedPool(
+            df,
+            rows,
+            ranks,
+            [c["column"] for c in components],
+            np.array([c["weight"] for c in components], dtype=float),
+            penalty,
+            keep,
+        )
+
+    def shortlist(
+        self, df: pd.DataFrame, k: Optional[int] = None, weights=None
+    ) -> pd.DataFrame:
+        return self.prepare(df).top(k or self.spec["top"], weights)
+
+
+def save_shortlist(shortlist: pd.DataFrame, scrape_date: str) -> Path:
+    eval_csv_dir.mkdir(parents=True, exist_ok=True)
+    path = eval_csv_dir / f"shortlist_{scrape_date}.csv"
+    shortlist.to_csv(path, index=False)
+    return path
+
+
+def notebook_funnel(df: pd.DataFrame, weights: list[float]) -> pd.DataFrame:
+    """The notebook's cells, for the benchmark: ranks and a full sort per weighting."""
+    df = df.assign(km_per_year=df["mileage"] / (df["car_age"] + 1))
+    df = df[df["zone_code"].isin(["S", "C"])]
+    df = df[df["km_per_year"] <= 30000].copy()
+    df["trust_penalty"] = np.where(df["cepikVerified"] == True, 0, 0.15)  # noqa: E712
+    df["ppk_rank"] = df["price_per_km"].rank(pct=True)
+    df["pphp_rank"] = df["price_per_hp"].rank(pct=True)
+    df["usage_rank"] = df["km_per_year"].rank(pct=True)
+    df["year_rank"] = df["year"].rank(pct=True, ascending=False)
+    df["value_score"] = (
+        df["ppk_rank"] * weights[0]
+        + df["pphp_rank"] * weights[1]
+        + df["usage_rank"] * weights[2]
+        + df["year_rank"] * weights[3]
+        + df["trust_penalty"]
+    )
+    df = df[df["cepikVerified"] == True]  # noqa: E712
+    return df.sort_values("value_score").head(20)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    arg_parser = argparse.ArgumentParser(
+        description="Rank processed listings with a funnel spec"
+    )
+    arg_parser.add_argument("--spec", type=Path, help="JSON funnel spec file")
+    arg_parser.add_argument(
+        "--date",
+        default=datetime.now().strftime("%Y%m%d"),
+        help="scrape_date partition to rank (YYYYMMDD)",
+    )
+    arg_parser.add_argument("--top", type=int)
+    arg_parser.add_argument(
+        "--weights",
+        type=json.loads,
+        help="override component weights, e.g. '{\"price_per_km\": 0.6}'",
+    )
+    arg_parser.add_argument(
+        "--save", action="store_true", help="write data/eval_csv/shortlist_DATE.csv"
+    )
+    arg_parser.add_argument(
+        "--bench",
+        type=int,
+        metavar="ROWS",
+        help="time re-ranking on synthetic rows instead",
+    )
+    args = arg_parser.parse_args()
+
+    spec = json.loads(args.spec.read_text(encoding="utf-8")) if args.spec else None
+    funnel = Funnel(spec)
+
+    if args.bench:
+        rng = np.random.default_rng(0)
+        n = args.bench
+        df = pd.DataFrame(
+            {
+                "zone_code": rng.choice(["N", "S", "C", "W", "E"], n),
+                "mileage": rng.integers(5, 250, n) * 1000,
+                "car_age": rng.integers(0, 10, n),
+                "year": rng.integers(2016, 2026, n),
+                "price_per_km": rng.uniform(0.2, 10, n).round(2),
+                "price_per_hp": rng.uniform(300, 900, n).round(0),
+                "cepikVerified": rng.random(n) < 0.7,
+            }
+        )
+        weightings = [rng.dirichlet(np.ones(4)).tolist() for _ in range(20)]
+        columns = [c["column"] for c in funnel.spec["components"]]
+
+        start = time.perf_counter()
+        for w in weightings:
+            expected = notebook_funnel(df, w)
+        notebook_time = (time.perf_counter() - start) / len(weightings)
+
+        start = time.perf_counter()
+        pool = funnel.prepare(df)
+        prepare_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for w in weightings:
+            shortlist = pool.top(20, dict(zip(columns, w)))
+        rerank_time = (time.perf_counter() - start) / len(weightings)
+
+        same = shortlist["value_score"].round(9).tolist() == (
+            expected["value_score"].round(9).tolist()
+        )
+        print(f"\n[RESULT] {n} listings, {len(pool)} in the pool, top 20")
+        print(f"notebook cells:  {notebook_time * 1000:8.1f} ms per weighting")
+        print(f"funnel prepare:  {prepare_time * 1000:8.1f} ms once")
+        print(f"funnel re-rank:  {rerank_time * 1000:8.2f} ms per weighting")
+        print(f"same scores as the notebook: {same}")
+    else:
+        from storage import read_listings
+
+        processed_root = Path.cwd().parent / Path("data/parquet/processed")
+        df = read_listings(processed_root, filters=[("scrape_date", "==", args.date)])
+        print(f"[INFO] Loaded {len(df)} listings for {args.date}")
+
+        pool = funnel.prepare(df)
+        shortlist = pool.top(args.top or funnel.spec["top"], args.weights)
+        print(f"[INFO] Pool {len(pool)}, shortlisted {len(shortlist)}")
+        print(
+            shortlist[
+                ["brand", "model", "year", "price_pln", "mileage", "value_score", "url"]
+            ].to_string()
+        )
+        if args.save:
+            print(f"[INFO] Saved: {save_shortlist(shortlist, args.date)}")
@@ -0,0 +1,253 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Status codes worth another attempt; anything else is final
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# The server asking us to slow down, as opposed to failing
+THROTTLE_STATUSES = {429, 503}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateController:
+    """
+    Paces request starts for one run and decides on retries. The interval
+    between requests shrinks a little after every healthy response and is
+    doubled on 429/503 or when latency climbs well above its usual level;
+    Retry-After holds all requests until the server's deadline. Spacing
+    never drops below `min_interval`, by default the 1 s floor of the old
+    polite_sleep, so a healthy site is never crawled faster one page after
+    another. Concurrent callers (the async engine) space requests with
+    their own per-host token buckets and call wait(spaced=False): they only
+    take on the slowdown above that floor and the Retry-After holds. Failed
+    GETs are retried with exponential backoff and full jitter until the
+    run's retry budget is spent. Thread-safe, so the async engine can share
+    it.
+    """
+
+    def __init__(
+        self,
+        interval: float = 1.5,
+        min_interval: float = 1.0,
+        max_interval: float = 30.0,
+        speedup: float = 0.95,
+        slowdown: float = 2.0,
+        jitter: float = 0.2,
+        max_attempts: int = 4,
+        retry_budget: int = 50,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+        slow_latency_factor: float = 3.0,
+    ):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.retry_budget = retry_budget
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.slow_latency_factor = slow_latency_factor
+
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+        self.latency = None  # EWMA of successful response times
+        self.stats = {
+            "requests": 0,
+            "ok": 0,
+            "errors": 0,
+            "throttled": 0,
+            "retries": 0,
+            "gave_up": 0,
+        }
+
+    def wait(self, spaced: bool = True):
+        """
+        Block until this thread may start its next request. Unspaced callers
+        leave the floor to their own pacing and are held back only by what
+        the server asked for: the interval's growth past `min_interval` and
+        any Retry-After deadline.
+        """
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            if spaced:
+                spacing = self.interval * random.uniform(
+                    1 - self.jitter, 1 + self.jitter
+                )
+                spacing = max(self.min_interval, spacing)
+            else:
+                spacing = max(0.0, self.interval - self.min_interval)
+            self.next_start = start + spacing
+            self.stats["requests"] += 1
+
+        if start > now:
+            time.sleep(start - now)
+
+    def record(self, status: Optional[int], latency: float, retry_after=None):
+        """
+        Feed back one response (`status` None for a network error) and adapt
+        the interval. Returns True if the response counts as a success.
+        """
+        with self.lock:
+            if status is not None and status < 400:
+                self.stats["ok"] += 1
+                usual = self.latency
+                self.latency = latency if usual is None else 0.8 * usual + 0.2 * latency
+
+                if usual is not None and latency > self.slow_latency_factor * usual:
+                    self.interval = min(self.max_interval, self.interval * 1.25)
+                else:
+                    self.interval = max(self.min_interval, self.interval * self.speedup)
+                return True
+
+            if status in THROTTLE_STATUSES:
+                self.stats["throttled"] += 1
+                self.interval = min(self.max_interval, self.interval * self.slowdown)
+
+                wait = parse_retry_after(retry_after)
+                if wait is not None:
+                    # Nobody starts a request before the server's deadline
+                    self.next_start = max(
+                        self.next_start, time.monotonic() + min(wait, self.backoff_cap)
+                    )
+            else:
+                self.stats["errors"] += 1
+            return False
+
+    def should_retry(self, status: Optional[int], attempt: int) -> bool:
+        """Whether attempt number `attempt` (1-based) may be followed by another."""
+        if status is not None and status not in RETRY_STATUSES:
+            return False
+
+        with self.lock:
+            if attempt >= self.max_attempts or self.retry_budget <= 0:
+                self.stats["gave_up"] += 1
+                return False
+            self.retry_budget -= 1
+            self.stats["retries"] += 1
+            return True
+
+    def backoff(self, attempt: int):
+        """Sleep before retry `attempt`: full jitter over an exponential window."""
+        window = min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+        time.sleep(random.uniform(0, window))
+
+    def report(self) -> str:
+        stats = self.stats
+        latency = f"{self.latency * 1000:.0f} ms" if self.latency else "n/a"
+        return (
+            f"Rate control: {stats['requests']} requests, {stats['ok']} ok, "
+            f"{stats['throttled']} throttled, {stats['errors']} errors, "
+            f"{stats['retries']} retries, {stats['gave_up']} gave up; "
+            f"interval {self.interval:.2f}s, latency {latency}, "
+            f"{self.retry_budget} retries left"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import requests
+
+    import paginator
+    from stub_server import start_stub_server
+
+    arg_parser = argparse.ArgumentParser(
+        description="Fixed polite_sleep vs adaptive rate control on a faulty stub"
+    )
+    arg_parser.add_argument("--fault-rate", type=float, default=0.1)
+    arg_parser.add_argument("--max-rps", type=float, default=5.0)
+    arg_parser.add_argument("--last-page", type=int, default=5)
+    # Both sides are scaled down from the live 1-2 s spacing to keep this short
+    arg_parser.add_argument("--interval", type=float, default=0.3)
+    args = arg_parser.parse_args()
+
+    cars = [
+        {"brand": "Volkswagen", "model": "Taigo"},
+        {"brand": "Seat", "model": "Ateca"},
+        {"brand": "Ford", "model": "Kuga"},
+        {"brand": "Ford", "model": "Puma"},
+        {"brand": "Skoda", "model": "Kamiq"},
+        {"brand": "Renault", "model": "Kadjar"},
+        {"brand": "Suzuki", "model": "SX4-S-Cross"},
+        {"brand": "Opel", "model": "Grandland-X"},
+    ]
+
+    def crawl(controller=None):
+        server, base_url = start_stub_server(
+            latency=0.02,
+            last_page=args.last_page,
+            fault_rate=args.fault_rate,
+            max_rps=args.max_rps,
+        )
+        base_args = {
+            "year_from": 2019,
+            "price_from": 50000,
+            "price_to": 75000,
+            "year_to": 2022,
+            "mileage_to": 150000,
+            "base_url": base_url,
+        }
+        session = requests.Session()
+        pages = aborted = 0
+
+        start = time.perf_counter()
+        for car in cars:
+            status = {}
+            for _ in paginator.iter_search_pages(
+                session,
+                base_args={**base_args, **car},
+                disable_tqdm=True,
+                status=status,
+                controller=controller,
+            ):
+                pages += 1
+            aborted += status.get("stop_reason") == "failed"
+        elapsed = time.perf_counter() - start
+
+        server.shutdown()
+        return pages, aborted, elapsed, server.faults
+
+    half = args.interval / 2
+    paginator.polite_sleep = lambda *a, **k: time.sleep(random.uniform(half, 3 * half))
+
+    results = {
+        "fixed polite_sleep": crawl(),
+        "adaptive": crawl(
+            AdaptiveRateController(
+                interval=args.interval,
+                min_interval=args.interval / 10,
+                backoff_base=args.interval,
+            )
+        ),
+    }
+
+    print(f"\n[RESULT] {len(cars)} models, up to {args.last_page} pages each")
+    for name, (pages, aborted, elapsed, faults) in results.items():
+        print(
+            f"{name:<20} {pages:3d} pages  {aborted} models aborted  "
+            f"{pages / elapsed * 60:6.1f} pages/min  server faults {faults}"
+        )
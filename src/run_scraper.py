@@ -1,137 +1,776 @@
+from __future__ import annotations
+
 from datetime import date, datetime
+import argparse
 import json
-import pandas as pd
-import requests
 from pathlib import Path
-import urllib3
-import subprocess
+import threading
+import time
+import uuid
 import os
-from tqdm import tqdm
 
-from paginator import iterate_search_pages
-from parser.json_ld_parser import parse_json_ld
-from parser.graphql_parser import parse_graphql
-from parser.merger import merge_jsonld_and_graphql
-from normalizer import normalize_dataframe
+from typing import TYPE_CHECKING, Iterable, Iterator
 
-# Check if tqdm should be used based on environment variable
-disable_tqdm = os.environ.get("USE_TQDM", "1") != "1"
+# Only light modules at import time: pandas, requests, tqdm and the stages
+# built on them are imported by the functions that use them, so --list-urls
+# and importing this module for run() stay fast (see startup_bench.py)
+from url_builder import NEWEST_FIRST, generate_paginated_urls, model_slugs
+from metrics import RunMetrics, current_metrics
+from parser.extractor import ExtractedPage
+from parser.search_page import parse_search_page
 
-# Define the project directory and script path
-project_dir = Path.cwd().parent
-scraper_script = project_dir / Path("src/run_scraper.py")
+if TYPE_CHECKING:
+    import requests
 
-# Start the scraper script as a background process
-with open(project_dir / "logs/scraper.log", "a") as log:
-    subprocess.Popen(
-        ["python", str(scraper_script)],
-        stdout=log,
-        stderr=log,
-    )
+    from history_store import ListingHistoryStore
+    from http_cache import HttpCache
+    from rate_control import AdaptiveRateController
 
-print(f"Started at {datetime.utcnow().isoformat()}", flush=True)
+# Check if tqdm should be used based on environment variable
+disable_tqdm = os.environ.get("USE_TQDM", "1") != "1"
+
+# "async" pipelines requests across models and pages (see async_fetcher)
+fetch_mode = os.environ.get("FETCH_MODE", "sync")
 
 base_dir = Path.cwd().parent
-config_path = base_dir / Path("data/json_parm/config.json")
+# SCRAPER_CONFIG points a CLI run at another config file
+config_path = Path(
+    os.environ.get("SCRAPER_CONFIG", base_dir / Path("data/json_parm/config.json"))
+)
 snapshot_dir = base_dir / Path("data/html_snapshots")
 raw_csv_dir = base_dir / Path("data/raw_csv")
 processed_csv_dir = base_dir / Path("data/processed_csv")
+parquet_dir = base_dir / Path("data/parquet")
+history_path = base_dir / Path("data/state/listing_history.sqlite")
+detail_cache_path = base_dir / Path("data/state/listing_details.sqlite")
+http_cache_dir = base_dir / Path("data/http_cache")
+metrics_dir = base_dir / Path("data/metrics")
 
+# Runs that enable the response cache share its directory, so they take turns
+http_cache_lock = threading.Lock()
 
-def parse_search_page(html: str) -> list[dict]:
-    jsonld = parse_json_ld(html)
-    graphql = parse_graphql(html)
-    return merge_jsonld_and_graphql(jsonld, graphql)
-
-
-def main():
 
-    global input_url, save_snapshots
+def load_config(path: Path = config_path, quiet: bool = False) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
 
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    session = requests.Session()
+    if quiet:
+        return config
 
-    pages = []
+    print(
+        f"[INFO] Loaded config.json: {len(config)} keys",
+        flush=True,
+    )
+    return config
+
+
+def iter_pages(
+    session: requests.Session,
+    config: dict,
+    input_url: str = "",
+    save_snapshots: bool = False,
+    fetch_mode: str = fetch_mode,
+    disable_tqdm: bool = disable_tqdm,
+    controller: AdaptiveRateController | None = None,
+    cache: HttpCache | None = None,
+    stop_reasons: dict | None = None,
+) -> Iterator[ExtractedPage]:
+    """
+    Yield search pages as they are fetched, for the URL or config.json run,
+    each already scanned by the check that accepted it.
+    `stop_reasons` gets the stop_reason of each config model's crawl (see
+    paginator.iter_search_pages), keyed by model_slugs(brand, model).
+    The run's `controller` and response `cache` go to every fetch.
+    """
+    from tqdm import tqdm
+
+    from async_fetcher import stream_search_pages
+    from paginator import iter_search_pages
 
     if input_url:
         print(f"[INFO] Scraping single URL: {input_url}", flush=True)
 
-        pages.extend(
-            iterate_search_pages(
+        if fetch_mode == "async":
+            yield from stream_search_pages(
+                [{"input_url": input_url}],
+                max_pages=20,
+                save_snapshots=save_snapshots,
+                snapshot_dir=snapshot_dir,
+                disable_tqdm=disable_tqdm,
+                controller=controller,
+                cache=cache,
+            )
+        else:
+            yield from iter_search_pages(
                 base_args={},
                 session=session,
                 max_pages=20,
                 input_url=input_url,
                 save_snapshots=save_snapshots,
                 snapshot_dir=snapshot_dir,
+                controller=controller,
+                cache=cache,
             )
+        return
+
+    cars = config["cars"]
+    base_args = config["base_args"]
+    if stop_reasons is None:
+        stop_reasons = {}
+
+    # The concurrent crawls report each job's stop_reason in its "status"
+    jobs = [{"base_args": {**base_args, **car}, "status": {}} for car in cars]
+
+    if config.get("sharded"):
+        from crawl_planner import stream_sharded_pages
+
+        # Complete coverage: oversized searches are split into shards first
+        print(f"[INFO] Sharded crawl of {len(jobs)} models", flush=True)
+
+        yield from stream_sharded_pages(
+            jobs,
+            page_limit=10,
+            save_snapshots=save_snapshots,
+            snapshot_dir=snapshot_dir,
+            controller=controller,
+            cache=cache,
+            **config.get("fetch", {}),
         )
-
-    else:
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-
-        print(
-            f"[INFO] Loaded config.json: {len(config)} keys",
-            flush=True,
+        for car, job in zip(cars, jobs):
+            key = model_slugs(car["brand"], car["model"])
+            stop_reasons[key] = job["status"].get("stop_reason")
+        return
+
+    if fetch_mode == "async":
+        print(f"[INFO] Async fetch of {len(jobs)} models", flush=True)
+
+        yield from stream_search_pages(
+            jobs,
+            max_pages=10,
+            save_snapshots=save_snapshots,
+            snapshot_dir=snapshot_dir,
+            disable_tqdm=disable_tqdm,
+            controller=controller,
+            cache=cache,
+            **config.get("fetch", {}),
+        )
+        for car, job in zip(cars, jobs):
+            key = model_slugs(car["brand"], car["model"])
+            stop_reasons[key] = job["status"].get("stop_reason")
+        return
+
+    for car in tqdm(cars, desc="Scraping models", leave=False, disable=disable_tqdm):
+        args = base_args.copy()
+        args.update(car)
+        status = {}
+
+        tqdm.write(f"\n[INFO] Scraping car: {car['brand']} {car['model']}")
+
+        if disable_tqdm:
+            print(f"[Processing {car['brand']} {car['model']}]", flush=True)
+
+        yield from iter_search_pages(
+            base_args=args,
+            session=session,
+            max_pages=10,
+            input_url=input_url,
+            save_snapshots=save_snapshots,
+            snapshot_dir=snapshot_dir,
+            disable_tqdm=disable_tqdm,
+            status=status,
+            controller=controller,
+            cache=cache,
+        )
+        key = model_slugs(car["brand"], car["model"])
+        stop_reasons[key] = status.get("stop_reason")
+
+
+def iter_incremental_listings(
+    session: requests.Session,
+    config: dict,
+    store: ListingHistoryStore,
+    save_snapshots: bool = False,
+    disable_tqdm: bool = disable_tqdm,
+    controller: AdaptiveRateController | None = None,
+    cache: HttpCache | None = None,
+    stop_reasons: dict | None = None,
+) -> Iterator[list[dict]]:
+    """
+    Crawl each model newest-first and stop paging it as soon as a page holds
+    only listings the history `store` already knows at an unchanged price.
+    Yields the parsed listings of every page fetched; `stop_reasons` is
+    filled as in iter_pages, with no reason for a model stopped early. The
+    store is only read: ingesting the run records what it saw, and marks
+    what disappeared from the models crawled to the end.
+    """
+    from tqdm import tqdm
+
+    from paginator import iter_search_pages
+
+    base_args = config["base_args"]
+    if stop_reasons is None:
+        stop_reasons = {}
+
+    for car in tqdm(
+        config["cars"], desc="Scraping models", leave=False, disable=disable_tqdm
+    ):
+        args = {**base_args, **car, "order": NEWEST_FIRST}
+        status = {}
+
+        tqdm.write(f"\n[INFO] Incremental scrape: {car['brand']} {car['model']}")
+
+        if disable_tqdm:
+            print(f"[Processing {car['brand']} {car['model']}]", flush=True)
+
+        pages = iter_search_pages(
+            base_args=args,
+            session=session,
+            max_pages=10,
+            save_snapshots=save_snapshots,
+            snapshot_dir=snapshot_dir,
+            disable_tqdm=disable_tqdm,
+            status=status,
+            controller=controller,
+            cache=cache,
         )
 
-        cars = config["cars"]
-        base_args = config["base_args"]
-
-        for car in tqdm(
-            cars, desc="Scraping models", leave=False, disable=disable_tqdm
-        ):
-            args = base_args.copy()
-            args.update(car)
+        for page in pages:
+            listings = parse_search_page(page)
+            fresh = store.count_fresh(listings)
+            yield listings
+
+            if fresh == 0:
+                tqdm.write("[STOP] Only known, unchanged listings on this page.")
+                pages.close()
+                break
+
+        key = model_slugs(car["brand"], car["model"])
+        stop_reasons[key] = status.get("stop_reason")
+
+
+def write_raw_listings(
+    page_listings: Iterable[list[dict]], path: Path, batch_size: int = 500
+):
+    """
+    Append each page's listings to a staging Parquet file in batches as they
+    arrive. Page HTML is dropped right after extraction, so memory stays
+    flat however many models and pages the run covers.
+    Returns (pages parsed, listings written).
+    """
+    from storage import RawListingsWriter
+
+    writer = RawListingsWriter(path)
+    batch = []
+    n_pages = n_listings = 0
+
+    try:
+        for listings in page_listings:
+            n_pages += 1
+            n_listings += len(listings)
+            batch.extend(listings)
+
+            if len(batch) >= batch_size:
+                writer.write(batch)
+                batch.clear()
+
+        if batch:
+            writer.write(batch)
+    finally:
+        writer.close()
+
+    return n_pages, n_listings
+
+
+def iter_replay_pages(source: Path, scrape_date: str | None = None) -> Iterator[str]:
+    """
+    Archived pages in place of the network: a snapshot archive directory
+    (optionally only the pages fetched on `scrape_date`), newest first so
+    deduplication keeps each listing's latest state, or a directory of
+    loose .html snapshot files.
+    """
+    from snapshot_archive import SnapshotArchive, is_archive
+
+    source = Path(source)
+    if is_archive(source):
+        archive = SnapshotArchive(source)
+        try:
+            # A page saved unchanged by several runs is parsed once
+            yield from archive.iter_html(
+                scrape_date=scrape_date, distinct=True, newest_first=True
+            )
+        finally:
+            archive.close()
+        return
+
+    for path in sorted(source.glob("*.html")):
+        yield path.read_text(encoding="utf-8")
+
+
+def latest_partition(root: Path, before: str) -> str | None:
+    """The newest scrape_date partition of `root` older than `before`."""
+    dates = [
+        path.name.split("=", 1)[1]
+        for path in root.glob("scrape_date=*")
+        if path.name.split("=", 1)[1] < before
+    ]
+    return max(dates, default=None)
+
+
+def carry_forward_listings(df_raw, models: Iterable[tuple[str, str]], before: str):
+    """
+    Listings of `models` ((brand, model) slug pairs) from each one's newest
+    raw partition older than `before` that `df_raw` does not hold. An
+    incremental crawl that stopped early only fetched the newest pages; as
+    far as the run knows, the listings behind them are unchanged, and
+    without them the day's partition would read as a much smaller market.
+    """
+    import pandas as pd
+
+    from storage import read_listings
+
+    root = parquet_dir / "raw"
+    carried = []
+    for brand, model in models:
+        dates = [
+            path.parent.parent.name.split("=", 1)[1]
+            for path in root.glob(f"scrape_date=*/brand={brand}/model={model}")
+        ]
+        latest = max((day for day in dates if day < before), default=None)
+        if latest is None:
+            continue
+
+        previous = read_listings(
+            root,
+            filters=[
+                ("scrape_date", "==", latest),
+                ("brand", "==", brand),
+                ("model", "==", model),
+            ],
+        )
+        previous = previous[~previous["id"].isin(df_raw["id"])]
+        carried.append(previous.reindex(columns=df_raw.columns))
+
+    if not carried:
+        return df_raw.iloc[:0]
+    # partition columns come back as categories
+    return pd.concat(carried, ignore_index=True).astype({"brand": str, "model": str})
+
+
+def stats_path(scrape_date: str) -> Path:
+    # A leading underscore keeps the file out of the dataset's listings
+    return parquet_dir / "processed" / f"scrape_date={scrape_date}" / "_stats.parquet"
+
+
+def list_search_urls(config: dict, max_pages: int = 10) -> list[str]:
+    """Every search URL a config.json run can request, without fetching any."""
+    urls = []
+    for car in config["cars"]:
+        args = {**config["base_args"], **car}
+        if config.get("incremental"):
+            args["order"] = NEWEST_FIRST
+        urls.extend(generate_paginated_urls(args, max_pages=max_pages))
+    return urls
+
+
+def run(
+    config: dict | None = None,
+    input_url: str = "",
+    save_snapshots: bool = False,
+    fetch_mode: str = fetch_mode,
+    disable_tqdm: bool = disable_tqdm,
+    run_id: str | None = None,
+    replay: Path | None = None,
+    replay_date: str | None = None,
+) -> dict:
+    """
+    Scrape, normalize and store one run in the calling process.
+    `config` defaults to config.json; pass `input_url` for a single search.
+    With `replay`, pages come from archived snapshots instead of the network
+    (see iter_replay_pages); only those fetched on `replay_date` are used,
+    and the outputs go to that day's partitions (see replay_archive for
+    every day). Returns the counts, the output paths and both DataFrames.
+    """
+    if replay is not None and replay_date is None:
+        # Today's partitions hold the live crawl; a replay must not replace them
+        raise ValueError("A replay needs the scrape date it rebuilds")
+
+    import pandas as pd
+    import requests
+    import urllib3
+
+    from get_eur import RateProvider
+    from history_store import ListingHistoryStore
+    from http_cache import HttpCache
+    from normalizer import normalize_dataframe
+    from rate_control import AdaptiveRateController
+    from storage import write_listings_parquet
+
+    print(f"[INFO] Started at {datetime.utcnow().isoformat()}", flush=True)
 
-            tqdm.write(f"\n[INFO] Scraping car: {car['brand']} {car['model']}")
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    session = requests.Session()
 
-            if disable_tqdm:
-                print(f"[Processing {car['brand']} {car['model']}]", flush=True)
+    today = replay_date or date.today().strftime("%Y%m%d")
+    # Concurrent runs in one process each stage to their own file
+    run_id = run_id or uuid.uuid4().hex[:8]
+
+    staging_path = parquet_dir / "staging" / f"raw_listings_{today}_{run_id}.parquet"
+
+    if config is None:
+        # Replays only read the output options, so config.json is optional
+        skip = input_url or (replay is not None and not config_path.exists())
+        config = {} if skip else load_config()
+
+    # {"metrics": true} - time every stage and save a JSON run report
+    metrics = RunMetrics(run_id) if config.get("metrics") else None
+    token = current_metrics.set(metrics)
+
+    try:
+        # Paces and retries every request of this run; tune via "rate_control"
+        controller = None
+        if replay is None:
+            controller = AdaptiveRateController(**config.get("rate_control", {}))
+
+        store = None
+        # How each model's crawl ended, for the listing history
+        stop_reasons = {}
+        started = time.perf_counter()
+        cache, cache_locked = None, False
+        try:
+            if "cache" in config and replay is None:
+                cache_locked = http_cache_lock.acquire()
+                # {"ttl": seconds, "max_mb": size} - serve repeat runs from disk
+                cache = HttpCache(
+                    http_cache_dir,
+                    ttl=config["cache"].get("ttl", 6 * 3600),
+                    max_bytes=config["cache"].get("max_mb", 200) * 1024 * 1024,
+                )
 
-            pages.extend(
-                iterate_search_pages(
-                    base_args=args,
-                    session=session,
-                    max_pages=10,
+            if replay is not None:
+                from crawl_planner import dedupe_listings
+                from parallel_parse import iter_parsed_pages
+
+                print(f"[INFO] Replaying snapshots from {replay}", flush=True)
+                pages = iter_replay_pages(replay, scrape_date=replay_date)
+                # Runs that archived the same search on one day overlap
+                page_listings = dedupe_listings(iter_parsed_pages(pages))
+            elif config.get("incremental"):
+                store = ListingHistoryStore(history_path)
+                page_listings = iter_incremental_listings(
+                    session,
+                    config,
+                    store,
+                    save_snapshots=save_snapshots,
+                    disable_tqdm=disable_tqdm,
+                    controller=controller,
+                    cache=cache,
+                    stop_reasons=stop_reasons,
+                )
+            else:
+                pages = iter_pages(
+                    session,
+                    config,
                     input_url=input_url,
                     save_snapshots=save_snapshots,
-                    snapshot_dir=snapshot_dir,
+                    fetch_mode=fetch_mode,
                     disable_tqdm=disable_tqdm,
+                    controller=controller,
+                    cache=cache,
+                    stop_reasons=stop_reasons,
                 )
+                page_listings = map(parse_search_page, pages)
+
+                if config.get("sharded"):
+                    from crawl_planner import dedupe_listings
+
+                    page_listings = dedupe_listings(page_listings)
+
+            n_pages, n_listings = write_raw_listings(page_listings, staging_path)
+        finally:
+            if controller is not None:
+                print(f"[INFO] {controller.report()}", flush=True)
+
+            if store is not None:
+                store.close()
+
+            if cache is not None:
+                print(f"[INFO] {cache.report()}", flush=True)
+                cache.close()
+            if cache_locked:
+                http_cache_lock.release()
+
+        print(f"\n[INFO] Collected {n_pages} pages.", flush=True)
+        print(f"\n[INFO] Parsed {n_listings} listings.", flush=True)
+
+        if replay is not None and n_pages == 0:
+            staging_path.unlink(missing_ok=True)
+            print(f"[STOP] No archived pages to replay in {replay}", flush=True)
+            return {"run_id": run_id, "scrape_date": today, "pages": 0, "listings": 0}
+
+        if replay is not None:
+            elapsed = time.perf_counter() - started
+            print(
+                f"[INFO] Replayed {n_pages} pages in {elapsed:.2f}s"
+                f" ({n_pages / max(elapsed, 1e-9):.1f} pages/s)",
+                flush=True,
             )
 
-    print(f"\n[INFO] Collected {len(pages)} pages.", flush=True)
+        df_raw = df_fetched = pd.read_parquet(staging_path)
+        if config.get("incremental") and replay is None:
+            partial = [
+                key
+                for key, reason in stop_reasons.items()
+                if reason not in ("last", "zero")
+            ]
+            carried = carry_forward_listings(df_raw, partial, before=today)
+            if len(carried):
+                print(
+                    f"[INFO] Carried {len(carried)} listings forward for"
+                    f" {len(partial)} models that stopped early",
+                    flush=True,
+                )
+                df_raw = pd.concat([df_raw, carried], ignore_index=True)
+        write_listings_parquet(df_raw, parquet_dir / "raw", today)
+        staging_path.unlink()
+        print(f"[INFO] Raw listings saved: {parquet_dir / 'raw'}", flush=True)
+
+        # Replayed pages are old observations; they must not move listing history
+        if replay is None:
+            # Absence only means a sale for models crawled to the last page; a
+            # crawl cut short by max_pages, a failed fetch or an incremental
+            # stop says nothing about the listings it did not reach
+            complete = [
+                key
+                for key, reason in stop_reasons.items()
+                if reason in ("last", "zero")
+            ]
+            history = ListingHistoryStore(history_path)
+            # only what this run fetched counts as seen today
+            written, gone = history.ingest(df_fetched, today, complete_models=complete)
+            history.close()
+            print(
+                f"[INFO] History: {written} new snapshots, {gone} disappeared",
+                flush=True,
+            )
+
+        # Normalize data; {"incremental_normalize": true} starts from the last
+        # processed partition and only normalizes the listings whose raw row
+        # is new or differs from that day's raw partition, and
+        # {"lean_dtypes": true} stores the result in less memory (shrink_dtypes)
+        previous_date = None
+        if config.get("incremental_normalize"):
+            previous_date = latest_partition(parquet_dir / "processed", before=today)
+
+        # {"fallback_eur_rate": 4.3} - used when no ECB rate is cached and
+        # the download fails; without it such a run stops with an error
+        rates = RateProvider(fallback_rate=config.get("fallback_eur_rate"))
+        dataset_stats = None
+        if previous_date is None:
+            df_processed = normalize_dataframe(
+                df_raw,
+                rates=rates,
+                historical_rates=config.get("historical_rates", False),
+                lean=config.get("lean_dtypes", False),
+            )
+        else:
+            from normalizer import (
+                DatasetStats,
+                changed_listing_ids,
+                normalize_incremental,
+                shrink_dtypes,
+            )
+            from storage import read_listings
 
-    listings = []
-    for page in tqdm(pages, desc="Parsing listings"):
-        listings.extend(parse_search_page(page))
+            previous_filter = [("scrape_date", "==", previous_date)]
+            changed = changed_listing_ids(
+                df_raw, read_listings(parquet_dir / "raw", filters=previous_filter)
+            )
+            saved = stats_path(previous_date)
+            df_processed, dataset_stats = normalize_incremental(
+                df_raw,
+                read_listings(parquet_dir / "processed", filters=previous_filter),
+                changed,
+                stats=DatasetStats.load(saved) if saved.exists() else None,
+                rates=rates,
+                historical_rates=config.get("historical_rates", False),
+            )
+            print(
+                f"[INFO] Normalized {len(changed)} new or changed listings,"
+                f" the rest carried over from {previous_date}",
+                flush=True,
+            )
+            if config.get("lean_dtypes"):
+                df_processed = shrink_dtypes(df_processed)
+                # the counts must match the values as they are stored
+                dataset_stats = None
+        rates.close()
+
+        # {"enrich": {"query": "...", "limit": n}} - add listing page details;
+        # replays only join what earlier runs already fetched
+        if config.get("enrich"):
+            from enricher import DetailCache, enrich_listings
+
+            options = config["enrich"] if isinstance(config["enrich"], dict) else {}
+            details = DetailCache(detail_cache_path)
+            stats = {}
+            df_processed = enrich_listings(
+                df_processed,
+                details,
+                fetch=replay is None,
+                base_url=config.get("base_args", {}).get("base_url"),
+                stats=stats,
+                controller=controller,
+                **{**config.get("fetch", {}), **options},
+            )
+            details.close()
+            print(
+                f"[INFO] Enriched {stats['selected']} listings: {stats['fetched']}"
+                f" fetched, {stats['cached']} cached, {stats['failed']} failed",
+                flush=True,
+            )
 
-    print(f"\n[INFO] Parsed {len(listings)} listings.", flush=True)
+        write_listings_parquet(df_processed, parquet_dir / "processed", today)
+        if config.get("incremental_normalize"):
+            from normalizer import DatasetStats
 
-    df_raw = pd.DataFrame(listings)
-    today = date.today().strftime("%Y%m%d")
+            # saved with the partition, so the next run need not rebuild them
+            if dataset_stats is None:
+                dataset_stats = DatasetStats.from_frame(df_processed)
+            dataset_stats.save(stats_path(today))
+        print(
+            f"[INFO] Processed listings saved: {parquet_dir / 'processed'}", flush=True
+        )
 
-    raw_csv_dir.mkdir(parents=True, exist_ok=True)
-    raw_path = raw_csv_dir / f"raw_listings_{today}.csv"
+        result = {
+            "run_id": run_id,
+            "scrape_date": today,
+            "pages": n_pages,
+            "listings": n_listings,
+            "raw_dir": parquet_dir / "raw",
+            "processed_dir": parquet_dir / "processed",
+            "raw": df_raw,
+            "processed": df_processed,
+        }
+
+        # {"funnel": true or a spec} - rank this run's listings (see ranking.py)
+        if config.get("funnel"):
+            from ranking import Funnel, save_shortlist
+
+            spec = config["funnel"] if isinstance(config["funnel"], dict) else None
+            funnel = Funnel(spec)
+            pool = funnel.prepare(df_processed)
+            shortlist = pool.top(funnel.spec["top"])
+            result["shortlist"] = shortlist
+            result["shortlist_csv"] = save_shortlist(shortlist, today)
+            print(
+                f"[INFO] Shortlisted {len(shortlist)} of {len(pool)} listings:"
+                f" {result['shortlist_csv']}",
+                flush=True,
+            )
 
-    df_raw.to_csv(raw_path, index=False)
-    print(f"[INFO] Raw listings saved: {raw_path}", flush=True)
+        if config.get("csv_export"):
+            raw_csv_dir.mkdir(parents=True, exist_ok=True)
+            raw_path = raw_csv_dir / f"raw_listings_{today}.csv"
+            df_raw.to_csv(raw_path, index=False)
 
-    # Normalize data
-    df_processed = normalize_dataframe(df_raw)
+            processed_csv_dir.mkdir(parents=True, exist_ok=True)
+            processed_path = processed_csv_dir / f"processed_listings_{today}.csv"
+            df_processed.to_csv(processed_path, index=False)
 
-    processed_csv_dir.mkdir(parents=True, exist_ok=True)
-    processed_path = processed_csv_dir / f"processed_listings_{today}.csv"
+            print(f"[INFO] CSV export saved: {raw_path}, {processed_path}", flush=True)
+            result["csv"] = [raw_path, processed_path]
 
-    df_processed.to_csv(processed_path, index=False)
-    print(f"[INFO] Processed listings saved: {processed_path}", flush=True)
+        if metrics is not None:
+            report = {**metrics.report(), "pages": n_pages, "listings": n_listings}
+            metrics_dir.mkdir(parents=True, exist_ok=True)
+            report_path = metrics_dir / f"run_{today}_{run_id}.json"
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"[INFO] Metrics report saved: {report_path}", flush=True)
+            result["metrics"] = report
 
-    print(f"[INFO] Done at {datetime.utcnow().isoformat()}", flush=True)
+        print(f"[INFO] Done at {datetime.utcnow().isoformat()}", flush=True)
+        return result
+    finally:
+        current_metrics.reset(token)
 
 
-if __name__ == "__main__":
+def replay_archive(config: dict | None, source: Path) -> list[dict]:
+    """Replay every day of a snapshot archive into that day's partitions."""
+    from snapshot_archive import SnapshotArchive, is_archive
+
+    if not is_archive(source):
+        print(
+            f"[STOP] {source} is not a snapshot archive; pass --replay-date"
+            " to replay loose .html files into one day",
+            flush=True,
+        )
+        return []
+
+    archive = SnapshotArchive(source)
+    scrape_dates = archive.scrape_dates()
+    archive.close()
+
+    print(f"[INFO] Replaying {len(scrape_dates)} archived days", flush=True)
+    return [run(config, replay=source, replay_date=day) for day in scrape_dates]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="otomoto search scraper")
+    arg_parser.add_argument("--config", type=Path, default=config_path)
+    arg_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="show how many search URLs each model would request, fetch nothing",
+    )
+    arg_parser.add_argument(
+        "--list-urls",
+        action="store_true",
+        help="print every search URL the run would request, fetch nothing",
+    )
+    arg_parser.add_argument(
+        "--replay",
+        nargs="?",
+        const=snapshot_dir,
+        type=Path,
+        help="rebuild the outputs from archived pages (default: data/html_snapshots)",
+    )
+    arg_parser.add_argument(
+        "--replay-date",
+        help="only replay pages fetched on this day (YYYYMMDD); default: every"
+        " archived day, each into its own partition",
+    )
+    arg_parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="save per-stage timings and counters to data/metrics",
+    )
+    args = arg_parser.parse_args()
+
+    if args.replay is not None:
+        config = load_config(args.config) if args.config.exists() else {}
+        if args.metrics:
+            config["metrics"] = True
+        if args.replay_date:
+            run(config, replay=args.replay, replay_date=args.replay_date)
+        else:
+            replay_archive(config, args.replay)
+        return
+
+    if args.dry_run or args.list_urls:
+        # --list-urls output is only URLs, so it can be piped
+        config = load_config(args.config, quiet=args.list_urls)
+        urls = list_search_urls(config)
+
+        if args.list_urls:
+            for url in urls:
+                print(url)
+        else:
+            for car in config["cars"]:
+                n_urls = len(list_search_urls({**config, "cars": [car]}))
+                print(f"[INFO] {car['brand']} {car['model']}: {n_urls} URLs")
+            print(f"[INFO] Dry run: {len(urls)} search URLs, nothing fetched")
+        return
 
     input_url = ""
     if input_url:
@@ -141,4 +780,11 @@ if __name__ == "__main__":
     save_snapshots = input_snapshot.strip().lower() == "y"
     print(f"[INFO] HTML Snapshots will be saved: {save_snapshots}", flush=True)
 
+    config = None if input_url else load_config(args.config)
+    if args.metrics and config is not None:
+        config["metrics"] = True
+    run(config, input_url=input_url, save_snapshots=save_snapshots)
+
+
+if __name__ == "__main__":
     main()
@@ -0,0 +1,334 @@
+import hashlib
+import mmap
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    segment INTEGER,
+    offset INTEGER,
+    length INTEGER,
+    raw_size INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    url TEXT,
+    brand TEXT,
+    model TEXT,
+    page INTEGER,
+    scrape_date TEXT,
+    fetched_at REAL,
+    hash TEXT
+);
+CREATE INDEX IF NOT EXISTS pages_date ON pages (scrape_date, brand, model);
+"""
+
+
+class SnapshotArchive:
+    """
+    Append-only archive of fetched HTML pages.
+    Each distinct page body is zlib-compressed once and appended to the
+    current segment file (segment-000001.bin, ...); a SQLite index maps
+    every snapshot (url, model, page, fetch time) to its content hash and
+    the hash to an offset in a segment. A page fetched again unchanged on a
+    later run only adds an index row. Segments are read back through mmap.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        level: int = 6,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.level = level
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.root / "index.sqlite", check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+        (last,) = self.conn.execute("SELECT MAX(segment) FROM blobs").fetchone()
+        self.segment = last or 1
+        self.writer = None
+        self.maps = {}
+
+    def segment_path(self, segment: int) -> Path:
+        return self.root / f"segment-{segment:06d}.bin"
+
+    def _append(self, data: bytes) -> tuple[int, int]:
+        if self.writer is None:
+            self.writer = open(self.segment_path(self.segment), "ab")
+
+        if (
+            self.writer.tell()
+            and self.writer.tell() + len(data) > self.max_segment_bytes
+        ):
+            self.writer.close()
+            self.segment += 1
+            self.writer = open(self.segment_path(self.segment), "ab")
+
+        offset = self.writer.tell()
+        self.writer.write(data)
+        self.writer.flush()
+        return self.segment, offset
+
+    def add(
+        self,
+        html: str,
+        url: str = "",
+        brand: Optional[str] = None,
+        model: Optional[str] = None,
+        page: Optional[int] = None,
+        fetched_at: Optional[float] = None,
+    ) -> bool:
+        """Record one fetched page. Returns False if its body was already stored."""
+        raw = html.encode("utf-8")
+        digest = hashlib.sha1(raw).hexdigest()
+        fetched_at = fetched_at or time.time()
+        scrape_date = datetime.fromtimestamp(fetched_at).strftime("%Y%m%d")
+
+        with self.lock:
+            known = self.conn.execute(
+                "SELECT 1 FROM blobs WHERE hash = ?", (digest,)
+            ).fetchone()
+
+            if known is None:
+                data = zlib.compress(raw, self.level)
+                segment, offset = self._append(data)
+                self.conn.execute(
+                    "INSERT INTO blobs VALUES (?, ?, ?, ?, ?)",
+                    (digest, segment, offset, len(data), len(raw)),
+                )
+
+            self.conn.execute(
+                "INSERT INTO pages (url, brand, model, page, scrape_date, fetched_at,"
+                " hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    brand and brand.lower(),
+                    model and model.lower(),
+                    page,
+                    scrape_date,
+                    fetched_at,
+                    digest,
+                ),
+            )
+            self.conn.commit()
+
+        return known is None
+
+    def snapshots(
+        self,
+        scrape_date: Optional[str] = None,
+        brand: Optional[str] = None,
+        model: Optional[str] = None,
+        distinct: bool = False,
+        newest_first: bool = False,
+    ) -> list[dict]:
+        """
+        Index rows, oldest first (or newest first), optionally for one day
+        and/or model. With `distinct`, only the first snapshot of each page
+        body in that order is kept.
+        """
+        clauses, params = [], []
+        for column, value in [
+            ("scrape_date", scrape_date),
+            ("brand", brand and brand.lower()),
+            ("model", model and model.lower()),
+        ]:
+            if value is not None:
+                clauses.append(f"p.{column} = ?")
+                params.append(value)
+
+        order = "DESC" if newest_first else "ASC"
+        if distinct:
+            pick = "MAX" if newest_first else "MIN"
+            clauses.append(
+                f"p.id IN (SELECT {pick}(id) FROM pages p"
+                f"{' WHERE ' + ' AND '.join(clauses) if clauses else ''} GROUP BY hash)"
+            )
+            params = params * 2
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock:
+            cursor = self.conn.execute(
+                "SELECT p.url, p.brand, p.model, p.page, p.scrape_date, p.fetched_at,"
+                " p.hash, b.segment, b.offset, b.length"
+                f" FROM pages p JOIN blobs b ON b.hash = p.hash {where}"
+                f" ORDER BY p.id {order}",
+                params,
+            )
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def _map(self, segment: int) -> mmap.mmap:
+        if self.writer is not None and segment == self.segment:
+            self.writer.flush()
+
+        mapped = self.maps.get(segment)
+        # The current segment may have grown since it was mapped
+        if mapped is None or (
+            segment == self.segment
+            and mapped.size() != self.segment_path(segment).stat().st_size
+        ):
+            if mapped is not None:
+                mapped.close()
+            with open(self.segment_path(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[segment] = mapped
+        return mapped
+
+    def read(self, snapshot: dict) -> str:
+        """Body of one index row returned by snapshots()."""
+        start = snapshot["offset"]
+        with self.lock:
+            mapped = self._map(snapshot["segment"])
+            data = mapped[start : start + snapshot["length"]]
+        return zlib.decompress(data).decode("utf-8")
+
+    def scrape_dates(self) -> list[str]:
+        """Every day with archived pages, oldest first."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT scrape_date FROM pages ORDER BY scrape_date"
+            ).fetchall()
+        return [scrape_date for (scrape_date,) in rows]
+
+    def iter_html(self, **filters) -> Iterator[str]:
+        """Stream the bodies of the matching snapshots in fetch order."""
+        for snapshot in self.snapshots(**filters):
+            yield self.read(snapshot)
+
+    def stats(self) -> dict:
+        with self.lock:
+            (pages,) = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+            blobs, stored, raw = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0),"
+                " COALESCE(SUM(raw_size), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "pages": pages,
+            "blobs": blobs,
+            "stored_bytes": stored,
+            "raw_bytes": raw,
+        }
+
+    def close(self):
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+            for mapped in self.maps.values():
+                mapped.close()
+            self.maps.clear()
+            self.conn.close()
+
+
+def is_archive(root: str | Path) -> bool:
+    return (Path(root) / "index.sqlite").exists()
+
+
+# One archive per directory and process, shared by every writer
+open_archives = {}
+open_archives_lock = threading.Lock()
+
+
+def get_archive(root: str | Path) -> SnapshotArchive:
+    key = Path(root).resolve()
+    with open_archives_lock:
+        if key not in open_archives:
+            open_archives[key] = SnapshotArchive(key)
+        return open_archives[key]
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    from parallel_parse import parse_page_safe
+    from synthetic_pages import make_search_page
+
+    arg_parser = argparse.ArgumentParser(
+        description="Disk use and reparse speed: .html files vs the archive"
+    )
+    arg_parser.add_argument("--models", type=int, default=10)
+    arg_parser.add_argument("--pages", type=int, default=10)
+    arg_parser.add_argument("--runs", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    brands = [("Volkswagen", "Taigo"), ("Seat", "Ateca"), ("Ford", "Kuga")]
+    # Every run after the first sees the same pages again, plus one new page
+    runs = [
+        [
+            (brand, f"{model}{m}", page, make_search_page(brand, f"{model}{m}", page))
+            for brand, model in brands
+            for m in range(args.models)
+            for page in range(1, args.pages + 1)
+        ]
+        + [(brands[0][0], "Extra", run + 1, make_search_page("Extra", "Run", run + 1))]
+        for run in range(args.runs)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The old layout keeps one file per page per run (runs overwrite
+        # each other by name, so each run gets its own directory here)
+        html_dir = Path(tmp) / "html"
+        for run, pages in enumerate(runs):
+            run_dir = html_dir / f"run{run}"
+            run_dir.mkdir(parents=True)
+            for brand, model, page, html in pages:
+                path = run_dir / f"{brand.lower()}_{model.lower()}_page_{page}.html"
+                path.write_text(html, encoding="utf-8")
+
+        archive = SnapshotArchive(Path(tmp) / "archive")
+        start = time.perf_counter()
+        for pages in runs:
+            for brand, model, page, html in pages:
+                archive.add(html, brand=brand, model=model, page=page)
+        write_time = time.perf_counter() - start
+
+        html_files = list(html_dir.rglob("*.html"))
+        html_bytes = sum(p.stat().st_size for p in html_files)
+        archive_bytes = sum(p.stat().st_size for p in archive.root.iterdir())
+        stats = archive.stats()
+
+        start = time.perf_counter()
+        from_files = sum(
+            len(parse_page_safe(p.read_text(encoding="utf-8"))) for p in html_files
+        )
+        files_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        from_archive = sum(len(parse_page_safe(html)) for html in archive.iter_html())
+        archive_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read_only = sum(len(html) for html in archive.iter_html())
+        read_time = time.perf_counter() - start
+
+        archive.close()
+
+    n = stats["pages"]
+    print(f"\n[RESULT] {n} snapshots over {args.runs} runs, {stats['blobs']} distinct")
+    print(
+        f".html files: {html_bytes / n / 1024:6.1f} KiB/page"
+        f" in {len(html_files)} files"
+    )
+    print(
+        f"archive:     {archive_bytes / n / 1024:6.1f} KiB/page"
+        f" in {stats['blobs']} blobs ({write_time:.2f}s to write)"
+    )
+    print(
+        f"reparse files:   {n / files_time:7.1f} pages/s ({from_files} listings)\n"
+        f"reparse archive: {n / archive_time:7.1f} pages/s ({from_archive} listings)\n"
+        f"archive read only: {n / read_time:7.1f} pages/s"
+    )
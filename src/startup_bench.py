@@ -0,0 +1,98 @@
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Import-time budget per entry point, in milliseconds of cumulative import time
+BUDGETS_MS = {
+    "import run_scraper": 150,
+    "run_scraper.py --list-urls": 150,
+}
+
+# Modules the scraper only needs once it actually fetches or normalizes
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "requests", "tqdm", "bs4"]
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+results_path = Path.cwd().parent / Path("documentation/startup_times.json")
+
+
+def importtime(args: list[str]) -> dict:
+    """
+    Run `python -X importtime` and total the top-level imports.
+    Returns wall time, cumulative import time and the slowest modules.
+    """
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+
+    modules = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = int(cumulative_us)
+        if len(indent) == 1:  # top-level import
+            total_us += int(cumulative_us)
+
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "returncode": proc.returncode,
+        "wall_ms": round(wall * 1000, 1),
+        "import_ms": round(total_us / 1000, 1),
+        "heavy": [name for name in HEAVY_MODULES if name in modules],
+        "slowest": [(name, round(us / 1000, 1)) for name, us in slowest[:8]],
+    }
+
+
+def measure(config_path: str) -> dict:
+    return {
+        "import run_scraper": importtime(["-c", "import run_scraper"]),
+        "run_scraper.py --list-urls": importtime(
+            ["run_scraper.py", "--list-urls", "--config", config_path]
+        ),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Scraper start-up benchmark")
+    arg_parser.add_argument(
+        "--config", default=str(Path.cwd().parent / "data/json_parm/config.json")
+    )
+    arg_parser.add_argument(
+        "--save", action="store_true", help=f"record the results in {results_path}"
+    )
+    args = arg_parser.parse_args()
+
+    results = measure(args.config)
+    over_budget = False
+
+    for entry, result in results.items():
+        budget = BUDGETS_MS[entry]
+        status = "ok" if result["import_ms"] <= budget else "OVER BUDGET"
+        over_budget |= status != "ok" or result["returncode"] != 0
+
+        print(f"\n[RESULT] {entry}")
+        print(f"wall time       {result['wall_ms']:8.1f} ms")
+        print(f"import time     {result['import_ms']:8.1f} ms  ({status}, {budget} ms)")
+        print(f"heavy modules   {', '.join(result['heavy']) or 'none'}")
+        for name, ms in result["slowest"]:
+            print(f"  {name:<36}{ms:8.1f} ms")
+
+    if args.save:
+        results_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(results_path, "w", encoding="utf-8") as f:
+            json.dump({"budgets_ms": BUDGETS_MS, "results": results}, f, indent=2)
+        print(f"\n[INFO] Saved: {results_path}")
+
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,145 @@
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# =========================
+# SCHEMAS
+# =========================
+
+# One row per merged listing, as produced by parse_search_page
+RAW_SCHEMA = pa.schema(
+    [
+        ("title", pa.string()),
+        ("brand", pa.string()),
+        ("fuel_type", pa.string()),
+        ("mileage", pa.int64()),
+        ("price", pa.float64()),
+        ("currency", pa.string()),
+        ("source", pa.string()),
+        ("id", pa.string()),
+        ("date_added", pa.timestamp("us", tz="UTC")),
+        ("short_description", pa.string()),
+        ("url", pa.string()),
+        ("seller_name", pa.string()),
+        ("seller_site", pa.string()),
+        ("model", pa.string()),
+        ("version", pa.string()),
+        ("year", pa.int64()),
+        ("gearbox", pa.string()),
+        ("country_code", pa.string()),
+        ("country_origin", pa.string()),
+        ("engine_capacity", pa.int64()),
+        ("engine_power", pa.int64()),
+        ("city", pa.string()),
+        ("region", pa.string()),
+        ("bump_up", pa.string()),
+        ("export_olx", pa.string()),
+        ("priceevaluation", pa.string()),
+        ("cepikVerified", pa.bool_()),
+    ]
+)
+
+PARTITION_COLS = ["scrape_date", "brand", "model"]
+
+# Partition values are read back as strings, so "20260102" stays a date key
+PARTITIONING = ds.partitioning(
+    pa.schema([(col, pa.string()) for col in PARTITION_COLS]), flavor="hive"
+)
+
+# Low-cardinality text stored dictionary-encoded and read back as categoricals
+CATEGORICAL_COLS = [
+    "fuel_type",
+    "gearbox",
+    "currency",
+    "source",
+    "country_code",
+    "country_origin",
+    "region",
+    "zone_code",
+    "engine_family",
+    "drivetrain",
+    "trim",
+    "priceevaluation",
+]
+
+
+# =========================
+# RAW STAGING
+# =========================
+
+
+def raw_batch_table(batch: list[dict]) -> pa.Table:
+    df = pd.DataFrame(batch, columns=RAW_SCHEMA.names)
+    df["date_added"] = pd.to_datetime(df["date_added"], utc=True, errors="coerce")
+    for col in ["bump_up", "export_olx"]:
+        df[col] = df[col].astype("string")
+    return pa.Table.from_pandas(df, schema=RAW_SCHEMA, preserve_index=False)
+
+
+class RawListingsWriter:
+    """
+    Appends batches of raw listings to a single Parquet file, one row group
+    per batch, so the crawl can stream to disk with a fixed schema.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.writer = pq.ParquetWriter(self.path, RAW_SCHEMA, compression="zstd")
+
+    def write(self, batch: list[dict]):
+        self.writer.write_table(raw_batch_table(batch))
+
+    def close(self):
+        self.writer.close()
+
+
+# =========================
+# PARTITIONED DATASETS
+# =========================
+
+
+def write_listings_parquet(df: pd.DataFrame, root: str | Path, scrape_date: str):
+    """
+    Write one run's listings under root/scrape_date=.../brand=.../model=...
+    Rerunning the same day replaces that day's files for the models written.
+    """
+    df = df.assign(scrape_date=scrape_date)
+
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        root_path=str(root),
+        partition_cols=PARTITION_COLS,
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+        compression="zstd",
+    )
+
+
+def read_listings(
+    root: str | Path,
+    columns: list[str] | None = None,
+    filters: list[tuple] | None = None,
+) -> pd.DataFrame:
+    """
+    Load listings from a partitioned dataset, reading only `columns` and
+    pushing `filters` (e.g. [("scrape_date", "==", "20260102")]) down to
+    partition pruning and row-group statistics.
+    """
+    dataset = ds.dataset(str(root), format="parquet", partitioning=PARTITIONING)
+    expression = pq.filters_to_expression(filters) if filters else None
+    table = dataset.to_table(columns=columns, filter=expression)
+
+    # The dataset schema comes from its first file; take the pandas metadata
+    # (and df.attrs with it) from a file that matched instead
+    for fragment in dataset.get_fragments(filter=expression):
+        table = table.replace_schema_metadata(fragment.physical_schema.metadata)
+        break
+    return table.to_pandas()
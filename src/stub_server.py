@@ -0,0 +1,236 @@
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synthetic_pages import (
+    advert_value,
+    make_detail_page,
+    make_inventory,
+    make_search_page,
+    render_search_page,
+)
+
+SEARCH_PATH = re.compile(
+    r"^/osobowe/(?P<brand>[^/]+)/(?P<model>[^/]+)(?:/od-(?P<year_from>\d+))?"
+)
+DETAIL_PATH = re.compile(r"^/osobowe/oferta/.*-ID(?P<id>\d+)\.html$")
+
+# Range filters honoured in inventory mode: query key -> (advert field, bound)
+RANGE_FILTERS = {
+    "search[filter_float_price:from]": ("price", "from"),
+    "search[filter_float_price:to]": ("price", "to"),
+    "search[filter_float_year:to]": ("year", "to"),
+    "search[filter_float_mileage:from]": ("mileage", "from"),
+    "search[filter_float_mileage:to]": ("mileage", "to"),
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves synthetic otomoto search and listing pages in place of the live site."""
+
+    protocol_version = "HTTP/1.1"
+
+    def send_fault(self, status: int, retry_after: int | None = None):
+        with self.server.lock:
+            self.server.faults[status] = self.server.faults.get(status, 0) + 1
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def inventory_page(self, brand: str, model: str, year_from, query, page) -> str:
+        """Filter the model's fixed inventory by the search's ranges and page it."""
+        server = self.server
+
+        with server.lock:
+            key = (brand, model)
+            if key not in server.inventories:
+                server.inventories[key] = make_inventory(brand, model, server.inventory)
+            adverts = server.inventories[key]
+
+        bounds = [("year", "from", float(year_from))] if year_from else []
+        for name, (field, side) in RANGE_FILTERS.items():
+            if name in query:
+                bounds.append((field, side, float(query[name][0])))
+
+        matches = [
+            advert
+            for advert in adverts
+            if all(
+                (
+                    advert_value(advert, field) >= value
+                    if side == "from"
+                    else advert_value(advert, field) <= value
+                )
+                for field, side, value in bounds
+            )
+        ]
+
+        per_page = server.offers_per_page
+        shown = matches[(page - 1) * per_page : page * per_page]
+        return render_search_page(
+            brand, model, page, shown, len(matches) if shown else 0, per_page
+        )
+
+    def injected_fault(self) -> bool:
+        """Throttle clients above max_rps and fail a share of requests at random."""
+        server = self.server
+
+        with server.lock:
+            now = time.monotonic()
+            if server.max_rps:
+                server.allowance = min(
+                    server.max_rps,
+                    server.allowance + (now - server.checked_at) * server.max_rps,
+                )
+                server.checked_at = now
+                throttled = server.allowance < 1
+                if not throttled:
+                    server.allowance -= 1
+            else:
+                throttled = False
+            roll = server.random.random()
+
+        if throttled:
+            self.send_fault(429, retry_after=1)
+            return True
+
+        if roll < server.fault_rate:
+            status = server.random.choice([500, 502, 503])
+            self.send_fault(status, retry_after=1 if status == 503 else None)
+            return True
+
+        return False
+
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        detail = DETAIL_PATH.match(parsed.path)
+        match = None if detail else SEARCH_PATH.match(parsed.path)
+
+        if not (match or detail):
+            self.send_error(404)
+            return
+
+        query = parse_qs(parsed.query)
+        page = int(query.get("page", ["1"])[0])
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if self.injected_fault():
+            return
+
+        with server.lock:
+            server.requests_served += 1
+
+        if detail:
+            html = make_detail_page(detail["id"])
+        elif server.inventory:
+            html = self.inventory_page(
+                match["brand"].title(),
+                match["model"].title(),
+                match["year_from"],
+                query,
+                page,
+            )
+        else:
+            html = make_search_page(
+                brand=match["brand"].title(),
+                model=match["model"].title(),
+                page=page,
+                last_page=server.last_page,
+                offers_per_page=server.offers_per_page,
+            )
+        body = html.encode("utf-8")
+        etag = f'"{zlib.crc32(body):08x}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(
+    port: int = 0,
+    latency: float = 0.0,
+    last_page: int = 5,
+    offers_per_page: int = 32,
+    fault_rate: float = 0.0,
+    max_rps: float | None = None,
+    seed: int = 0,
+    inventory: int | None = None,
+):
+    """
+    Start the stand-in server on a daemon thread.
+    With `inventory`, every model has that many fixed adverts and searches
+    are filtered by their price/year/mileage ranges (see RANGE_FILTERS);
+    otherwise each model simply has `last_page` full pages.
+    `fault_rate` answers that share of requests with 500/502/503, and
+    `max_rps` answers 429 with Retry-After to clients requesting faster.
+    Returns the server and its base URL (pass it as base_args["base_url"]).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.last_page = last_page
+    server.offers_per_page = offers_per_page
+    server.requests_served = 0
+    server.fault_rate = fault_rate
+    server.max_rps = max_rps
+    server.allowance = max_rps or 0
+    server.checked_at = time.monotonic()
+    server.random = random.Random(seed)
+    server.faults = {}
+    server.inventory = inventory
+    server.inventories = {}
+    server.lock = threading.Lock()
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Local otomoto stand-in")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("--latency", type=float, default=0.2)
+    arg_parser.add_argument("--last-page", type=int, default=5)
+    arg_parser.add_argument("--fault-rate", type=float, default=0.0)
+    arg_parser.add_argument("--max-rps", type=float, default=None)
+    args = arg_parser.parse_args()
+
+    server, base_url = start_stub_server(
+        port=args.port,
+        latency=args.latency,
+        last_page=args.last_page,
+        fault_rate=args.fault_rate,
+        max_rps=args.max_rps,
+    )
+    print(f"[INFO] Stub server listening on {base_url}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,316 @@
+import json
+import random
+import zlib
+from html import escape
+
+# =========================
+# CONFIG
+# =========================
+
+REGIONS = {
+    "Mazowieckie": ["Warszawa", "Radom", "Płock"],
+    "Małopolskie": ["Kraków", "Tarnów", "Nowy Sącz"],
+    "Śląskie": ["Katowice", "Gliwice", "Częstochowa"],
+    "Pomorskie": ["Gdańsk", "Gdynia", "Słupsk"],
+    "Wielkopolskie": ["Poznań", "Kalisz", "Konin"],
+    "Łódzkie": ["Łódź", "Piotrków Trybunalski"],
+}
+
+VERSIONS = [
+    "ver-1-0-tsi-life",
+    "ver-1-5-tsi-style",
+    "ver-1-3-tce-intens",
+    "ver-1-5-ecoboost-titanium-fwd",
+    "ver-1-4-boosterjet-premium-allgrip",
+    "ver-1-0-tsi-ambition",
+]
+
+SELLERS = [
+    ("Auto Świętokrzyskie Sp. z o.o.", "https://auto-swietokrzyskie.otomoto.pl"),
+    ("Komis Łukasz", "https://komis-lukasz.otomoto.pl"),
+    (None, None),
+]
+
+PRICE_INDICATORS = ["BELOW", "IN", "ABOVE", "NONE"]
+
+EQUIPMENT = {
+    "Audio i multimedia": ["Apple CarPlay", "Android Auto", "Bluetooth", "Radio"],
+    "Komfort i dodatki": ["Klimatyzacja automatyczna", "Podgrzewane fotele"],
+    "Systemy wspomagania kierowcy": ["Tempomat", "Czujniki parkowania tylne"],
+    "Bezpieczeństwo": ["ABS", "ESP", "Poduszka powietrzna kierowcy"],
+}
+
+COLORS = ["Biały", "Czarny", "Szary", "Srebrny", "Niebieski", "Czerwony"]
+
+
+# =========================
+# GENERATORS
+# =========================
+
+
+def make_advert(advert_id: int, brand: str, model: str, rng: random.Random) -> dict:
+    """Build one GraphQL advert node shaped like the otomoto advertSearch edge."""
+    region = rng.choice(list(REGIONS))
+    city = rng.choice(REGIONS[region])
+    seller_name, seller_site = rng.choice(SELLERS)
+    year = rng.randint(2019, 2022)
+    mileage = rng.randint(5, 150) * 1000
+    price = rng.randint(100, 150) * 500
+
+    return {
+        "id": str(advert_id),
+        "title": f"{brand} {model} {year}",
+        "createdAt": f"2026-01-{rng.randint(1, 28):02d}T10:00:00Z",
+        "shortDescription": "Bezwypadkowy, serwisowany w ASO, pierwszy właściciel",
+        "url": f"https://www.otomoto.pl/osobowe/oferta/{brand.lower()}-{model.lower()}-ID{advert_id}.html",
+        "sellerLink": {"name": seller_name, "websiteUrl": seller_site},
+        "parameters": [
+            {"key": "make", "value": brand.lower(), "displayValue": brand},
+            {"key": "model", "value": model.lower(), "displayValue": model},
+            {"key": "version", "value": rng.choice(VERSIONS), "displayValue": ""},
+            {"key": "year", "value": str(year), "displayValue": str(year)},
+            {"key": "fuel_type", "value": "petrol", "displayValue": "Benzyna"},
+            {"key": "mileage", "value": str(mileage), "displayValue": f"{mileage} km"},
+            {"key": "gearbox", "value": "manual", "displayValue": "Manualna"},
+            {"key": "country_origin", "value": "pl", "displayValue": "Polska"},
+            {"key": "engine_capacity", "value": "999", "displayValue": "999 cm3"},
+            {
+                "key": "engine_power",
+                "value": str(rng.randint(95, 150)),
+                "displayValue": "",
+            },
+        ],
+        "valueAddedServices": [{"name": "bump_up", "validity": None}],
+        "price": {"amount": {"value": str(price), "currencyCode": "PLN"}},
+        "location": {"city": {"name": city}, "region": {"name": region}},
+        "priceEvaluation": {"indicator": rng.choice(PRICE_INDICATORS)},
+        "cepikVerified": rng.random() < 0.7,
+    }
+
+
+def make_json_ld(adverts: list[dict]) -> dict:
+    items = []
+    for advert in adverts:
+        params = {p["key"]: p["value"] for p in advert["parameters"]}
+        items.append(
+            {
+                "@type": "Offer",
+                "priceSpecification": {
+                    "price": advert["price"]["amount"]["value"],
+                    "priceCurrency": advert["price"]["amount"]["currencyCode"],
+                },
+                "itemOffered": {
+                    "@type": "Car",
+                    "name": advert["title"],
+                    "brand": params["make"],
+                    "fuelType": params["fuel_type"],
+                    "mileageFromOdometer": {
+                        "value": params["mileage"],
+                        "unitCode": "KMT",
+                    },
+                },
+            }
+        )
+
+    return {
+        "@context": "https://schema.org",
+        "@type": "SearchResultsPage",
+        "mainEntity": {"@type": "OfferCatalog", "itemListElement": items},
+    }
+
+
+def make_search_page(
+    brand: str = "Volkswagen",
+    model: str = "Taigo",
+    page: int = 1,
+    last_page: int = 5,
+    offers_per_page: int = 32,
+    total_count: int | None = None,
+    seed: int = 0,
+) -> str:
+    """
+    Render a search result page mimicking otomoto's markup: the listing
+    JSON-LD block, the Next.js props script carrying the urqlState payload
+    and the og:url meta. Pages past last_page come back without offers,
+    the way the live site answers an out-of-range page.
+    """
+    rng = random.Random(f"{brand}-{model}-{page}-{seed}")
+
+    if total_count is None:
+        total_count = last_page * offers_per_page
+
+    in_range = page <= last_page
+    first_id = 6100000000000 + model_id_base(brand, model) + page * offers_per_page
+    adverts = (
+        [make_advert(first_id + i, brand, model, rng) for i in range(offers_per_page)]
+        if in_range
+        else []
+    )
+
+    return render_search_page(
+        brand, model, page, adverts, total_count if in_range else 0, offers_per_page
+    )
+
+
+def model_id_base(brand: str, model: str) -> int:
+    # Keeps ids unique across models
+    return zlib.crc32(f"{brand}-{model}".encode()) % 10000 * 100000
+
+
+def make_inventory(brand: str, model: str, size: int, seed: int = 0) -> list[dict]:
+    """A fixed set of `size` adverts for one model, for searches with filters."""
+    rng = random.Random(f"{brand}-{model}-inventory-{seed}")
+    first_id = 7100000000000 + model_id_base(brand, model)
+    return [make_advert(first_id + i, brand, model, rng) for i in range(size)]
+
+
+def advert_value(advert: dict, key: str) -> float:
+    if key == "price":
+        return float(advert["price"]["amount"]["value"])
+    return float(next(p["value"] for p in advert["parameters"] if p["key"] == key))
+
+
+def render_search_page(
+    brand: str,
+    model: str,
+    page: int,
+    adverts: list[dict],
+    total_count: int,
+    offers_per_page: int = 32,
+) -> str:
+    advert_search = {
+        "advertSearch": {
+            "totalCount": total_count,
+            "pageInfo": {
+                "pageSize": offers_per_page,
+                "currentOffset": (page - 1) * offers_per_page,
+            },
+            "edges": [{"node": advert} for advert in adverts],
+        }
+    }
+    next_data = {
+        "props": {
+            "pageProps": {
+                "urqlState": {
+                    "1843521": {"data": json.dumps({"sortOptions": []})},
+                    "3962854": {"data": json.dumps(advert_search)},
+                }
+            }
+        },
+        "page": "/search",
+    }
+
+    og_url = (
+        f"https://www.otomoto.pl/osobowe/{brand.lower()}/{model.lower()}?page={page}"
+    )
+    json_ld_block = (
+        '<script type="application/ld+json" id="listing-json-ld">'
+        f"{json.dumps(make_json_ld(adverts))}</script>"
+        if adverts
+        else ""
+    )
+    cards = "".join(
+        f'<article data-id="{a["id"]}"><h2>{escape(a["title"])}</h2>'
+        f'<p>{escape(a["shortDescription"])}</p></article>'
+        for a in adverts
+    )
+
+    return (
+        '<!DOCTYPE html><html lang="pl"><head>'
+        '<meta charset="utf-8">'
+        f'<meta property="og:url" content="{og_url}">'
+        f"<title>{brand} {model} - otomoto.pl</title>"
+        "<script>window.dataLayer = window.dataLayer || [];</script>"
+        f"{json_ld_block}"
+        "</head><body>"
+        f"<main>{cards}</main>"
+        '<script id="__NEXT_DATA__" type="application/json">'
+        f"{json.dumps(next_data)}</script>"
+        "</body></html>"
+    )
+
+
+def make_detail_page(advert_id: int | str, seed: int = 0) -> str:
+    """
+    Render a listing page the way the live site does: the advert sits in the
+    Next.js props under pageProps.advert, with a "details" key/value list,
+    "equipment" groups and an HTML description. Deterministic per id.
+    """
+    rng = random.Random(f"detail-{advert_id}-{seed}")
+    has_vin = rng.random() < 0.8
+    details = [
+        {"key": "color", "label": "Kolor", "value": rng.choice(COLORS)},
+        {"key": "body_type", "label": "Typ nadwozia", "value": "SUV"},
+        {"key": "door_count", "label": "Liczba drzwi", "value": "5"},
+        {"key": "nr_seats", "label": "Liczba miejsc", "value": "5"},
+        {
+            "key": "no_accident",
+            "label": "Bezwypadkowy",
+            "value": "Tak" if rng.random() < 0.8 else "Nie",
+        },
+        {
+            "key": "service_record",
+            "label": "Serwisowany w ASO",
+            "value": "Tak" if rng.random() < 0.6 else "Nie",
+        },
+        {
+            "key": "original_owner",
+            "label": "Pierwszy właściciel",
+            "value": "Tak" if rng.random() < 0.4 else "Nie",
+        },
+    ]
+    if has_vin:
+        vin = "".join(
+            rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ0123456789") for _ in range(17)
+        )
+        details.append({"key": "vin", "label": "VIN", "value": vin})
+
+    equipment = [
+        {
+            "key": group,
+            "label": group,
+            "values": [
+                {"key": value, "label": value} for value in values if rng.random() < 0.7
+            ],
+        }
+        for group, values in EQUIPMENT.items()
+    ]
+    paragraphs = rng.randint(2, 6)
+    description = "".join(
+        "<p>Samochód w bardzo dobrym stanie, regularnie serwisowany."
+        " Możliwa zamiana, faktura VAT marża.</p>"
+        for _ in range(paragraphs)
+    )
+
+    next_data = {
+        "props": {
+            "pageProps": {
+                "advert": {
+                    "id": str(advert_id),
+                    "description": description,
+                    "details": details,
+                    "equipment": equipment,
+                }
+            }
+        },
+        "page": "/ad",
+    }
+    og_url = f"https://www.otomoto.pl/osobowe/oferta/ID{advert_id}.html"
+
+    return (
+        '<!DOCTYPE html><html lang="pl"><head>'
+        '<meta charset="utf-8">'
+        f'<meta property="og:url" content="{og_url}">'
+        f"<title>Ogłoszenie {advert_id} - otomoto.pl</title>"
+        "</head><body>"
+        f"<main><section>{description}</section></main>"
+        '<script id="__NEXT_DATA__" type="application/json">'
+        f"{json.dumps(next_data)}</script>"
+        "</body></html>"
+    )
+
+
+if __name__ == "__main__":
+    html = make_search_page(page=1, last_page=3, offers_per_page=3)
+    print(f"{len(html)} bytes")
+    print(html[:500])
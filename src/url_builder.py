@@ -1,5 +1,9 @@
 from urllib.parse import urlencode
 
+BASE_URL = "https://www.otomoto.pl"
+
+# search[order] value that lists the most recently added adverts first
+NEWEST_FIRST = "created_at_first:desc"
 
 BRAND_MODEL_SLUGS = {
     ("volkswagen", "taigo"): ("volkswagen", "taigo"),
@@ -15,6 +19,15 @@ BRAND_MODEL_SLUGS = {
 }
 
 
+def model_slugs(brand: str, model: str) -> tuple[str, str]:
+    """URL slugs of a model, which are also its listings' make and model values."""
+    key = (brand.lower(), model.lower())
+    if key not in BRAND_MODEL_SLUGS:
+        raise ValueError(f"Unsupported brand/model: {brand} {model}")
+
+    return BRAND_MODEL_SLUGS[key]
+
+
 def build_query_params(
     price_from: int,
     price_to: int,
@@ -24,6 +37,8 @@ def build_query_params(
     gearbox: str,
     accident_free: bool,
     page: int | None = None,
+    order: str | None = None,
+    mileage_from: int | None = None,
 ):
     params = {
         "search[filter_float_price:from]": price_from,
@@ -37,6 +52,12 @@ def build_query_params(
     if accident_free:
         params["search[filter_enum_damaged]"] = 0
 
+    if mileage_from is not None:
+        params["search[filter_float_mileage:from]"] = mileage_from
+
+    if order is not None:
+        params["search[order]"] = order
+
     if page is not None:
         params["page"] = page
 
@@ -55,16 +76,13 @@ def build_search_url(
     gearbox: str = "manual",
     accident_free: bool = True,
     page: int | None = None,
+    base_url: str = BASE_URL,
+    order: str | None = None,
+    mileage_from: int | None = None,
 ):
-    key = (brand.lower(), model.lower())
-    if key not in BRAND_MODEL_SLUGS:
-        raise ValueError(f"Unsupported brand/model: {brand} {model}")
-
-    brand_slug, model_slug = BRAND_MODEL_SLUGS[key]
+    brand_slug, model_slug = model_slugs(brand, model)
 
-    base_url = (
-        f"https://www.otomoto.pl/osobowe/" f"{brand_slug}/{model_slug}/od-{year_from}"
-    )
+    search_url = f"{base_url}/osobowe/" f"{brand_slug}/{model_slug}/od-{year_from}"
 
     query_string = build_query_params(
         price_from=price_from,
@@ -75,9 +93,11 @@ def build_search_url(
         gearbox=gearbox,
         accident_free=accident_free,
         page=page,
+        order=order,
+        mileage_from=mileage_from,
     )
 
-    return f"{base_url}?{query_string}"
+    return f"{search_url}?{query_string}"
 
 
 # if __name__ == "__main__":